@@ -0,0 +1,191 @@
+"""Notification throughput benchmark: alert bursts through check_and_notify into fake_telegram."""
+import argparse
+import asyncio
+import io
+import os
+import re
+import tempfile
+import time
+from typing import List, Optional
+
+COMBINATIONS = [(f"Bench Gift {i}", "Bench Model") for i in range(10)]
+
+
+class BurstMarket:
+    """Stands in for portalsmp: every burst replaces the order book with n new listings."""
+
+    def __init__(self, photo_url: str = ""):
+        self.photo_url = photo_url
+        self.book: List[dict] = []
+        self.next_number = 1
+
+    def new_burst(self, n: int) -> List[int]:
+        numbers = list(range(self.next_number, self.next_number + n))
+        self.next_number += n
+        self.book = sorted((
+            {
+                'id': f"bench-{number}",
+                'name': COMBINATIONS[number % len(COMBINATIONS)][0],
+                'external_collection_number': number,
+                'price': f"{5 + number % 97 / 4:.2f}",
+                'photo_url': self.photo_url,
+                'attributes': [
+                    {'type': 'model', 'value': 'Bench Model', 'rarity_per_mille': 10 + number % 40},
+                    {'type': 'symbol', 'value': 'Star', 'rarity_per_mille': 5 + number % 20},
+                    {'type': 'backdrop', 'value': 'Black', 'rarity_per_mille': 12},
+                ],
+            }
+            for number in numbers
+        ), key=lambda gift: float(gift['price']))
+        return numbers
+
+    def search(self, **query):
+        names = query.get('gift_name') or []
+        names = [names] if isinstance(names, str) else names
+        rows = [
+            gift for gift in self.book
+            if gift['name'] in names
+            and float(gift['price']) <= float(query.get('max_price') or 1e9)
+            and float(gift['price']) >= float(query.get('min_price') or 0)
+        ]
+        offset, limit = int(query.get('offset', 0)), int(query.get('limit', 20))
+        return rows[offset:offset + limit]
+
+
+def _photo_bytes() -> bytes:
+    try:
+        from PIL import Image
+    except ImportError:
+        return b""
+    buffer = io.BytesIO()
+    Image.new("RGB", (256, 256), (70, 110, 160)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def bench(bursts: List[int], photos: bool, api, port: int,
+                delay: Optional[float] = None) -> List[dict]:
+    """
+    Run each burst through NFTMonitorBot.check_and_notify and drain the outbox.
+
+    Latency of an alert is the time from the start of its cycle until the
+    first message mentioning its number reached the fake API.
+    """
+    from aiohttp import web
+    from portals_capture import ReplayAuth
+
+    photo = _photo_bytes() if photos else b""
+
+    async def serve_photo(request):
+        return web.Response(body=photo, content_type="image/png")
+
+    app = api.make_app()
+    app.router.add_get("/fake/photo.png", serve_photo)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    from bot import NFTMonitorBot
+
+    bot = NFTMonitorBot()
+    market = BurstMarket(f"http://127.0.0.1:{port}/fake/photo.png" if photo else "")
+    if delay is not None:
+        bot.dispatcher.delay = delay
+    bot.searcher.portals = market
+    bot.searcher.auth_manager = ReplayAuth()
+    bot.searcher.page_delay = 0
+    bot.searcher.retry_delay = 0
+    # Known TON/UAH rate, so captions don't call CoinGecko
+    bot.searcher.price_fetcher.cached_price = 100.0
+    bot.searcher.price_fetcher.cache_time = time.time()
+    bot.searcher.price_fetcher.cache_duration = float('inf')
+    bot.config.data["wanted_combinations"] = [list(c) for c in COMBINATIONS]
+    bot.config.set_max_price(1000)
+    bot.config.set_probe_mode(False)
+    bot.config.set_alert_events(["new"])
+
+    # Alerts are only queued and sent by the lease holder
+    bot.lease.heartbeat()
+
+    results = []
+    await bot.app.initialize()
+    try:
+        for n in bursts:
+            numbers = market.new_burst(n)
+            first_message = len(api.messages)
+            calls_before = len(api.calls)
+            flood_before = bot.dispatcher.flood_waits
+            started = time.time()
+
+            await bot.check_and_notify()
+            cycle_done = time.time()
+            while bot.outbox.pending_count():
+                await bot.dispatch_outbox()
+            finished = time.time()
+
+            delivered = {}
+            for message in api.messages[first_message:]:
+                for number in re.findall(r"#(\d+)", message['text']):
+                    delivered.setdefault(int(number), message['sent_at'])
+            latencies = [delivered[number] - started for number in numbers if number in delivered]
+            calls = api.calls[calls_before:]
+            results.append({
+                'alerts': n,
+                'delivered': len(latencies),
+                'messages': len(api.messages) - first_message,
+                'flood_429': sum(1 for c in calls if c['status'] == 429),
+                'flood_waits': bot.dispatcher.flood_waits - flood_before,
+                'cycle_s': cycle_done - started,
+                'total_s': finished - started,
+                'alerts_per_s': len(latencies) / (finished - started) if finished > started else 0.0,
+                'p50_s': _percentile(latencies, 0.5),
+                'max_s': max(latencies, default=0.0),
+            })
+    finally:
+        await bot.app.shutdown()
+        await runner.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    from fake_telegram import FakeBotAPI, FloodControl
+
+    parser = argparse.ArgumentParser(description="Benchmark alert bursts against a fake Telegram Bot API")
+    parser.add_argument("--bursts", default="10,100,1000", help="Comma separated alert counts")
+    parser.add_argument("--text", action="store_true", help="Listings without photos (one message per alert)")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--chat-rate", type=float, default=1, help="Messages/s per chat")
+    parser.add_argument("--group-minute", type=int, default=20, help="Messages/min per channel")
+    parser.add_argument("--no-flood", action="store_true", help="Disable flood control")
+    parser.add_argument("--delay", type=float, help="Outbox delay between messages (default: bot's)")
+    args = parser.parse_args()
+
+    bursts = [int(b) for b in args.bursts.split(',') if b.strip()]
+    workdir = tempfile.mkdtemp(prefix="bench_notifications_")
+    os.chdir(workdir)
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '123456:BENCH',
+        'TELEGRAM_CHANNEL_ID': '-1001',
+        'TELEGRAM_API_URL': f"http://127.0.0.1:{args.port}/bot",
+        'COORDINATION_DB': os.path.join(workdir, "coordination.db"),
+        'TRACE_FILE': '',
+        'PORTALS_RATE': '1000',
+        # Room for the largest burst in one sweep
+        'MAX_SEARCH_PAGES': str(max(20, max(bursts) // 10)),
+        'EXTRA_MARKETS': '',
+        'ALERT_DESTINATIONS': '',
+    })
+
+    fake_api = FakeBotAPI(None if args.no_flood else FloodControl(args.chat_rate, 3, args.group_minute))
+
+    rows = asyncio.run(bench(bursts, not args.text, fake_api, args.port, args.delay))
+    print(f"\n{'alerts':>7}{'delivered':>10}{'msgs':>6}{'429s':>6}{'cycle s':>9}{'total s':>9}"
+          f"{'alerts/s':>10}{'p50 s':>8}{'max s':>8}")
+    for r in rows:
+        print(f"{r['alerts']:>7}{r['delivered']:>10}{r['messages']:>6}{r['flood_429']:>6}{r['cycle_s']:>9.2f}"
+              f"{r['total_s']:>9.2f}{r['alerts_per_s']:>10.1f}{r['p50_s']:>8.2f}{r['max_s']:>8.2f}")
+    print(f"\nWork dir: {workdir}")
@@ -1,11 +1,20 @@
 """Telegram bot for NFT gift monitoring."""
+import time
+
+STARTUP_STARTED = time.perf_counter()
+
 import asyncio
+import hashlib
 import os
+import signal
+import subprocess
+import sys
 from datetime import datetime
 from dotenv import load_dotenv
 from telegram import Update
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     ContextTypes,
     MessageHandler,
@@ -13,10 +22,46 @@ from telegram.ext import (
 )
 
 from bot_config import BotConfig
+from cycle_budget import CycleBudget, ScopeController
+from dashboard import Dashboard, combination_stats
+from digest_buffer import INSTANT, DigestBuffer, describe_mode, is_due, parse_mode, render_digest
+from gift_catalog import GiftCatalog
+from gift_collage import ImageCache, build_collage
 from gift_searcher import GiftSearcher
+from leader_lease import LeaderLease
+from listing_archive import ArchiveWriter
+from marketplaces import PORTALS, MarketFanout, adapters_from_env, match_offers
+from notification_outbox import NotificationOutbox, OutboxDispatcher
+from result_pages import ResultPageStore
+from shard_workers import ShardCoordinator
+from snapshot_diff import (
+    EVENT_LABELS,
+    EVENT_TYPES,
+    NEW_LISTING,
+    PRICE_DROP,
+    REMOVED,
+    SnapshotDiffer,
+    listing_model,
+)
+from summary_aggregator import SummaryAggregator
+from telegram_text import CAPTION_LIMIT, MESSAGE_LIMIT, telegram_length
+from tier_scheduler import HOT, TIER_LABELS, TIERS, TierScheduler
+from tracing import span
+from valuation import FairValueModel
+from warm_state import WarmState
 
 load_dotenv()
 
+# Share of the check interval a monitoring cycle may take
+CYCLE_BUDGET_FRACTION = float(os.getenv('CYCLE_BUDGET_FRACTION', '0.8'))
+# Share of the cycle budget kept for sending notifications
+DISPATCH_RESERVE_FRACTION = 0.15
+# Alert bursts with at least this many photos are sent as one collage
+COLLAGE_MIN_BURST = int(os.getenv('COLLAGE_MIN_BURST', '6'))
+COLLAGE_SIZE = int(os.getenv('COLLAGE_SIZE', '12'))
+# Result pages fetched per market in one monitoring sweep
+MAX_PAGES = int(os.getenv('MAX_SEARCH_PAGES', '20'))
+
 
 class NFTMonitorBot:
     """NFT Gift Monitor Bot."""
@@ -24,6 +69,44 @@ class NFTMonitorBot:
     def __init__(self):
         self.config = BotConfig()
         self.searcher = GiftSearcher()
+        # Portals plus EXTRA_MARKETS, searched concurrently every cycle
+        self.markets = MarketFanout(adapters_from_env(self.searcher))
+        # Known collections/models for validating and completing names
+        self.catalog = GiftCatalog()
+        # Restore the last sweep so the first cycle starts warm
+        self.warm_state = WarmState()
+        self.searcher.last_snapshot = self.warm_state.load_snapshot()
+        self.searcher.index.update(self.searcher.last_snapshot, self.warm_state.saved_at)
+        # After a warm restore the first cycle probes floors against the
+        # restored state and fetches only the pairs that changed
+        self.start_mode = "warm" if self.searcher.last_snapshot else "cold"
+        self.first_cycle_pending = True
+        # Per-listing state for new/price change/removed events
+        self.differ = SnapshotDiffer()
+        if not self.differ.loaded:
+            self.differ.seed(self.searcher.last_snapshot)
+        # Columnar history of every sweep for offline analysis (empty dir = off)
+        archive_dir = os.getenv('LISTING_ARCHIVE_DIR', 'archive')
+        self.archive = ArchiveWriter(archive_dir) if archive_dir else None
+        # Fair value per listing from rarity, fitted on an uncapped sample of
+        # every watched collection (sweeps stop at the price cap)
+        self.valuation = FairValueModel()
+        self.valuation_interval = float(os.getenv('VALUATION_SAMPLE_INTERVAL', '3600'))
+        self.valuation_pages = int(os.getenv('VALUATION_SAMPLE_PAGES', '5'))
+        # Pinned per-chat status messages edited after every cycle
+        self.dashboard = Dashboard(float(os.getenv('DASHBOARD_MIN_INTERVAL', '60')))
+        # Shrinks the per-cycle watchlist after overruns, high priority first
+        self.scope = ScopeController()
+        # Fast lane for hot pairs, low pairs swept every few cycles
+        self.tiers = TierScheduler(
+            float(os.getenv('HOT_INTERVAL', '5')),
+            float(os.getenv('HOT_RATE_SHARE', '0.5')),
+            int(os.getenv('LOW_TIER_EVERY', '3')),
+            self.markets.adapters[0].rate_limiter.rate,
+        )
+        # Cycles and the fast lane apply their sweeps one at a time
+        self.sweep_lock = asyncio.Lock()
+        self.fast_lane_running = False
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.channel_id = os.getenv('TELEGRAM_CHANNEL_ID')
 
@@ -32,24 +115,107 @@ class NFTMonitorBot:
         if not self.channel_id:
             raise ValueError("TELEGRAM_CHANNEL_ID не знайдено в .env")
 
-        self.app = Application.builder().token(self.bot_token).build()
+        # Webhook mode (public base URL) instead of long polling
+        self.webhook_url = os.getenv('WEBHOOK_URL')
+
+        # Optional sharded mode: N worker processes split the watchlist
+        self.worker_count = int(os.getenv('MONITOR_WORKERS', '0'))
+        self.coordination_db = os.getenv('COORDINATION_DB', 'coordination.db')
+        self.coordinator = None
+        self.worker_processes = []
+        if self.worker_count > 0:
+            self.coordinator = ShardCoordinator(
+                self.searcher, self.worker_count, self.coordination_db
+            )
+
+        # Only the lease holder runs monitoring (overlapping deploys)
+        self.lease = LeaderLease(
+            self.coordination_db,
+            ttl=float(os.getenv('LEADER_LEASE_TTL', '15'))
+        )
+
+        builder = (
+            Application.builder()
+            .token(self.bot_token)
+            # Handle updates concurrently so a slow sweep doesn't block /list or /pause
+            .concurrent_updates(int(os.getenv('CONCURRENT_UPDATES', '16')))
+            .post_init(self.on_startup)
+        )
+        # Bot API base URL, e.g. http://localhost:8081/bot for fake_telegram.py
+        api_url = os.getenv('TELEGRAM_API_URL')
+        if api_url:
+            builder = builder.base_url(api_url)
+        self.app = builder.build()
+        # Running heavy command per user (a new one supersedes it)
+        self.user_tasks = {}
+        self.superseded = set()
+        # Matched gifts are written here first, then delivered with per-item acks
+        self.outbox = NotificationOutbox(self.coordination_db)
+        self.outbox.purge_delivered()
+        self.dispatcher = OutboxDispatcher(self.outbox, self.app.bot)
+        # Alerts waiting for batched or daily digests
+        self.digests = DigestBuffer(self.coordination_db)
+
+        # Gift photos for burst collages
+        self.image_cache = ImageCache()
+
+        # /showall and /show results, paged from memory via inline keyboards
+        self.pages = ResultPageStore(self.searcher.price_fetcher.format_price_with_uah)
+
         self._register_handlers()
 
     def _register_handlers(self):
         """Register command handlers."""
         self.app.add_handler(CommandHandler("start", self.cmd_start))
         self.app.add_handler(CommandHandler("help", self.cmd_help))
-        self.app.add_handler(CommandHandler("showall", self.cmd_showall))
-        self.app.add_handler(CommandHandler("show", self.cmd_show))
+        self.app.add_handler(CommandHandler("showall", self.per_user(self.cmd_showall)))
+        self.app.add_handler(CommandHandler("show", self.per_user(self.cmd_show)))
         self.app.add_handler(CommandHandler("list", self.cmd_list))
         self.app.add_handler(CommandHandler("add", self.cmd_add))
         self.app.add_handler(CommandHandler("delete", self.cmd_delete))
         self.app.add_handler(CommandHandler("setprice", self.cmd_setprice))
         self.app.add_handler(CommandHandler("setinterval", self.cmd_setinterval))
+        self.app.add_handler(CommandHandler("probe", self.cmd_probe))
+        self.app.add_handler(CommandHandler("alerts", self.cmd_alerts))
+        self.app.add_handler(CommandHandler("discount", self.cmd_discount))
+        self.app.add_handler(CommandHandler("dashboard", self.cmd_dashboard))
+        self.app.add_handler(CommandHandler("delivery", self.cmd_delivery))
+        self.app.add_handler(CommandHandler("priority", self.cmd_priority))
         self.app.add_handler(CommandHandler("pause", self.cmd_pause))
         self.app.add_handler(CommandHandler("resume", self.cmd_resume))
         self.app.add_handler(CommandHandler("stats", self.cmd_stats))
-        self.app.add_handler(CommandHandler("image", self.cmd_image))
+        self.app.add_handler(CommandHandler("image", self.per_user(self.cmd_image)))
+        self.app.add_handler(CallbackQueryHandler(self.on_page_callback, pattern=r"^pg:"))
+
+    def per_user(self, callback):
+        """
+        Wrap a heavy command handler so each user runs at most one at a time.
+
+        A new call from the same user cancels the one still running.
+        """
+        async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            user = update.effective_user
+            user_id = user.id if user else update.effective_chat.id
+
+            previous = self.user_tasks.get(user_id)
+            if previous and not previous.done():
+                self.superseded.add(previous)
+                previous.cancel()
+
+            task = asyncio.ensure_future(callback(update, context))
+            self.user_tasks[user_id] = task
+            try:
+                await task
+            except asyncio.CancelledError:
+                if task not in self.superseded:
+                    raise
+                await update.effective_message.reply_text("⏹ Запит скасовано: надіслано новий")
+            finally:
+                self.superseded.discard(task)
+                if self.user_tasks.get(user_id) is task:
+                    del self.user_tasks[user_id]
+
+        return handler
 
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command."""
@@ -69,6 +235,12 @@ class NFTMonitorBot:
 ⚙️ Налаштування:
 /setprice <сума> - Встановити максимальну ціну
 /setinterval <хвилини> - Встановити інтервал перевірки
+/probe on|off - Режим перевірки мінімальної ціни
+/alerts <типи> - Які зміни надсилати в канал
+/discount <відсоток> - Мін. знижка до справедливої ціни
+/dashboard on|off - Закріплена панель стану в цьому чаті
+/delivery <режим> - Миттєві сповіщення або зведення
+/priority <рівень> <подарунок>,<модель> - Як часто перевіряти пару
 /pause - Призупинити моніторинг
 /resume - Відновити моніторинг
 
@@ -119,6 +291,46 @@ class NFTMonitorBot:
 /stats
   Показує загальну кількість перевірок, знайдених подарунків, час останньої перевірки
 
+🔔 ТИПИ СПОВІЩЕНЬ:
+/alerts new,price_drop
+  Нові лоти (new), зниження ціни (price_drop), підвищення ціни (price_rise),
+  продані або зняті з продажу (removed)
+
+📊 ЗНИЖКА ДО СПРАВЕДЛИВОЇ ЦІНИ:
+/discount 20
+  Сповіщати лише про лоти щонайменше на 20% дешевші за оцінку
+  (оцінка з урахуванням рідкості моделі, символу й фону; 0 - вимкнено)
+/discount 30 Ionic Dryer,Love Burst
+  Окреме правило для пари
+
+🗞 РЕЖИМ ДОСТАВКИ:
+/delivery batch 30
+  Збирати сповіщення каналу і надсилати одним зведенням кожні 30 хв
+/delivery daily 09:00
+  Одне зведення на день
+/delivery instant
+  Кожен лот окремим повідомленням (за замовчуванням)
+/delivery <chat_id> batch 60
+  Режим для іншого каналу сповіщень
+
+📌 ПАНЕЛЬ СТАНУ:
+/dashboard on
+  Закріплює в чаті повідомлення з мінімальною ціною і кількістю лотів
+  кожної пари, яке оновлюється після кожної перевірки без нових запитів
+
+🔥 ПРІОРИТЕТ ПАРИ:
+/priority hot Ionic Dryer,Love Burst
+  Перевіряти мінімальну ціну пари кожні кілька секунд (1 запит)
+/priority low Ionic Dryer,Love Burst
+  Перевіряти пару рідше, ніж кожну перевірку
+/priority normal Ionic Dryer,Love Burst
+  Звичайна перевірка (за замовчуванням)
+
+🔎 РЕЖИМ МІНІМАЛЬНОЇ ЦІНИ:
+/probe on
+  Спершу перевіряє лише найдешевший лот кожної пари (1 запит на пару)
+  і завантажує повний список тільки для пар, дешевших за макс. ціну
+
 ⏸️ ПАУЗА/ВІДНОВЛЕННЯ:
 /pause - Зупинити моніторинг тимчасово
 /resume - Продовжити моніторинг
@@ -136,64 +348,15 @@ class NFTMonitorBot:
             # NO price filter for showall - use very high limit
             max_price = 999999
 
-            gifts = await self.searcher.search_gifts(combinations, max_price)
+            summary = SummaryAggregator()
+            async for gift in self.searcher.iter_gifts(combinations, max_price):
+                summary.add(gift)
 
-            if not gifts:
+            if not summary.total:
                 await update.message.reply_text("❌ Подарунків не знайдено")
                 return
 
-            # Get TON price for UAH conversion
-            ton_price_uah = await self.searcher.price_fetcher.get_ton_price_uah()
-
-            # Sort by price
-            gifts.sort(key=lambda x: float(x.get('price', 999999)))
-
-            # Group by gift+model combination
-            by_combo = {}
-            for gift in gifts:
-                info = self.searcher.format_gift_info(gift)
-                key = f"{info['name']} - {info['model']}"
-                if key not in by_combo:
-                    by_combo[key] = []
-                by_combo[key].append(info)
-
-            # Build summary
-            summary = f"✅ Знайдено {len(gifts)} подарунків!\n\n"
-
-            for combo, combo_gifts in sorted(by_combo.items()):
-                combo_gifts.sort(key=lambda x: float(x['price']))
-                cheapest = combo_gifts[0]
-                most_expensive = combo_gifts[-1]
-
-                # Format price range
-                cheapest_ton = float(cheapest['price'])
-                most_expensive_ton = float(most_expensive['price'])
-
-                if ton_price_uah:
-                    cheapest_uah = cheapest_ton * ton_price_uah
-                    most_expensive_uah = most_expensive_ton * ton_price_uah
-                    price_range = f"{cheapest['price']} - {most_expensive['price']} TON ({cheapest_uah:,.0f} - {most_expensive_uah:,.0f} ₴)"
-                else:
-                    price_range = f"{cheapest['price']} - {most_expensive['price']} TON"
-
-                summary += f"📦 {combo} ({len(combo_gifts)} шт.)\n"
-                summary += f"   💰 {price_range}\n"
-                summary += f"   🔗 {cheapest['url']}\n\n"
-
-            # Add top 20 cheapest
-            summary += "\n━━━━━━━━━━━━━━━━━━━━\n"
-            summary += "💎 ТОП-20 НАЙДЕШЕВШИХ:\n\n"
-
-            for i, gift in enumerate(gifts[:20], 1):
-                info = self.searcher.format_gift_info(gift)
-                price_str = self.searcher.price_fetcher.format_price_with_uah(info['price'], ton_price_uah)
-                summary += f"{i}. {info['name']} #{info['number']}\n"
-                summary += f"   {price_str} | {info['model']} | Символ: {info['symbol']} | Фон: {info['backdrop']}\n\n"
-
-            if len(gifts) > 20:
-                summary += f"... та ще {len(gifts) - 20}"
-
-            await update.message.reply_text(summary)
+            await self.reply_with_pages(update, "Усі подарунки", summary)
 
         except Exception as e:
             await update.message.reply_text(f"❌ Помилка: {str(e)}")
@@ -221,12 +384,18 @@ class NFTMonitorBot:
                 if len(parts) != 2:
                     await update.message.reply_text("❌ Формат: /show <подарунок>,<модель>")
                     return
-                gift_name, model = parts
+                resolved = await self.resolve_pair(update, *parts)
+                if not resolved:
+                    return
+                gift_name, model = resolved
                 combinations = [(gift_name, model)]
                 search_type = f"{gift_name} - {model}"
             else:
                 # Only gift name - search all models
-                gift_name = query.strip()
+                gift_name, suggestions = self.catalog.resolve_collection(query)
+                if not gift_name:
+                    await update.message.reply_text(self.format_suggestions(query, suggestions))
+                    return
                 # Get all unique models from wanted combinations for this gift
                 all_combos = self.config.get_wanted_combinations()
                 models = list(set(model for g, model in all_combos if g.lower() == gift_name.lower()))
@@ -243,65 +412,72 @@ class NFTMonitorBot:
 
             # Search without price limit
             max_price = 999999
-            gifts = await self.searcher.search_gifts(combinations, max_price)
+            summary = SummaryAggregator()
+            async for gift in self.searcher.iter_gifts(combinations, max_price):
+                summary.add(gift)
 
-            if not gifts:
+            if not summary.total:
                 await update.message.reply_text(f"❌ Пропозицій не знайдено для: {search_type}")
                 return
 
-            # Get TON price for UAH conversion
-            ton_price_uah = await self.searcher.price_fetcher.get_ton_price_uah()
-
-            # Sort by price
-            gifts.sort(key=lambda x: float(x.get('price', 999999)))
-
-            # Group by gift+model combination
-            by_combo = {}
-            for gift in gifts:
-                info = self.searcher.format_gift_info(gift)
-                key = f"{info['name']} - {info['model']}"
-                by_combo.setdefault(key, []).append(info)
-
-            # Build summary
-            summary = f"✅ Знайдено {len(gifts)} пропозицій для: {search_type}\n\n"
+            await self.reply_with_pages(update, search_type, summary)
 
-            for combo, combo_gifts in sorted(by_combo.items()):
-                combo_gifts.sort(key=lambda x: float(x['price']))
-                cheapest = combo_gifts[0]
-                most_expensive = combo_gifts[-1]
-
-                # Format price range
-                cheapest_ton = float(cheapest['price'])
-                most_expensive_ton = float(most_expensive['price'])
-
-                if ton_price_uah:
-                    cheapest_uah = cheapest_ton * ton_price_uah
-                    most_expensive_uah = most_expensive_ton * ton_price_uah
-                    price_range = f"{cheapest['price']} - {most_expensive['price']} TON ({cheapest_uah:,.0f} - {most_expensive_uah:,.0f} ₴)"
-                else:
-                    price_range = f"{cheapest['price']} - {most_expensive['price']} TON"
-
-                summary += f"📦 {combo} ({len(combo_gifts)} шт.)\n"
-                summary += f"   💰 {price_range}\n"
-                summary += f"   🔗 {cheapest['url']}\n\n"
-
-            # Add top 20 cheapest
-            summary += "\n━━━━━━━━━━━━━━━━━━━━\n"
-            summary += "💎 ТОП-20 НАЙДЕШЕВШИХ:\n\n"
+        except Exception as e:
+            await update.message.reply_text(f"❌ Помилка: {str(e)}")
 
-            for i, gift in enumerate(gifts[:20], 1):
-                info = self.searcher.format_gift_info(gift)
-                price_str = self.searcher.price_fetcher.format_price_with_uah(info['price'], ton_price_uah)
-                summary += f"{i}. {info['name']} #{info['number']}\n"
-                summary += f"   {price_str} | {info['model']} | Символ: {info['symbol']} | Фон: {info['backdrop']}\n\n"
+    async def reply_with_pages(self, update: Update, title: str, summary: SummaryAggregator):
+        """Store aggregated search results and reply with the first page."""
+        ton_price_uah = await self.searcher.price_fetcher.get_ton_price_uah()
+        self.catalog.learn_pairs(summary.combos)
+        cursor_id = self.pages.create(title, summary.infos, summary, ton_price_uah)
+        text, keyboard = self.pages.render(cursor_id)
+        await update.message.reply_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+    async def on_page_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle inline keyboard paging for /showall and /show results."""
+        query = update.callback_query
+        parsed = ResultPageStore.parse_callback(query.data)
+        if not parsed:
+            await query.answer()
+            return
 
-            if len(gifts) > 20:
-                summary += f"... та ще {len(gifts) - 20}"
+        cursor_id, page, sort, combo_index = parsed
+        rendered = self.pages.render(cursor_id, page, sort, combo_index)
+        if not rendered:
+            await query.answer("⌛ Результати застаріли, повторіть команду", show_alert=True)
+            return
 
-            await update.message.reply_text(summary)
+        text, keyboard = rendered
+        await query.answer()
+        await query.edit_message_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+    @staticmethod
+    def format_suggestions(text: str, suggestions: list) -> str:
+        """Format an 'unknown name' reply with suggestions."""
+        reply = f"❌ Невідома назва: {text}"
+        if suggestions:
+            reply += "\n\nМожливо, ви мали на увазі:\n" + "\n".join(f"• {s}" for s in suggestions)
+        return reply
+
+    async def resolve_pair(self, update: Update, gift_name: str, model: str):
+        """
+        Resolve gift and model names against the catalog.
+
+        Replies with suggestions and returns None if either name is unknown.
+        """
+        canonical_gift, suggestions = self.catalog.resolve_collection(gift_name)
+        if not canonical_gift:
+            await update.message.reply_text(self.format_suggestions(gift_name, suggestions))
+            return None
+
+        canonical_model, suggestions = self.catalog.resolve_model(canonical_gift, model)
+        if not canonical_model:
+            await update.message.reply_text(
+                self.format_suggestions(f"{canonical_gift} - {model}", suggestions)
+            )
+            return None
 
-        except Exception as e:
-            await update.message.reply_text(f"❌ Помилка: {str(e)}")
+        return canonical_gift, canonical_model
 
     async def cmd_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /list command - show monitored pairs."""
@@ -313,11 +489,17 @@ class NFTMonitorBot:
 
 🎁 Відстежувані пари ({len(combinations)}):
 """
+        priorities = self.config.get_priorities()
         for i, (gift, model) in enumerate(combinations, 1):
-            text += f"{i}. {gift} + {model}\n"
+            tier = priorities.get((gift, model))
+            text += f"{i}. {gift} + {model}" + (f" [{TIER_LABELS[tier]}]" if tier != 'normal' else "") + "\n"
 
         text += f"\n💰 Макс. ціна: {max_price} TON"
+        text += f"\n📊 Мін. знижка до справедливої ціни: {self.config.get_min_discount()}%"
+        for pair, percent in self.config.get_discount_rules().items():
+            text += f"\n   • {pair.replace('|', ' + ')}: {percent}%"
         text += f"\n⏱ Інтервал перевірки: {interval} хв"
+        text += f"\n🔎 Режим мінімальної ціни: {'увімкнено' if self.config.is_probe_mode() else 'вимкнено'}"
         text += f"\n📊 Статус: {'✅ Активний' if self.config.is_monitoring_enabled() else '⏸️ На паузі'}"
 
         await update.message.reply_text(text)
@@ -339,7 +521,10 @@ class NFTMonitorBot:
             await update.message.reply_text("❌ Формат: /add <назва_подарунка>,<модель>")
             return
 
-        gift_name, model = parts
+        resolved = await self.resolve_pair(update, *parts)
+        if not resolved:
+            return
+        gift_name, model = resolved
 
         if self.config.add_combination(gift_name, model):
             await update.message.reply_text(
@@ -365,7 +550,20 @@ class NFTMonitorBot:
             await update.message.reply_text("❌ Формат: /delete <назва_подарунка>,<модель>")
             return
 
+        # Match the watchlist ignoring case before consulting the catalog
         gift_name, model = parts
+        existing = next(
+            (c for c in self.config.get_wanted_combinations()
+             if c[0].lower() == gift_name.lower() and c[1].lower() == model.lower()),
+            None
+        )
+        if existing:
+            gift_name, model = existing
+        else:
+            resolved = await self.resolve_pair(update, gift_name, model)
+            if not resolved:
+                return
+            gift_name, model = resolved
 
         if self.config.remove_combination(gift_name, model):
             await update.message.reply_text(
@@ -419,6 +617,184 @@ class NFTMonitorBot:
         except ValueError:
             await update.message.reply_text("❌ Невірне число")
 
+    async def cmd_probe(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /probe command - toggle floor probe mode."""
+        if not context.args or context.args[0].lower() not in ("on", "off"):
+            current = "увімкнено" if self.config.is_probe_mode() else "вимкнено"
+            await update.message.reply_text(
+                f"Режим перевірки мінімальної ціни: {current}\n\n"
+                f"Використання: /probe on|off\n"
+                f"У цьому режимі бот спершу запитує лише найдешевший лот кожної пари "
+                f"і завантажує повний список тільки якщо цей лот змінився з минулої перевірки."
+            )
+            return
+
+        enabled = context.args[0].lower() == "on"
+        self.config.set_probe_mode(enabled)
+        await update.message.reply_text(
+            "✅ Режим перевірки мінімальної ціни увімкнено" if enabled
+            else "✅ Режим перевірки мінімальної ціни вимкнено"
+        )
+
+    async def cmd_alerts(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /alerts command - choose which snapshot events are announced."""
+        if not context.args:
+            enabled = self.config.get_alert_events()
+            lines = "\n".join(
+                f"{'✅' if kind in enabled else '▫️'} {kind} - {EVENT_LABELS[kind]}"
+                for kind in EVENT_TYPES
+            )
+            await update.message.reply_text(
+                f"🔔 Типи сповіщень:\n{lines}\n\n"
+                f"Використання: /alerts <тип>,<тип>...\n"
+                f"Приклад: /alerts new,price_drop"
+            )
+            return
+
+        events = [e.strip().lower() for e in ' '.join(context.args).split(',') if e.strip()]
+        unknown = [e for e in events if e not in EVENT_TYPES]
+        if unknown or not events:
+            await update.message.reply_text(
+                f"❌ Невідомі типи: {', '.join(unknown) or '—'}\n"
+                f"Доступні: {', '.join(EVENT_TYPES)}"
+            )
+            return
+
+        self.config.set_alert_events(events)
+        await update.message.reply_text(
+            "✅ Сповіщення: " + ", ".join(EVENT_LABELS[e] for e in events)
+        )
+
+    async def cmd_discount(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /discount command - minimum discount to fair value for alerts."""
+        if not context.args:
+            await update.message.reply_text(
+                f"Поточна мін. знижка: {self.config.get_min_discount()}%\n\n"
+                f"Використання: /discount <відсоток> [<назва_подарунка>,<модель>]\n"
+                f"Приклад: /discount 20\n"
+                f"Приклад: /discount 30 Ionic Dryer,Love Burst"
+            )
+            return
+
+        try:
+            percent = int(context.args[0].rstrip('%'))
+        except ValueError:
+            await update.message.reply_text("❌ Невірний відсоток. Використовуйте число.")
+            return
+        if not 0 <= percent < 100:
+            await update.message.reply_text("❌ Відсоток має бути від 0 до 99")
+            return
+
+        if len(context.args) == 1:
+            self.config.set_min_discount(percent)
+            await update.message.reply_text(f"✅ Мін. знижку встановлено: {percent}%")
+            return
+
+        parts = [p.strip() for p in ' '.join(context.args[1:]).split(',')]
+        if len(parts) != 2:
+            await update.message.reply_text("❌ Формат: /discount <відсоток> <назва_подарунка>,<модель>")
+            return
+        resolved = await self.resolve_pair(update, *parts)
+        if not resolved:
+            return
+        gift_name, model = resolved
+        self.config.set_min_discount(percent, gift_name, model)
+        await update.message.reply_text(f"✅ Мін. знижка для {gift_name} + {model}: {percent}%")
+
+    async def cmd_dashboard(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /dashboard command - pinned status message for this chat."""
+        chat_id = str(update.effective_chat.id)
+        dashboards = self.config.get_dashboards()
+        mode = context.args[0].lower() if context.args else ''
+
+        if mode == 'off':
+            if chat_id not in dashboards:
+                await update.message.reply_text("⚠️ Панель у цьому чаті не увімкнена")
+                return
+            try:
+                await context.bot.unpin_chat_message(chat_id=chat_id, message_id=dashboards[chat_id])
+            except Exception as e:
+                print(f"Не вдалося відкріпити панель: {e}")
+            self.config.set_dashboard(chat_id, None)
+            await update.message.reply_text("✅ Панель вимкнено")
+            return
+
+        if mode != 'on':
+            state = 'увімкнена' if chat_id in dashboards else 'вимкнена'
+            await update.message.reply_text(
+                f"📌 Панель у цьому чаті: {state}\n\n"
+                f"Використання: /dashboard on|off"
+            )
+            return
+
+        stats, health = self.dashboard_state()
+        text = self.dashboard.render(stats, health)
+        message = await update.message.reply_text(text)
+        try:
+            await context.bot.pin_chat_message(
+                chat_id=chat_id, message_id=message.message_id, disable_notification=True
+            )
+        except Exception as e:
+            print(f"Не вдалося закріпити панель: {e}")
+        self.config.set_dashboard(chat_id, message.message_id)
+        self.dashboard.mark_sent(chat_id, text, stats)
+
+    async def cmd_delivery(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /delivery command - instant alerts or digests per destination."""
+        destinations = self.destinations()
+        if not context.args:
+            lines = "\n".join(f"• {chat_id}: {describe_mode(mode)}" for chat_id, mode in destinations.items())
+            await update.message.reply_text(
+                f"🗞 Режими доставки:\n{lines}\n\n"
+                f"Використання: /delivery [<chat_id>] instant | batch <хв> | daily <ГГ:ХХ>\n"
+                f"Приклад: /delivery batch 30"
+            )
+            return
+
+        chat_id = str(self.channel_id)
+        args = list(context.args)
+        if args[0].lower() not in ('instant', 'batch', 'daily') and len(args) > 1:
+            chat_id = args.pop(0)
+
+        mode = parse_mode(' '.join(args))
+        if not mode:
+            await update.message.reply_text(
+                "❌ Режим: instant, batch <хвилини> або daily <ГГ:ХХ>"
+            )
+            return
+
+        self.config.set_delivery_mode(chat_id, mode)
+        await update.message.reply_text(f"✅ {chat_id}: {describe_mode(mode)}")
+
+    async def cmd_priority(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /priority command - polling tier of a pair."""
+        if len(context.args) < 2 or context.args[0].lower() not in TIERS:
+            await update.message.reply_text(
+                "Використання: /priority hot|normal|low <назва_подарунка>,<модель>\n"
+                "Приклад: /priority hot Ionic Dryer,Love Burst"
+            )
+            return
+
+        tier = context.args[0].lower()
+        parts = [p.strip() for p in ' '.join(context.args[1:]).split(',')]
+        if len(parts) != 2:
+            await update.message.reply_text("❌ Формат: /priority <рівень> <назва_подарунка>,<модель>")
+            return
+        resolved = await self.resolve_pair(update, *parts)
+        if not resolved:
+            return
+        gift_name, model = resolved
+        if (gift_name, model) not in self.config.get_wanted_combinations():
+            await update.message.reply_text("⚠️ Пару не знайдено. Спершу додайте її через /add")
+            return
+
+        self.config.set_priority(gift_name, model, tier)
+        text = f"✅ Пріоритет {gift_name} + {model}: {TIER_LABELS[tier]}"
+        if tier == HOT:
+            hot_count = sum(1 for t in self.config.get_priorities().values() if t == HOT)
+            text += f"\nМінімальна ціна перевіряється кожні {self.tiers.fast_lane_interval(hot_count):.0f} с"
+        await update.message.reply_text(text)
+
     async def cmd_pause(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /pause command."""
         if not self.config.is_monitoring_enabled():
@@ -440,18 +816,50 @@ class NFTMonitorBot:
     async def cmd_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /stats command."""
         stats = self.config.get_statistics()
+        drift = stats.get('last_check_drift')
+        duration = stats.get('last_check_duration')
+        duration_text = f"{duration} с" if duration is not None else '—'
+        scope_limit = stats.get('scope_limit')
+        total_pairs = len(self.config.get_wanted_combinations())
+        scope_text = f"{min(scope_limit, total_pairs)}/{total_pairs}" if scope_limit else 'всі'
+        if drift:
+            shifts = drift['shifted_right'] + drift['shifted_left'] + drift['gaps']
+            drift_text = f"{shifts} зсувів, {drift['duplicates']} повторів відкинуто"
+        else:
+            drift_text = '—'
+        latency = stats.get('tier_latency') or {}
+        latency_text = "".join(
+            f"\n   • {TIER_LABELS[tier]}: ~{latency[tier]['p50_s']:g} с (макс. {latency[tier]['max_s']:g} с, "
+            f"{latency[tier]['detections']} лотів)"
+            for tier in TIERS if tier in latency
+        ) or ' —'
+        abandoned = stats.get('abandoned_requests') or {'total': 0, 'running': 0}
+        startup = stats.get('startup') or {}
+        startup_text = "".join(
+            f"\n   • {label}: {startup[mode].get('startup_ms', '—')} мс, перша перевірка "
+            f"{startup[mode].get('first_check_s', '—')} с ({startup[mode].get('first_check_requests', '—')} запитів)"
+            for mode, label in (("warm", "теплий"), ("cold", "холодний")) if mode in startup
+        ) or ' —'
 
         text = f"""📊 Статистика бота
 
 🔍 Всього перевірок: {stats['total_checks']}
 🆕 Знайдено нових подарунків: {stats['total_new_gifts_found']}
 🕐 Остання перевірка: {stats['last_check_time'] or 'Ніколи'}
+📡 Запитів до API за останню перевірку: {stats.get('last_check_requests', '—')}
+🔀 Зсув видачі під час перевірки: {drift_text}
+⏱ Тривалість останньої перевірки: {duration_text} (перевищень бюджету: {stats.get('overruns', 0)})
+🎯 Пар за одну перевірку: {scope_text}
+🧵 Завислих запитів до Portals: {abandoned['total']} (потоків ще зайнято: {abandoned['running']})
+⚡ Час виявлення нових лотів за пріоритетом:{latency_text}
+🚀 Останній запуск:{startup_text}
 
 ⚙️ Поточні налаштування:
 💰 Макс. ціна: {self.config.get_max_price()} TON
 ⏱ Інтервал: {self.config.get_check_interval()} хв
 📋 Відстежуваних пар: {len(self.config.get_wanted_combinations())}
-📊 Статус: {'✅ Активний' if self.config.is_monitoring_enabled() else '⏸️ На паузі'}"""
+📊 Статус: {'✅ Активний' if self.config.is_monitoring_enabled() else '⏸️ На паузі'}
+👑 Роль інстансу: {'лідер' if self.lease.is_leader else 'резерв'}"""
 
         await update.message.reply_text(text)
 
@@ -479,33 +887,29 @@ class NFTMonitorBot:
             await update.message.reply_text("❌ Невірний номер подарунка")
             return
 
-        # Search for the gift
-        await update.message.reply_text("🔍 Шукаю...")
-
         try:
-            combinations = self.config.get_wanted_combinations()
-            # Search without price limit for /image command
-            max_price = 999999
-            gifts = await self.searcher.search_gifts(combinations, max_price)
-
-            # Find matching gift
-            for gift in gifts:
-                if (gift.get('name', '').lower() == gift_name.lower() and
-                    gift.get('external_collection_number') == number):
-
-                    info = self.searcher.format_gift_info(gift)
-                    caption = await self.searcher.format_gift_caption(info)
-
-                    if info['photo_url']:
-                        await update.message.reply_photo(
-                            photo=info['photo_url'],
-                            caption=caption
-                        )
-                    else:
-                        await update.message.reply_text(
-                            f"📋 {caption}\n\n❌ Зображення недоступне"
-                        )
-                    return
+            # Resolve from the local index; a miss or a listing not seen for
+            # a check interval (it may be sold) goes to the marketplace
+            max_age = self.config.get_check_interval() * 60
+            gift = self.searcher.index.lookup(gift_name, number, max_age)
+            if not gift:
+                await update.message.reply_text("🔍 Шукаю...")
+                gift = await self.searcher.find_gift(gift_name, number, max_age=max_age)
+
+            if gift:
+                info = self.searcher.format_gift_info(gift)
+                caption = await self.searcher.format_gift_caption(info)
+
+                if info['photo_url']:
+                    await update.message.reply_photo(
+                        photo=info['photo_url'],
+                        caption=caption
+                    )
+                else:
+                    await update.message.reply_text(
+                        f"📋 {caption}\n\n❌ Зображення недоступне"
+                    )
+                return
 
             await update.message.reply_text(
                 f"❌ Подарунок не знайдено: {gift_name} #{number}"
@@ -519,90 +923,786 @@ class NFTMonitorBot:
         if not self.config.is_monitoring_enabled():
             return
 
+        budget = CycleBudget(self.config.get_check_interval() * 60 * CYCLE_BUDGET_FRACTION)
+        with span("check_and_notify", budget_s=round(budget.seconds)) as cycle:
+            await self.run_cycle(cycle, budget)
+
+    async def run_cycle(self, cycle, budget: CycleBudget):
+        """
+        Run one monitoring cycle inside its trace span.
+
+        Searching is cancelled at the budget's deadline (minus a reserve for
+        sending); whatever was fetched by then is diffed and notified, and
+        combinations that were not fully swept are left for the next cycle.
+        """
+        reserve = budget.seconds * DISPATCH_RESERVE_FRACTION
+        scope = []
+        swept = set()
+        event_combos = set()
+        requests_before = self.searcher.request_count
         try:
             combinations = self.config.get_wanted_combinations()
             max_price = self.config.get_max_price()
-
-            # Search for gifts
-            gifts = await self.searcher.search_gifts(combinations, max_price)
+            priorities = self.config.get_priorities()
+            due, waiting = self.tiers.sweep_due(
+                combinations, priorities, self.config.get_check_interval() * 60
+            )
+            scope, deferred = self.scope.plan(due, self.tiers.ranks(priorities))
+            cycle.set(scope=len(scope), deferred=len(deferred), low_waiting=len(waiting))
+            started = time.time()
+            # Combinations whose under-cap listings are fully known after this cycle
+            covered = set(scope)
+            search_scope = scope
+            # Probed pairs whose floor matches the known state (not fetched)
+            unchanged = set()
+
+            warm_first_cycle = self.first_cycle_pending and self.start_mode == "warm"
+            if self.config.is_probe_mode() or warm_first_cycle:
+                # One cheap floor request per combination; full fetch only where the floor changed
+                floors = {}
+
+                async def probe():
+                    floors.update(await self.searcher.probe_floors(scope))
+
+                with span("probe_floors", combinations=len(scope)) as probe_span:
+                    probe_span.set(timed_out=not await budget.run(probe(), reserve))
+                    search_scope = self.floor_changes(floors, max_price)
+                    probe_span.set(changed=len(search_scope))
+                unchanged = set(floors) - set(search_scope)
+                # Unchanged pairs with nothing under the cap are covered as empty
+                # (other markets are still searched for every pair)
+                covered = set(search_scope) | {
+                    combo for combo in unchanged
+                    if not floors[combo] or float(floors[combo].get('price', 999999)) > max_price
+                }
+
+            gifts = []
+            sweep_status = {}
+            with span("search", combinations=len(search_scope)) as search_span:
+                finished = await budget.run(
+                    self.search_combinations(search_scope, max_price, gifts, sweep_status, scope,
+                                             budget.deadline - reserve),
+                    reserve
+                )
+                search_span.set(gifts=len(gifts), complete=sweep_status.get('complete'),
+                                drift=sweep_status.get('drift'), timed_out=not finished)
+            if not finished or not sweep_status.get('complete'):
+                covered -= set(search_scope)
+            swept = covered | unchanged
 
             # Update statistics
             self.config.increment_check_count()
             self.config.update_last_check_time(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            self.config.update_last_check_requests(self.searcher.request_count - requests_before)
+            self.config.update_last_check_drift(sweep_status.get('drift'))
+            self.config.update_abandoned_requests(
+                self.searcher.abandoned_total, self.searcher.abandoned_running
+            )
+            cycle.set(requests=self.searcher.request_count - requests_before,
+                      abandoned_threads=self.searcher.abandoned_running)
 
-            if not gifts:
-                return
-
-            # Filter out already seen gifts
-            seen_ids = self.config.get_seen_gift_ids()
-            new_gifts = [g for g in gifts if g.get('id') not in seen_ids]
-
-            if not new_gifts:
-                return
-
-            # Sort by price
-            new_gifts.sort(key=lambda x: float(x.get('price', 999999)))
-
-            # Update statistics
-            self.config.add_new_gifts_found(len(new_gifts))
+            events = await self.apply_sweep(
+                gifts, covered, sweep_status, started, combinations, max_price, priorities
+            )
+            self.tiers.record((), unchanged - covered, priorities, started, applied=False)
+            event_combos = {(e.name, e.model) for e in events}
 
-            # Send notifications
+        except Exception as e:
+            print(f"Помилка в check_and_notify: {e}")
             await self.app.bot.send_message(
                 chat_id=self.channel_id,
-                text=f"🆕 Знайдено {len(new_gifts)} нових подарунків!"
+                text=f"⚠️ Помилка під час перевірки: {str(e)}"
             )
 
-            # Send each gift as separate message with photo
-            for gift in new_gifts:
-                info = self.searcher.format_gift_info(gift)
-                caption = await self.searcher.format_gift_caption(info)
+        await self.dispatch_outbox(budget.deadline)
+
+        overran = budget.timed_out or budget.used() > 1
+        self.scope.record(budget, scope, swept, event_combos)
+        self.config.update_last_check_duration(budget.elapsed(), overran, self.scope.limit)
+        cycle.set(overrun=overran, next_scope=self.scope.limit)
+        if self.first_cycle_pending:
+            # Warm and cold starts are kept apart, so each is compared with the other
+            self.first_cycle_pending = False
+            self.config.update_startup_timing(self.start_mode, {
+                'first_check_s': round(budget.elapsed(), 1),
+                'first_check_requests': self.searcher.request_count - requests_before,
+            })
+        if overran:
+            print(f"⏱ Перевірка перевищила бюджет {budget.seconds:.0f} с "
+                  f"({budget.elapsed():.0f} с), наступна перевірить {self.scope.limit} пар")
 
-                if info['photo_url']:
-                    await self.app.bot.send_photo(
-                        chat_id=self.channel_id,
-                        photo=info['photo_url'],
-                        caption=caption
-                    )
-                else:
-                    await self.app.bot.send_message(
-                        chat_id=self.channel_id,
-                        text=caption
-                    )
+        try:
+            await self.update_dashboards()
+        except Exception as e:
+            print(f"Помилка оновлення панелей: {e}")
+
+    async def apply_sweep(self, gifts: list, covered: set, sweep_status: dict, started: float,
+                          combinations: list, max_price: int, priorities: dict) -> list:
+        """
+        Merge a sweep into the snapshot, diff it and queue alerts.
+
+        Cycles and the fast lane sweep concurrently, so a combination that a
+        sweep started later has already applied is dropped from this one:
+        older results never overwrite newer ones.
+
+        Args:
+            gifts: Listings the sweep fetched
+            covered: Combinations it fetched completely
+            sweep_status: search_combinations() status
+            started: When the sweep started
+            combinations: All watched combinations
+            max_price: Price cap of the sweep
+            priorities: Tier per combination
+
+        Returns:
+            Snapshot events
+        """
+        async with self.sweep_lock:
+            newer = self.tiers.newer_than(started)
+            if newer:
+                gifts = [g for g in gifts if (g.get('name'), listing_model(g)) not in newer]
+                covered = covered - newer
+            # Other markets whose listings can't be trusted as a full picture
+            fetched = sweep_status.get('markets', {})
+            incomplete_markets = {
+                name for name in self.markets.names if name != PORTALS and not fetched.get(name)
+            }
+            match_offers(gifts)
+
+            self.searcher.last_snapshot = self.merge_snapshot(
+                gifts, covered, combinations, incomplete_markets
+            )
+            self.warm_state.save_snapshot(self.searcher.last_snapshot)
+            self.catalog.learn(gifts)
+            if self.archive:
+                with span("archive", rows=len(gifts)):
+                    self.archive.append(gifts)
+
+            with span("valuation") as value_span:
+                self.valuation.annotate(gifts)
+                value_span.set(collections=len(self.valuation.coefficients))
+
+            with span("diff") as diff_span:
+                events = self.differ.diff(gifts, covered, max_price, incomplete_markets)
+                events += await self.confirm_missing(max_price)
+                self.differ.save()
+                diff_span.set(events=len(events))
+            self.tiers.record(events, covered, priorities, started)
+            if events:
+                self.config.update_tier_latency(self.tiers.report())
+                with span("enqueue", events=len(events)):
+                    await self.enqueue_events(events)
+            return events
+
+    async def confirm_missing(self, max_price: int) -> list:
+        """
+        Settle listings missing from a covered sweep: sold, or repriced above the cap.
+
+        Portals listings are looked up above the cap; other markets can't be
+        looked up that way, so theirs are forgotten after a few sweeps.
+        """
+        missing = self.differ.unconfirmed()
+        if not missing:
+            return []
+        portals_missing = {}
+        for combo, ids in missing.items():
+            ids = [gift_id for gift_id in ids if ':' not in gift_id]
+            if ids:
+                portals_missing[combo] = ids
+        try:
+            found = await self.searcher.find_repriced(portals_missing, max_price) if portals_missing else {}
+        except Exception as e:
+            print(f"Помилка перевірки зниклих лотів: {e}")
+            found = {}
+        events = self.differ.confirm(found)
+        self.valuation.annotate([e.gift for e in events if e.gift])
+        return events
+
+    async def fast_lane(self, context: ContextTypes.DEFAULT_TYPE = None):
+        """
+        Probe the floor of every hot pair and sweep the ones that changed.
+
+        One limit=1 request per hot pair through the shared Portals rate
+        limiter; a pair is swept (and alerted on right away) only when its
+        floor listing is unknown, repriced, or no longer the known cheapest.
+        """
+        if not self.lease.is_leader or not self.config.is_monitoring_enabled() or self.fast_lane_running:
+            return
+        priorities = self.config.get_priorities()
+        hot = [combo for combo, tier in priorities.items() if tier == HOT]
+        if not self.tiers.fast_lane_due(len(hot)):
+            return
 
-                await asyncio.sleep(0.5)  # Small delay between messages
+        self.fast_lane_running = True
+        self.tiers.last_fast_lane = time.time()
+        try:
+            with span("fast_lane", combinations=len(hot)) as lane:
+                started = time.time()
+                max_price = self.config.get_max_price()
+                floors = await self.searcher.probe_floors(hot)
+                changed = self.floor_changes(floors, max_price)
+                self.tiers.record((), set(floors) - set(changed), priorities, started, applied=False)
+                lane.set(probed=len(floors), changed=len(changed))
+                if not changed:
+                    return
 
-            # Mark gifts as seen
-            new_gift_ids = [g.get('id') for g in new_gifts]
-            self.config.mark_gifts_as_seen(new_gift_ids)
+                gifts = []
+                sweep_status = {}
+                with span("search", combinations=len(changed)) as search_span:
+                    await self.search_combinations(changed, max_price, gifts, sweep_status)
+                    search_span.set(gifts=len(gifts), complete=sweep_status.get('complete'))
+                covered = set(changed) if sweep_status.get('complete') else set()
+                events = await self.apply_sweep(
+                    gifts, covered, sweep_status, started,
+                    self.config.get_wanted_combinations(), max_price, priorities
+                )
+                lane.set(events=len(events))
+            if events:
+                await self.dispatch_outbox()
+        except Exception as e:
+            print(f"Помилка швидкої перевірки: {e}")
+        finally:
+            self.fast_lane_running = False
+
+    def floor_changes(self, floors: dict, max_price: int) -> list:
+        """
+        Pairs whose probed floor doesn't match the known state: a floor listing
+        that is new or repriced, or a known cheaper listing that is gone.
+        """
+        cheapest = {}
+        for gift_id, (price, _, name, model, _) in self.differ.state.items():
+            combo = (name, model)
+            # Unconfirmed listings are being settled by the sweeps
+            if gift_id in self.differ.missing:
+                continue
+            if combo in floors and ':' not in gift_id and price <= max_price:
+                cheapest[combo] = min(price, cheapest.get(combo, price))
+
+        changed = []
+        for combo, floor in floors.items():
+            known = cheapest.get(combo)
+            if floor and float(floor.get('price', 999999)) <= max_price:
+                price = float(floor['price'])
+                prev = self.differ.state.get(floor.get('id'))
+                if prev is None or prev[0] != price or (known is not None and known < price):
+                    changed.append(combo)
+            elif known is not None:
+                changed.append(combo)
+        return changed
+
+    def dashboard_state(self) -> tuple:
+        """Dashboard stats and health from the latest snapshot and statistics."""
+        stats = self.config.get_statistics()
+        return (
+            combination_stats(self.searcher.last_snapshot, self.config.get_wanted_combinations()),
+            {
+                'status': '✅ Активний' if self.config.is_monitoring_enabled() else '⏸️ На паузі',
+                'last_check_time': stats['last_check_time'],
+                'duration': stats.get('last_check_duration', '—'),
+                'overruns': stats.get('overruns', 0),
+                'max_price': self.config.get_max_price(),
+                'outbox_pending': self.outbox.pending_count(),
+            }
+        )
 
+    async def update_dashboards(self):
+        """Edit the pinned dashboards after a cycle (unchanged ones are skipped)."""
+        dashboards = self.config.get_dashboards()
+        if not dashboards:
+            return
+        with span("dashboard", chats=len(dashboards)) as dashboard_span:
+            edits = self.dashboard.edits
+            gone = await self.dashboard.publish(self.app.bot, dashboards, *self.dashboard_state())
+            for chat_id in gone:
+                self.config.set_dashboard(chat_id, None)
+            dashboard_span.set(edits=self.dashboard.edits - edits, removed=len(gone))
+
+    async def refit_valuation(self, context: ContextTypes.DEFAULT_TYPE = None):
+        """
+        Refit fair values on a fresh uncapped sample of the watched collections.
+
+        Until the first sample, listings have no estimate and the discount
+        gate lets everything through.
+        """
+        if not self.lease.is_leader:
+            return
+        names = sorted({name for name, _ in self.config.get_wanted_combinations()})
+        if not names:
+            return
+        try:
+            with span("valuation.sample", collections=len(names)) as sample_span:
+                sample = await self.searcher.sample_listings(names, self.valuation_pages)
+                if sample:
+                    await asyncio.to_thread(self.valuation.fit, sample)
+                sample_span.set(listings=len(sample), fitted=len(self.valuation.coefficients))
         except Exception as e:
-            print(f"Помилка в check_and_notify: {e}")
-            await self.app.bot.send_message(
-                chat_id=self.channel_id,
-                text=f"⚠️ Помилка під час перевірки: {str(e)}"
+            print(f"Помилка оцінки справедливої ціни: {e}")
+
+    def meets_discount(self, event) -> bool:
+        """Whether a new listing or price drop passes the pair's minimum discount."""
+        if event.kind not in (NEW_LISTING, PRICE_DROP) or not event.gift:
+            return True
+        required = self.config.get_min_discount(event.name, event.model)
+        discount = event.gift.get('discount')
+        # Without an estimate the listing can't be judged, so it isn't held back
+        return not required or discount is None or discount * 100 >= required
+
+    def merge_snapshot(self, gifts: list, covered: set, combinations: list,
+                       incomplete_markets: set = frozenset()) -> list:
+        """Replace snapshot listings of fully swept combinations, keep the rest."""
+        fresh_ids = {gift.get('id') for gift in gifts}
+        watched = set(combinations)
+        kept = [
+            gift for gift in self.searcher.last_snapshot
+            if gift.get('id') not in fresh_ids
+            and (gift.get('name'), listing_model(gift)) in watched
+            and ((gift.get('name'), listing_model(gift)) not in covered
+                 or gift.get('market', PORTALS) in incomplete_markets)
+        ]
+        return gifts + kept
+
+    async def search_combinations(self, combinations: list, max_price: int,
+                                  gifts: list, sweep_status: dict = None,
+                                  market_scope: list = None, deadline: float = None):
+        """
+        Search for gifts on every enabled market.
+
+        Portals is searched for combinations (sharded across workers if
+        configured), the other markets for market_scope, since the Portals
+        floor probe says nothing about their prices.
+
+        Matches are appended to gifts as they arrive, so a cancelled search
+        keeps what it found. deadline (time.monotonic()) bounds the wait
+        for shard workers.
+        """
+        if sweep_status is None:
+            sweep_status = {}
+        market_scope = combinations if market_scope is None else market_scope
+        if not combinations and not market_scope:
+            sweep_status['complete'] = True
+            return
+
+        portals_scope = combinations
+        tasks = []
+        # Sweep status of the sharded Portals search, if sharded
+        shard_status = None
+        if self.coordinator:
+            portals_scope = []
+            shard_status = {'complete': not combinations}
+
+            async def sharded():
+                if combinations:
+                    gifts.extend(await self.coordinator.search_gifts(
+                        combinations, max_price, deadline, shard_status
+                    ))
+
+            tasks.append(sharded())
+
+        statuses = {}
+        tasks.insert(0, self.markets.search(
+            market_scope, max_price, gifts, MAX_PAGES, wanted_by_market={PORTALS: portals_scope},
+            statuses=statuses
+        ))
+        markets = (await asyncio.gather(*tasks))[0]
+
+        sweep_status['markets'] = markets
+        if shard_status is None:
+            sweep_status['drift'] = statuses[PORTALS].get('drift')
+            sweep_status['complete'] = markets.get(PORTALS, False)
+        else:
+            sweep_status['drift'] = shard_status.get('drift')
+            sweep_status['complete'] = bool(shard_status.get('complete'))
+
+    async def enqueue_events(self, events: list):
+        """Durably queue notifications for snapshot events enabled in alerts."""
+        # The lease can be lost while a cycle runs; the new leader alerts instead
+        if not self.lease.is_leader:
+            print(f"👑 Lease втрачено під час перевірки, {len(events)} подій не поставлено в чергу")
+            return
+        enabled = set(self.config.get_alert_events())
+        seen_ids = self.config.get_seen_gift_ids()
+        destinations = self.destinations()
+
+        # Buffered digest listings follow every reprice and removal, alerted or not
+        for chat_id, mode in destinations.items():
+            if mode != INSTANT:
+                self.digests.add(chat_id, events, insert=False)
+
+        # A listing back under the cap after a repricing above it is as good as new
+        max_price = self.config.get_max_price()
+
+        def wanted(e):
+            # A gift on several markets is alerted on its cheapest offer, listing the others
+            if e.kind in (NEW_LISTING, PRICE_DROP) and e.gift and e.gift.get('best_offer') is False:
+                return False
+            if e.kind == PRICE_DROP and NEW_LISTING in enabled and e.old_price > max_price:
+                return True
+            # New listings are only announced once, even if they reappear
+            return e.kind in enabled and not (e.kind == NEW_LISTING and e.gift_id in seen_ids)
+
+        events = [e for e in events if wanted(e) and self.meets_discount(e)]
+        if not events:
+            return
+
+        # Biggest discount to fair value first, then by price (removals last)
+        def rank(e):
+            discount = (e.gift or {}).get('discount')
+            return (e.kind == REMOVED, discount is None, -(discount or 0),
+                    e.price if e.price is not None else e.old_price)
+
+        events.sort(key=rank)
+
+        counts = {}
+        for event in events:
+            counts[event.kind] = counts.get(event.kind, 0) + 1
+
+        if set(counts) == {NEW_LISTING}:
+            header = f"🆕 Знайдено {counts[NEW_LISTING]} нових подарунків!"
+        else:
+            header = "🔔 Зміни на маркетплейсі: " + ", ".join(
+                f"{EVENT_LABELS[kind]}: {count}" for kind, count in counts.items()
             )
 
+        added = 0
+        instant_items = None
+        for chat_id, mode in destinations.items():
+            if mode != INSTANT:
+                # Digest destinations collect events until their next summary
+                added = max(added, self.digests.add(chat_id, events))
+                continue
+            if instant_items is None:
+                instant_items = await self.render_instant(header, events)
+            burst, items = instant_items
+            stored = self.outbox.enqueue_batch(chat_id, None if burst else header, items)
+            added = max(added, (len(events) if stored else 0) if burst else stored)
+
+        # The outbox and digest buffer own delivery from here, so the gifts can be marked seen
+        new_ids = [e.gift_id for e in events if e.kind == NEW_LISTING]
+        if new_ids:
+            self.config.mark_gifts_as_seen(new_ids)
+            self.config.add_new_gifts_found(min(added, len(new_ids)))
+
+    async def render_instant(self, header: str, events: list):
+        """
+        Build outbox items for instant delivery.
+
+        Returns:
+            (whether the items are a collage burst, items)
+        """
+        # A large burst goes out as one collage plus the full list
+        if sum(1 for e in events if e.gift and e.gift.get('photo_url')) >= COLLAGE_MIN_BURST:
+            try:
+                with span("render_burst", events=len(events)):
+                    items = await self.render_burst(header, events)
+                if items:
+                    return True, items
+            except Exception as e:
+                print(f"Помилка створення колажу: {e}")
+        return False, [await self.render_event(event) for event in events]
+
+    def destinations(self) -> dict:
+        """
+        Alert destinations and their delivery modes.
+
+        The main channel is always a destination (instant unless set
+        otherwise); ALERT_DESTINATIONS adds chats as comma separated
+        chat_id=mode entries, and /delivery overrides both.
+        """
+        modes = {str(self.channel_id): INSTANT}
+        for entry in filter(None, (e.strip() for e in os.getenv('ALERT_DESTINATIONS', '').split(','))):
+            chat_id, _, mode = entry.partition('=')
+            modes[chat_id.strip()] = parse_mode(mode) or INSTANT
+        modes.update(self.config.get_delivery_modes())
+        return modes
+
+    async def flush_digests(self, context: ContextTypes.DEFAULT_TYPE = None):
+        """Move due digests from the buffer to the outbox and deliver them."""
+        if not self.lease.is_leader:
+            return
+        flushed = 0
+        for chat_id, mode in self.destinations().items():
+            if mode == INSTANT or not is_due(mode, self.digests.last_flush(chat_id)):
+                continue
+            rows = self.digests.pending(chat_id)
+            items = render_digest(rows, f"🗞 {describe_mode(mode).capitalize()}")
+            if items:
+                self.outbox.enqueue_batch(chat_id, None, items)
+                flushed += 1
+            self.digests.complete(chat_id, rows)
+        if flushed:
+            await self.dispatch_outbox()
+
+    @staticmethod
+    def event_key(event) -> str:
+        """Outbox dedup key of a snapshot event."""
+        if event.kind == REMOVED:
+            return f"removed:{event.gift_id}:{event.old_price}"
+        if event.kind == NEW_LISTING:
+            return f"gift:{event.gift_id}"
+        return f"{event.kind}:{event.gift_id}:{event.price}"
+
+    async def render_event(self, event) -> dict:
+        """Build the outbox item for a snapshot event."""
+        key = self.event_key(event)
+        if event.kind == REMOVED:
+            return {
+                'key': key,
+                'text': f"❌ Продано або знято з продажу: {event.name} #{event.number}\n"
+                        f"💰 Остання ціна: {event.old_price} TON",
+            }
+
+        with span("render_caption", gift_id=event.gift_id):
+            info = self.searcher.format_gift_info(event.gift)
+            caption = await self.searcher.format_gift_caption(info)
+
+        if event.kind != NEW_LISTING:
+            arrow = "📉 Ціна знизилась" if event.kind == PRICE_DROP else "📈 Ціна зросла"
+            caption = f"{arrow}: {event.old_price} → {info['price']} TON\n\n{caption}"
+
+        return {'key': key, 'text': caption, 'photo_url': info['photo_url'] or None}
+
+    async def render_burst(self, header: str, events: list) -> list:
+        """
+        Build outbox items for a burst: a collage of the cheapest gifts with a
+        caption, plus the full list as a follow-up if it doesn't fit.
+
+        Returns:
+            Items, or an empty list if the collage could not be rendered
+        """
+        infos = [self.searcher.format_gift_info(e.gift) for e in events if e.gift][:COLLAGE_SIZE]
+        collage = await build_collage(self.image_cache, infos)
+        if not collage:
+            return []
+
+        ton_price_uah = await self.searcher.price_fetcher.get_ton_price_uah()
+        format_price = self.searcher.price_fetcher.format_price_with_uah
+        lines = []
+        for i, event in enumerate(events, 1):
+            if event.kind == REMOVED:
+                lines.append(f"{i}. ❌ {event.name} #{event.number} ({event.old_price} TON)")
+            elif event.kind == NEW_LISTING:
+                price = event.gift.get('price', event.price)
+                discount = event.gift.get('discount')
+                lines.append(f"{i}. {event.name} #{event.number} - {format_price(price, ton_price_uah)}"
+                             + (f" ({-discount * 100:+.0f}%)" if discount is not None else ""))
+            else:
+                arrow = "📉" if event.kind == PRICE_DROP else "📈"
+                lines.append(
+                    f"{i}. {arrow} {event.name} #{event.number}: "
+                    f"{event.old_price} → {event.gift.get('price', event.price)} TON"
+                )
+
+        digest = hashlib.sha1("|".join(self.event_key(e) for e in events).encode()).hexdigest()[:16]
+        caption = f"{header}\n🖼 На колажі: {len(infos)} найдешевших\n\n"
+        full_list = "\n".join(lines)
+        if telegram_length(caption + full_list) <= CAPTION_LIMIT:
+            return [{'key': f"burst:{digest}", 'text': caption + full_list, 'photo_url': collage}]
+
+        # Caption gets the head of the list, the follow-up gets all of it
+        shown = []
+        for line in lines:
+            if telegram_length(caption + "\n".join(shown + [line])) > CAPTION_LIMIT - 40:
+                break
+            shown.append(line)
+        caption += "\n".join(shown) + f"\n… повний список ({len(lines)}) нижче"
+
+        items = [{'key': f"burst:{digest}", 'text': caption, 'photo_url': collage}]
+        chunk = ""
+        for line in lines:
+            if telegram_length(chunk + line) + 1 > MESSAGE_LIMIT:
+                items.append({'key': f"burst:{digest}:{len(items)}", 'text': chunk})
+                chunk = ""
+            chunk += line + "\n"
+        if chunk:
+            items.append({'key': f"burst:{digest}:{len(items)}", 'text': chunk})
+        return items
+
+    async def dispatch_outbox(self, deadline: float = None):
+        """Deliver pending outbox items to the channel (until deadline, if given)."""
+        # Only the lease holder sends, also if the lease is lost mid-drain
+        if not self.lease.is_leader:
+            return
+        try:
+            with span("dispatch_outbox") as dispatch_span:
+                dispatch_span.set(sent=await self.dispatcher.drain(
+                    deadline, lambda: self.lease.is_leader
+                ))
+        except Exception as e:
+            print(f"Помилка надсилання повідомлень: {e}")
+
     async def monitoring_loop(self, context: ContextTypes.DEFAULT_TYPE):
         """Periodic monitoring loop."""
+        if not self.lease.is_leader:
+            return
         await self.check_and_notify()
 
-    def run(self):
-        """Start the bot."""
-        # Schedule periodic checks
+    async def lease_heartbeat(self, context: ContextTypes.DEFAULT_TYPE):
+        """Renew the leader lease, taking over if the leader disappeared."""
+        was_leader = self.lease.is_leader
+        leader = self.lease.heartbeat()
+        if leader and not was_leader:
+            # Pick up state the previous leader saved
+            self.config.reload()
+            print(f"👑 Цей інстанс став лідером ({self.lease.holder_id})")
+            # Shard workers share task indices, so only the leader runs them
+            self.start_workers()
+            # Resume delivery exactly where the previous run stopped
+            context.application.create_task(self.dispatch_outbox())
+        elif was_leader and not leader:
+            self.stop_workers()
+
+    async def refresh_catalog(self, context: ContextTypes.DEFAULT_TYPE):
+        """Refresh the gift catalog from Portals when it gets stale (leader only)."""
+        if not self.lease.is_leader or not self.catalog.is_stale():
+            return
+        try:
+            await self.catalog.refresh(self.searcher)
+        except Exception as e:
+            print(f"Помилка оновлення каталогу: {e}")
+
+    async def on_startup(self, application: Application):
+        """Report how long startup took and record it in statistics."""
+        elapsed_ms = (time.perf_counter() - STARTUP_STARTED) * 1000
+        print(f"⚡ Запуск зайняв {elapsed_ms:.0f} мс "
+              f"(знімок: {len(self.searcher.last_snapshot)} подарунків)")
+        self.config.update_startup_timing(self.start_mode, {
+            'startup_ms': round(elapsed_ms),
+            'snapshot': len(self.searcher.last_snapshot),
+        })
+
+    def first_check_delay(self) -> float:
+        """Seconds until the first check, continuing the previous schedule if possible."""
+        if self.warm_state.saved_at is None:
+            return 1
+        interval = self.config.get_check_interval() * 60
+        since_last = time.time() - self.warm_state.saved_at
+        return max(1, interval - since_last)
+
+    def start_workers(self):
+        """Spawn shard worker processes for sharded monitoring (once)."""
+        if self.worker_count <= 0 or self.worker_processes:
+            return
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shard_workers.py")
+        for index in range(self.worker_count):
+            process = subprocess.Popen(
+                [sys.executable, script, str(index), str(self.worker_count)],
+                env={**os.environ, 'COORDINATION_DB': self.coordination_db}
+            )
+            self.worker_processes.append(process)
+        print(f"🧩 Запущено {self.worker_count} воркерів моніторингу")
+
+    def stop_workers(self):
+        """Terminate shard worker processes."""
+        for process in self.worker_processes:
+            process.terminate()
+        self.worker_processes = []
+
+    def schedule_jobs(self) -> int:
+        """Schedule lease, catalog and monitoring jobs; return the interval in minutes."""
         job_queue = self.app.job_queue
         interval = self.config.get_check_interval()
 
+        job_queue.run_repeating(
+            self.lease_heartbeat,
+            interval=self.lease.ttl / 3,
+            first=0
+        )
+
+        job_queue.run_repeating(
+            self.refresh_catalog,
+            interval=3600,
+            first=30
+        )
+
+        job_queue.run_repeating(
+            self.refit_valuation,
+            interval=self.valuation_interval,
+            first=5
+        )
+
+        job_queue.run_repeating(
+            self.flush_digests,
+            interval=60,
+            first=60
+        )
+
+        job_queue.run_repeating(
+            self.fast_lane,
+            interval=self.tiers.hot_interval,
+            first=self.tiers.hot_interval
+        )
+
         job_queue.run_repeating(
             self.monitoring_loop,
             interval=interval * 60,  # Convert minutes to seconds
-            first=10  # First check after 10 seconds
+            first=self.first_check_delay()
+        )
+        return interval
+
+    def health(self) -> dict:
+        """Extra fields for the webhook /health route."""
+        return {
+            'leader': self.lease.is_leader,
+            'monitoring': self.config.is_monitoring_enabled(),
+            'last_check_time': self.config.get_statistics()['last_check_time'],
+            'outbox_pending': self.outbox.pending_count(),
+        }
+
+    async def run_webhook(self):
+        """Serve updates through the embedded webhook server until stopped."""
+        from webhook_server import WebhookServer, derive_secret
+
+        path = os.getenv('WEBHOOK_PATH', '/telegram')
+        secret = os.getenv('WEBHOOK_SECRET') or derive_secret(self.bot_token)
+        server = WebhookServer(
+            self.app,
+            secret_token=secret,
+            path=path,
+            port=int(os.getenv('PORT', '8080')),
+            health=self.health
         )
 
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        async with self.app:
+            await self.on_startup(self.app)
+            await self.app.start()
+            await server.start()
+            try:
+                await self.app.bot.set_webhook(
+                    url=self.webhook_url.rstrip('/') + path,
+                    secret_token=secret,
+                    allowed_updates=Update.ALL_TYPES
+                )
+            except Exception as e:
+                print(f"⚠️ Не вдалося зареєструвати webhook: {e}")
+            print(f"🌐 Webhook слухає порт {server.port}, шлях {path}")
+
+            await stop.wait()
+
+            await server.stop()
+            await self.app.stop()
+
+    def run(self):
+        """Start the bot."""
+        # Schedule periodic checks (shard workers start with the lease)
+        interval = self.schedule_jobs()
+
         print(f"🤖 Бот запущено! Перевірка кожні {interval} хвилин")
         print(f"📢 Повідомлення надсилатимуться в канал: {self.channel_id}")
 
         # Start bot
-        self.app.run_polling()
+        try:
+            if self.webhook_url:
+                asyncio.run(self.run_webhook())
+            else:
+                self.app.run_polling()
+        finally:
+            self.lease.release()
+            self.stop_workers()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 """Bot configuration and data storage."""
 import json
 import os
-from typing import List, Tuple, Set
+from typing import List, Optional, Tuple, Set
 from pathlib import Path
 
 
@@ -28,6 +28,8 @@ class BotConfig:
                 "max_price": 31,
                 "check_interval_minutes": 10,
                 "monitoring_enabled": True,
+                "probe_mode": False,
+                "alert_events": ["new"],
                 "seen_gift_ids": [],
                 "statistics": {
                     "total_checks": 0,
@@ -36,6 +38,10 @@ class BotConfig:
                 }
             }
 
+    def reload(self):
+        """Reload configuration from disk."""
+        self.data = self._load_data()
+
     def save(self):
         """Save configuration to JSON file."""
         with open(self.config_file, 'w') as f:
@@ -60,6 +66,8 @@ class BotConfig:
         combo = [gift_name, model]
         if combo in self.data["wanted_combinations"]:
             self.data["wanted_combinations"].remove(combo)
+            self.data.get("pair_min_discount", {}).pop(f"{gift_name}|{model}", None)
+            self.data.get("pair_priority", {}).pop(f"{gift_name}|{model}", None)
             self.save()
             return True
         return False
@@ -94,6 +102,88 @@ class BotConfig:
         self.data["monitoring_enabled"] = enabled
         self.save()
 
+    # Floor probe mode
+    def is_probe_mode(self) -> bool:
+        """Check if floor probe mode is enabled."""
+        return self.data.get("probe_mode", False)
+
+    def set_probe_mode(self, enabled: bool):
+        """Enable or disable floor probe mode."""
+        self.data["probe_mode"] = enabled
+        self.save()
+
+    # Alert event types
+    def get_alert_events(self) -> List[str]:
+        """Get snapshot event types that trigger alerts."""
+        return self.data.get("alert_events", ["new"])
+
+    def set_alert_events(self, events: List[str]):
+        """Set snapshot event types that trigger alerts."""
+        self.data["alert_events"] = events
+        self.save()
+
+    # Minimum discount to fair value (percent, 0 = off)
+    def get_min_discount(self, gift_name: Optional[str] = None, model: Optional[str] = None) -> int:
+        """Get the minimum discount for a pair (its own rule, else the default)."""
+        rules = self.data.get("pair_min_discount", {})
+        if gift_name is not None and f"{gift_name}|{model}" in rules:
+            return rules[f"{gift_name}|{model}"]
+        return self.data.get("min_discount", 0)
+
+    def get_discount_rules(self) -> dict:
+        """Get per-pair minimum discounts keyed by 'gift|model'."""
+        return dict(self.data.get("pair_min_discount", {}))
+
+    def set_min_discount(self, percent: int, gift_name: Optional[str] = None, model: Optional[str] = None):
+        """Set the default minimum discount, or one pair's rule."""
+        if gift_name is None:
+            self.data["min_discount"] = percent
+        else:
+            self.data.setdefault("pair_min_discount", {})[f"{gift_name}|{model}"] = percent
+        self.save()
+
+    # Polling priority per pair
+    def get_priorities(self) -> dict:
+        """Get the priority tier (hot, normal or low) of every watched pair."""
+        rules = self.data.get("pair_priority", {})
+        return {
+            (gift_name, model): rules.get(f"{gift_name}|{model}", "normal")
+            for gift_name, model in self.get_wanted_combinations()
+        }
+
+    def set_priority(self, gift_name: str, model: str, tier: str):
+        """Set a pair's priority tier."""
+        rules = self.data.setdefault("pair_priority", {})
+        if tier == "normal":
+            rules.pop(f"{gift_name}|{model}", None)
+        else:
+            rules[f"{gift_name}|{model}"] = tier
+        self.save()
+
+    # Delivery mode per destination chat
+    def get_delivery_modes(self) -> dict:
+        """Get delivery modes set with /delivery, keyed by chat id."""
+        return dict(self.data.get("delivery_modes", {}))
+
+    def set_delivery_mode(self, chat_id: str, mode: str):
+        """Set a destination's delivery mode (instant, batch:N or daily:HH:MM)."""
+        self.data.setdefault("delivery_modes", {})[chat_id] = mode
+        self.save()
+
+    # Pinned dashboards
+    def get_dashboards(self) -> dict:
+        """Get dashboard message ids keyed by chat id."""
+        return dict(self.data.get("dashboards", {}))
+
+    def set_dashboard(self, chat_id: str, message_id: Optional[int]):
+        """Register a chat's dashboard message (None removes it)."""
+        dashboards = self.data.setdefault("dashboards", {})
+        if message_id is None:
+            dashboards.pop(chat_id, None)
+        else:
+            dashboards[chat_id] = message_id
+        self.save()
+
     # Seen gifts tracking
     def get_seen_gift_ids(self) -> Set[str]:
         """Get set of already seen gift IDs."""
@@ -123,6 +213,40 @@ class BotConfig:
         self.data["statistics"]["total_new_gifts_found"] += count
         self.save()
 
+    def update_last_check_requests(self, count: int):
+        """Update number of marketplace requests made by the last check."""
+        self.data["statistics"]["last_check_requests"] = count
+        self.save()
+
+    def update_last_check_drift(self, drift: Optional[dict]):
+        """Update pagination drift measured by the last check (see DriftStats)."""
+        self.data["statistics"]["last_check_drift"] = drift
+        self.save()
+
+    def update_last_check_duration(self, seconds: float, overran: bool, scope_limit: Optional[int]):
+        """Update duration, overrun count and next scope limit after a check."""
+        statistics = self.data["statistics"]
+        statistics["last_check_duration"] = round(seconds, 1)
+        statistics["scope_limit"] = scope_limit
+        if overran:
+            statistics["overruns"] = statistics.get("overruns", 0) + 1
+        self.save()
+
+    def update_abandoned_requests(self, total: int, running: int):
+        """Update Portals calls given up on (timed out or cancelled) and threads still stuck in them."""
+        self.data["statistics"]["abandoned_requests"] = {"total": total, "running": running}
+        self.save()
+
+    def update_tier_latency(self, report: dict):
+        """Update detection latency per priority tier (see TierScheduler.report)."""
+        self.data["statistics"]["tier_latency"] = report
+        self.save()
+
+    def update_startup_timing(self, mode: str, timing: dict):
+        """Update startup timing of a warm or cold start (startup_ms, first check)."""
+        self.data["statistics"].setdefault("startup", {}).setdefault(mode, {}).update(timing)
+        self.save()
+
     def update_last_check_time(self, timestamp: str):
         """Update last check timestamp."""
         self.data["statistics"]["last_check_time"] = timestamp
@@ -0,0 +1,140 @@
+"""Per-cycle time budget and adaptive monitoring scope."""
+import asyncio
+import time
+from typing import Awaitable, Dict, Iterable, List, Optional, Tuple
+
+Combo = Tuple[str, str]
+
+
+class CycleBudget:
+    """Deadline of one monitoring cycle."""
+
+    def __init__(self, seconds: float):
+        """
+        Initialize budget.
+
+        Args:
+            seconds: Time the cycle may take
+        """
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.deadline = self.started + seconds
+        self.timed_out = False
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left before the deadline minus a reserve."""
+        return max(0.0, self.deadline - reserve - time.monotonic())
+
+    def expired(self, reserve: float = 0.0) -> bool:
+        return self.remaining(reserve) <= 0
+
+    def used(self) -> float:
+        """Fraction of the budget spent so far."""
+        return self.elapsed() / self.seconds if self.seconds else 1.0
+
+    async def run(self, awaitable: Awaitable, reserve: float = 0.0) -> bool:
+        """
+        Run a coroutine until it finishes or the deadline (minus reserve) passes.
+
+        The coroutine is cancelled at the deadline; anything it stored before
+        that (for example into a list it appends to) is kept.
+
+        Returns:
+            True if it finished in time, False if it was cancelled
+        """
+        try:
+            await asyncio.wait_for(awaitable, timeout=self.remaining(reserve))
+            return True
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            return False
+
+
+class ScopeController:
+    """
+    Decides which combinations a cycle sweeps.
+
+    After an overrun the scope is halved, and it grows back a step at a
+    time while cycles finish well within their budget. Combinations are
+    taken in priority order: higher tiers first, then ones with recent
+    events, then the ones swept longest ago, so deferred combinations get
+    their turn.
+    """
+
+    def __init__(self, shrink: float = 0.5, grow_below: float = 0.5, hot_seconds: float = 3600):
+        """
+        Initialize controller.
+
+        Args:
+            shrink: Scope multiplier after an overrun
+            grow_below: Budget fraction under which the scope grows back
+            hot_seconds: How long a combination with events stays high priority
+        """
+        self.shrink = shrink
+        self.grow_below = grow_below
+        self.hot_seconds = hot_seconds
+        self.limit: Optional[int] = None  # None = every combination
+        self.overruns = 0
+        self.last_swept: Dict[Combo, float] = {}
+        self.last_event: Dict[Combo, float] = {}
+
+    def prioritize(self, combinations: Iterable[Combo],
+                   ranks: Optional[Dict[Combo, int]] = None) -> List[Combo]:
+        """
+        Order combinations by priority (stable for equal priority).
+
+        Args:
+            combinations: Combinations to order
+            ranks: Optional rank per combination (lower first), e.g. its tier,
+                applied before recent events and sweep age
+        """
+        now = time.time()
+        ordered = list(combinations)
+        ranks = ranks or {}
+
+        def key(combo):
+            hot = now - self.last_event.get(combo, 0) < self.hot_seconds
+            return (ranks.get(combo, 0), not hot,
+                    -self.last_event.get(combo, 0) if hot else self.last_swept.get(combo, 0))
+
+        return sorted(ordered, key=key)
+
+    def plan(self, combinations: Iterable[Combo],
+             ranks: Optional[Dict[Combo, int]] = None) -> Tuple[List[Combo], List[Combo]]:
+        """
+        Split combinations into this cycle's scope and deferred ones.
+
+        Returns:
+            (scope in priority order, deferred)
+        """
+        ordered = self.prioritize(combinations, ranks)
+        if self.limit is None or self.limit >= len(ordered):
+            self.limit = None
+            return ordered, []
+        return ordered[:self.limit], ordered[self.limit:]
+
+    def record(self, budget: CycleBudget, scope: List[Combo], swept: Iterable[Combo],
+               event_combos: Iterable[Combo]):
+        """
+        Update priorities and scope size after a cycle.
+
+        Args:
+            budget: The finished cycle's budget
+            scope: Combinations the cycle tried to sweep
+            swept: Combinations it swept completely
+            event_combos: Combinations that produced events
+        """
+        now = time.time()
+        for combo in swept:
+            self.last_swept[combo] = now
+        for combo in event_combos:
+            self.last_event[combo] = now
+
+        if budget.timed_out or budget.used() > 1:
+            self.overruns += 1
+            self.limit = max(1, int(len(scope) * self.shrink))
+        elif self.limit is not None and budget.used() < self.grow_below:
+            self.limit += max(1, self.limit // 4)
@@ -0,0 +1,154 @@
+"""Pinned dashboard messages edited in place after every monitoring cycle."""
+import hashlib
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from marketplaces import RateLimiter
+from telegram_text import MESSAGE_LIMIT, truncate
+
+Stats = Tuple[Optional[float], int]  # (floor price, listing count)
+
+
+def combination_stats(gifts: Iterable[dict], combinations: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Stats]:
+    """Floor price and listing count per watched combination."""
+    stats: Dict[Tuple[str, str], List] = {tuple(c): [None, 0] for c in combinations}
+    for gift in gifts:
+        model = next((a.get('value') for a in gift.get('attributes', []) if a.get('type') == 'model'), None)
+        entry = stats.get((gift.get('name'), model))
+        if entry is None:
+            continue
+        try:
+            price = float(gift.get('price', 0))
+        except (TypeError, ValueError):
+            continue
+        entry[0] = price if entry[0] is None else min(entry[0], price)
+        entry[1] += 1
+    return {combo: (floor, count) for combo, (floor, count) in stats.items()}
+
+
+class Dashboard:
+    """
+    Renders the monitoring state and keeps one pinned message per chat up to date.
+
+    An edit is skipped when the rendered text hashes the same as the last
+    one sent to that chat, and each chat is edited at most once per
+    min_interval seconds (a skipped change goes out with the next cycle).
+    Changes are shown relative to the stats of the chat's last sent edit,
+    so a skipped cycle's change is not lost. All edits share a rate limiter.
+    """
+
+    def __init__(self, min_interval: float = 60, edits_per_second: float = 1):
+        """
+        Initialize dashboard.
+
+        Args:
+            min_interval: Minimum seconds between edits of one chat's message
+            edits_per_second: Edit calls per second across all chats
+        """
+        self.min_interval = min_interval
+        self.rate_limiter = RateLimiter(edits_per_second)
+        # chat id -> (content hash, edit time) of the last successful edit
+        self.sent: Dict[str, Tuple[str, float]] = {}
+        # chat id -> stats its message shows
+        self.shown: Dict[str, Dict[Tuple[str, str], Stats]] = {}
+        self.edits = 0
+        self.skipped = 0
+
+    @staticmethod
+    def render(stats: Dict[Tuple[str, str], Stats], health: dict,
+               previous: Optional[Dict[Tuple[str, str], Stats]] = None) -> str:
+        """
+        Render the dashboard text.
+
+        Args:
+            stats: combination_stats() of the latest snapshot
+            health: status, last_check_time, duration, overruns, max_price,
+                outbox_pending
+            previous: Stats the message showed before; changes are shown
+                relative to them
+        """
+        previous = previous or {}
+        lines = ["📌 Моніторинг подарунків", ""]
+        for (name, model), (floor, count) in stats.items():
+            old_floor, old_count = previous.get((name, model), (None, None))
+            if floor is None:
+                price = f"немає ≤ {health['max_price']} TON"
+            else:
+                price = f"від {floor:g} TON"
+                if old_floor is not None and old_floor != floor:
+                    price += f" ({'📉' if floor < old_floor else '📈'} {floor - old_floor:+g})"
+            change = f" ({count - old_count:+d})" if old_count is not None and old_count != count else ""
+            lines.append(f"🎁 {name} + {model}: {price}, лотів {count}{change}")
+
+        lines += [
+            "",
+            f"📊 Статус: {health['status']}",
+            f"🕐 Остання перевірка: {health['last_check_time'] or 'Ніколи'}",
+            f"⏱ Тривалість: {health['duration']} с (перевищень бюджету: {health['overruns']})",
+            f"📬 Сповіщень у черзі: {health['outbox_pending']}",
+        ]
+        return truncate("\n".join(lines), MESSAGE_LIMIT)
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    async def publish(self, bot, messages: Dict[str, int], stats: Dict[Tuple[str, str], Stats],
+                      health: dict) -> List[str]:
+        """
+        Edit every chat's dashboard message where needed.
+
+        Args:
+            bot: telegram.Bot
+            messages: chat id -> dashboard message id
+            stats: See render()
+            health: See render()
+
+        Returns:
+            Chat ids whose message no longer exists or that removed the bot
+            (to be forgotten)
+        """
+        from telegram.error import BadRequest, Forbidden
+
+        gone = []
+        for chat_id, message_id in messages.items():
+            last_hash, last_edit = self.sent.get(chat_id, (None, 0.0))
+            if time.time() - last_edit < self.min_interval:
+                self.skipped += 1
+                continue
+            text = self.render(stats, health, self.shown.get(chat_id))
+            digest = self.content_hash(text)
+            if last_hash == digest:
+                self.skipped += 1
+                continue
+
+            await self.rate_limiter.acquire()
+            try:
+                await bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
+                self.edits += 1
+            except Forbidden:
+                # Bot was removed from the chat or blocked; retrying can't help
+                gone.append(chat_id)
+                continue
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    if "not found" in str(e).lower():
+                        gone.append(chat_id)
+                    else:
+                        print(f"Помилка оновлення панелі в {chat_id}: {e}")
+                    continue
+            except Exception as e:
+                print(f"Помилка оновлення панелі в {chat_id}: {e}")
+                continue
+            self.sent[chat_id] = (digest, time.time())
+            self.shown[chat_id] = dict(stats)
+
+        for chat_id in gone:
+            self.sent.pop(chat_id, None)
+            self.shown.pop(chat_id, None)
+        return gone
+
+    def mark_sent(self, chat_id: str, text: str, stats: Dict[Tuple[str, str], Stats]):
+        """Record a freshly sent dashboard message (showing stats) as up to date."""
+        self.sent[chat_id] = (self.content_hash(text), time.time())
+        self.shown[chat_id] = dict(stats)
@@ -0,0 +1,243 @@
+"""Durable alert buffer for batched and daily digest delivery."""
+import contextlib
+import hashlib
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from telegram_text import MESSAGE_LIMIT, telegram_length
+
+INSTANT = "instant"
+BATCH = "batch"
+DAILY = "daily"
+
+
+def parse_mode(text: str) -> Optional[str]:
+    """
+    Normalize a delivery mode.
+
+    Accepts "instant", "batch 30" / "batch:30" (minutes) and
+    "daily 09:00" / "daily:09:00" (local time).
+
+    Returns:
+        Normalized mode ("instant", "batch:30", "daily:09:00") or None if invalid
+    """
+    kind, _, value = text.strip().lower().replace(' ', ':', 1).partition(':')
+    parts = [kind] + ([value.strip()] if value.strip() else [])
+    if parts == [INSTANT]:
+        return INSTANT
+    if len(parts) == 2 and parts[0] == BATCH and parts[1].isdigit() and int(parts[1]) > 0:
+        return f"{BATCH}:{int(parts[1])}"
+    if len(parts) == 2 and parts[0] == DAILY:
+        try:
+            at = datetime.strptime(parts[1], "%H:%M")
+        except ValueError:
+            return None
+        return f"{DAILY}:{at:%H:%M}"
+    return None
+
+
+def describe_mode(mode: str) -> str:
+    kind, _, value = mode.partition(':')
+    if kind == BATCH:
+        return f"зведення кожні {value} хв"
+    if kind == DAILY:
+        return f"щоденне зведення о {value}"
+    return "миттєво"
+
+
+def is_due(mode: str, last_flush: Optional[float], now: Optional[float] = None) -> bool:
+    """Whether a digest destination should be flushed now."""
+    now = time.time() if now is None else now
+    kind, _, value = mode.partition(':')
+    if kind == BATCH:
+        return last_flush is None or now - last_flush >= int(value) * 60
+    if kind == DAILY:
+        hour, minute = map(int, value.split(':'))
+        slot = datetime.fromtimestamp(now).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return now >= slot.timestamp() and (last_flush is None or last_flush < slot.timestamp())
+    return False
+
+
+class DigestBuffer:
+    """
+    Alerts collected per destination until its next digest.
+
+    One row per (destination, listing): a later price change updates the
+    row instead of adding another, and a listing that is sold or delisted
+    before the digest goes out is marked vanished and left out of it.
+    Rows are only deleted after the digest is in the outbox.
+    """
+
+    def __init__(self, db_path: str = "coordination.db"):
+        self.db_path = db_path
+        self._init_db()
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit (or roll back) on exit and close it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS digest_items (
+                    chat_id TEXT NOT NULL,
+                    gift_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    number TEXT,
+                    model TEXT,
+                    price REAL NOT NULL,
+                    first_price REAL NOT NULL,
+                    discount REAL,
+                    url TEXT,
+                    vanished INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (chat_id, gift_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS digest_flushes (
+                    chat_id TEXT PRIMARY KEY,
+                    flushed_at REAL NOT NULL
+                )
+            """)
+
+    def add(self, chat_id: str, events: Iterable, insert: bool = True) -> int:
+        """
+        Buffer snapshot events (see snapshot_diff.ListingEvent) for a destination.
+
+        Args:
+            chat_id: Destination chat
+            events: Snapshot events
+            insert: False only updates listings already in the buffer (new
+                prices, vanished), for events that don't trigger alerts
+
+        Returns:
+            Number of listings newly added to the buffer
+        """
+        now = time.time()
+        added = 0
+        with self._connect() as conn:
+            for event in events:
+                if event.gift is None:
+                    # Sold or delisted: only matters if it is waiting in the buffer
+                    conn.execute(
+                        "UPDATE digest_items SET vanished = 1, updated_at = ? "
+                        "WHERE chat_id = ? AND gift_id = ?",
+                        (now, chat_id, event.gift_id)
+                    )
+                    continue
+                gift = event.gift
+                url = gift.get('url') or f"https://portals.tg/gift/{gift.get('id')}"
+                cur = conn.execute(
+                    "UPDATE digest_items SET price = ?, discount = ?, vanished = 0, updated_at = ? "
+                    "WHERE chat_id = ? AND gift_id = ?",
+                    (event.price, gift.get('discount'), now, chat_id, event.gift_id)
+                )
+                if cur.rowcount or not insert:
+                    continue
+                conn.execute(
+                    "INSERT INTO digest_items (chat_id, gift_id, name, number, model, price, "
+                    "first_price, discount, url, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (chat_id, event.gift_id, event.name, str(event.number), event.model, event.price,
+                     event.old_price if event.old_price is not None else event.price,
+                     gift.get('discount'), url, now)
+                )
+                added += 1
+        return added
+
+    def pending(self, chat_id: str) -> List[sqlite3.Row]:
+        """Buffered listings of a destination, vanished ones included."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM digest_items WHERE chat_id = ?", (chat_id,)
+            ).fetchall()
+
+    def pending_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM digest_items WHERE vanished = 0").fetchone()[0]
+
+    def last_flush(self, chat_id: str) -> Optional[float]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT flushed_at FROM digest_flushes WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return row['flushed_at'] if row else None
+
+    def complete(self, chat_id: str, rows: List[sqlite3.Row], flushed_at: Optional[float] = None):
+        """
+        Drop the rows a digest was built from and record the flush.
+
+        Rows updated after they were read stay for the next digest.
+        """
+        flushed_at = time.time() if flushed_at is None else flushed_at
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM digest_items WHERE chat_id = ? AND gift_id = ? AND updated_at = ?",
+                [(chat_id, row['gift_id'], row['updated_at']) for row in rows]
+            )
+            conn.execute(
+                "INSERT INTO digest_flushes (chat_id, flushed_at) VALUES (?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET flushed_at = excluded.flushed_at",
+                (chat_id, flushed_at)
+            )
+
+
+def render_digest(rows: List[sqlite3.Row], title: str) -> List[dict]:
+    """
+    Build outbox items summarizing buffered listings.
+
+    Listings are ranked by discount to fair value, then price; vanished
+    ones are only counted. A digest longer than one message is split into
+    numbered parts, so every buffered listing is sent.
+
+    Returns:
+        Outbox items ('key', 'text'), empty if nothing is left to report
+    """
+    active = [row for row in rows if not row['vanished']]
+    if not active:
+        return []
+    active.sort(key=lambda r: (r['discount'] is None, -(r['discount'] or 0), r['price']))
+
+    lines = []
+    for i, row in enumerate(active, 1):
+        line = f"{i}. {row['name']} #{row['number']} ({row['model']}) - {row['price']:g} TON"
+        if row['discount'] is not None:
+            line += f" ({-row['discount'] * 100:+.0f}% від оцінки)"
+        if row['first_price'] != row['price']:
+            line += f" [було {row['first_price']:g}]"
+        lines.append(line + f"\n   {row['url']}")
+    vanished = len(rows) - len(active)
+    if vanished:
+        lines.append(f"\n❌ Продано або знято до зведення: {vanished}")
+
+    header = f"{title}: {len(active)} лотів"
+    # Room for the header and its " (N/M)" part counter
+    room = MESSAGE_LIMIT - telegram_length(header) - 16
+    parts = [[]]
+    for line in lines:
+        if parts[-1] and telegram_length("\n".join(parts[-1] + [line])) > room:
+            parts.append([])
+        parts[-1].append(line)
+
+    digest = hashlib.sha1(
+        "|".join(f"{r['gift_id']}:{r['price']}" for r in active).encode()
+    ).hexdigest()[:16]
+    items = []
+    for n, part in enumerate(parts, 1):
+        counter = f" ({n}/{len(parts)})" if len(parts) > 1 else ""
+        items.append({
+            'key': f"digest:{digest}" + (f":{n}" if len(parts) > 1 else ""),
+            'text': f"{header}{counter}\n\n" + "\n".join(part).strip("\n"),
+        })
+    return items
@@ -0,0 +1,205 @@
+"""Drift-safe pagination over a price-sorted order book."""
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+# fetch_page(offset, limit, min_price) -> listings sorted by price ascending
+FetchPage = Callable[[int, int, Optional[float]], Awaitable[List[dict]]]
+
+
+class DriftStats:
+    """What the paginator noticed about the book moving during a sweep."""
+
+    __slots__ = ('pages', 'duplicates', 'shifted_right', 'shifted_left', 'gaps', 'rescanned')
+
+    def __init__(self):
+        self.pages = 0
+        self.duplicates = 0      # Listings returned twice (dropped by id)
+        self.shifted_right = 0   # Pages whose window moved right (insertions before it)
+        self.shifted_left = 0    # Pages whose window moved left (removals before it)
+        self.gaps = 0            # Pages that lost contact with the previous page
+        self.rescanned = False   # Head of the book fetched again at the end
+
+    @property
+    def drifted(self) -> bool:
+        return bool(self.shifted_right or self.shifted_left or self.gaps)
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class DriftSafePaginator:
+    """
+    Pages through a price-sorted book without skipping or repeating listings.
+
+    Offset mode requests overlapping windows (each page starts `overlap`
+    listings before the end of the previous one) and drops listings already
+    returned by id. Where the previous page's tail is found in the new page
+    tells how far the book moved:
+
+    - moved left (listings removed earlier in the book): covered by the
+      overlap; if the tail is not found at all, the paginator steps back a
+      page so nothing is skipped;
+    - moved right (listings inserted earlier in the book): a new listing
+      landed before the current offset, so the head of the book is walked
+      again at the end of the sweep until a page brings nothing new. Cheap
+      new listings are the ones that matter.
+
+    Keyset mode continues from the last price seen (min_price) instead of a
+    growing offset, so later pages don't depend on what happened earlier in
+    the book; ties at the same price are handled with a small offset and
+    the same id dedup. It never skips a listing that stays in the book, but
+    listings inserted below the cursor are only seen on the next sweep.
+    """
+
+    def __init__(self, fetch_page: FetchPage, limit: int = 20, overlap: int = 5,
+                 max_pages: int = 20, keyset: bool = False, max_backtracks: int = 3):
+        """
+        Initialize paginator.
+
+        Args:
+            fetch_page: Async function (offset, limit, min_price) -> listings
+            limit: Listings per request
+            overlap: Listings shared between consecutive windows
+            max_pages: Maximum requests (rescan and backtracks included)
+            keyset: Use min_price continuation instead of offsets
+            max_backtracks: Maximum step-backs after a gap
+        """
+        self.fetch_page = fetch_page
+        self.limit = limit
+        self.overlap = min(overlap, limit - 1)
+        self.max_pages = max_pages
+        self.keyset = keyset
+        self.max_backtracks = max_backtracks
+        self.stats = DriftStats()
+        self.complete = False
+        self._seen = set()
+
+    def _new_listings(self, results: List[dict]) -> List[dict]:
+        fresh = []
+        for listing in results:
+            listing_id = listing.get('id')
+            if listing_id in self._seen:
+                self.stats.duplicates += 1
+                continue
+            self._seen.add(listing_id)
+            fresh.append(listing)
+        return fresh
+
+    def _measure_shift(self, prev_page: List[dict], results: List[dict]) -> Optional[int]:
+        """
+        Compare where the previous page's tail landed in the new window.
+
+        Returns:
+            Positive if the book moved right, negative if left, 0 if stable,
+            None if no listing of the overlap was found
+        """
+        positions = {listing.get('id'): i for i, listing in enumerate(results)}
+        tail = prev_page[-self.overlap:] if self.overlap else []
+        for k, listing in enumerate(reversed(tail)):
+            position = positions.get(listing.get('id'))
+            if position is not None:
+                expected = self.overlap - 1 - k
+                return position - expected
+        return None
+
+    async def pages(self) -> AsyncIterator[List[dict]]:
+        """
+        Yield pages of listings not returned before.
+
+        Sets self.complete when the end of the book was reached.
+        """
+        if self.keyset:
+            async for page in self._keyset_pages():
+                yield page
+        else:
+            async for page in self._offset_pages():
+                yield page
+
+    async def _offset_pages(self) -> AsyncIterator[List[dict]]:
+        step = self.limit - self.overlap
+        offset = 0
+        prev_page: List[dict] = []
+        backtracks = 0
+        requests = 0
+
+        while requests < self.max_pages:
+            results = await self.fetch_page(offset, self.limit, None)
+            requests += 1
+            self.stats.pages += 1
+
+            if prev_page and results:
+                shift = self._measure_shift(prev_page, results)
+                if shift is None:
+                    self.stats.gaps += 1
+                    if backtracks < self.max_backtracks and offset > 0:
+                        # Lost contact with the previous page: step back and look again
+                        backtracks += 1
+                        offset = max(0, offset - step)
+                        prev_page = []
+                        fresh = self._new_listings(results)
+                        if fresh:
+                            yield fresh
+                        continue
+                elif shift > 0:
+                    self.stats.shifted_right += 1
+                elif shift < 0:
+                    self.stats.shifted_left += 1
+
+            fresh = self._new_listings(results)
+            if fresh:
+                yield fresh
+
+            if len(results) < self.limit:
+                self.complete = True
+                break
+
+            prev_page = results
+            offset += step
+
+        # Insertions before the offset may hide new cheap listings: walk the head
+        # again until a page brings nothing new
+        offset = 0
+        while self.stats.shifted_right and requests < self.max_pages:
+            self.stats.rescanned = True
+            results = await self.fetch_page(offset, self.limit, None)
+            requests += 1
+            self.stats.pages += 1
+            fresh = self._new_listings(results)
+            if not fresh:
+                break
+            yield fresh
+            if len(results) < self.limit:
+                break
+            offset += step
+
+    async def _keyset_pages(self) -> AsyncIterator[List[dict]]:
+        min_price: Optional[float] = None
+        same_price_seen = 0
+        requests = 0
+
+        while requests < self.max_pages:
+            offset = max(0, same_price_seen - self.overlap)
+            results = await self.fetch_page(offset, self.limit, min_price)
+            requests += 1
+            self.stats.pages += 1
+
+            fresh = self._new_listings(results)
+            if fresh:
+                yield fresh
+
+            if len(results) < self.limit:
+                self.complete = True
+                break
+
+            last_price = float(results[-1].get('price', 0))
+            if min_price is not None and float(results[0].get('price', 0)) < min_price:
+                # The market returned something cheaper than our cursor
+                self.stats.shifted_right += 1
+
+            at_last_price = sum(1 for r in results if float(r.get('price', 0)) == last_price)
+            if last_price == min_price:
+                # Whole page at the cursor price: walk through the tie with an offset
+                same_price_seen = offset + at_last_price
+            else:
+                same_price_seen = at_last_price
+            min_price = last_price
+
@@ -0,0 +1,249 @@
+"""Local stand-in for the Telegram Bot API with flood control, for load tests."""
+import argparse
+import asyncio
+import json
+import math
+import time
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+BOT_ID = 1000001
+
+
+class FloodControl:
+    """
+    Telegram-like send limits.
+
+    Every chat may receive one message per second (with a small burst),
+    groups and channels (negative ids) at most per_group_minute messages per
+    minute, and the bot at most global_rate messages per second overall.
+    A refused send gets the seconds until it would be allowed.
+    """
+
+    def __init__(self, chat_rate: float = 1, chat_burst: int = 3,
+                 per_group_minute: int = 20, global_rate: float = 30):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.per_group_minute = per_group_minute
+        self.global_rate = global_rate
+        self._chat_tokens: Dict[str, List[float]] = {}
+        self._group_sends: Dict[str, List[float]] = {}
+        self._global: List[float] = []
+
+    def check(self, chat_id: str, now: float, cost: int = 1) -> float:
+        """
+        Admit a send of `cost` messages to a chat.
+
+        Returns:
+            0 if admitted, otherwise seconds to wait (retry_after)
+        """
+        tokens, updated = self._chat_tokens.get(chat_id, (float(self.chat_burst), now))
+        tokens = min(self.chat_burst, tokens + (now - updated) * self.chat_rate)
+        waits = [max(0.0, (cost - tokens) / self.chat_rate)]
+
+        if chat_id.startswith('-'):
+            sends = [t for t in self._group_sends.get(chat_id, []) if now - t < 60]
+            self._group_sends[chat_id] = sends
+            if len(sends) + cost > self.per_group_minute:
+                oldest = sends[min(len(sends) + cost - self.per_group_minute, len(sends)) - 1] if sends else now
+                waits.append(60 - (now - oldest))
+
+        self._global = [t for t in self._global if now - t < 1]
+        if len(self._global) + cost > self.global_rate:
+            waits.append(1 - (now - self._global[0]))
+
+        wait = max(waits)
+        if wait > 0:
+            self._chat_tokens[chat_id] = [tokens, now]
+            return wait
+        self._chat_tokens[chat_id] = [tokens - cost, now]
+        if chat_id.startswith('-'):
+            self._group_sends[chat_id].extend([now] * cost)
+        self._global.extend([now] * cost)
+        return 0.0
+
+
+class FakeBotAPI:
+    """
+    aiohttp app answering Bot API calls at /bot<token>/<method>.
+
+    Implements getMe, sendMessage, sendPhoto, sendMediaGroup, getUpdates,
+    editMessageText and pin/unpin; other methods succeed with True. Sends
+    go through FloodControl and every call is recorded with its timing.
+    Updates for getUpdates are injected with POST /fake/updates.
+    """
+
+    def __init__(self, flood: Optional[FloodControl] = None, latency: float = 0.0):
+        """
+        Initialize server.
+
+        Args:
+            flood: Send limits (None disables flood control)
+            latency: Seconds added to every call, like a network round trip
+        """
+        self.flood = flood
+        self.latency = latency
+        self.calls: List[dict] = []
+        self.messages: List[dict] = []
+        self.updates: List[dict] = []
+        self._update_event = asyncio.Event()
+        self._message_id = 0
+        self._update_id = 0
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post(r"/bot{token}/{method}", self.handle)
+        app.router.add_get(r"/bot{token}/{method}", self.handle)
+        app.router.add_post("/fake/updates", self.inject_update)
+        app.router.add_get("/fake/stats", self.handle_stats)
+        return app
+
+    async def _params(self, request: web.Request) -> dict:
+        if request.content_type == 'application/json':
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            # Uploaded files are recorded by name only
+            params[key] = getattr(value, 'filename', None) or value
+        for key in ('media', 'reply_markup', 'entities', 'caption_entities', 'allowed_updates'):
+            if isinstance(params.get(key), str):
+                try:
+                    params[key] = json.loads(params[key])
+                except ValueError:
+                    pass
+        return params
+
+    def _message(self, chat_id, **fields) -> dict:
+        self._message_id += 1
+        message = {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(chat_id) if str(chat_id).lstrip('-').isdigit() else 0,
+                     'type': 'channel' if str(chat_id).startswith('-') else 'private'},
+            'from': {'id': BOT_ID, 'is_bot': True, 'first_name': 'Fake'},
+        }
+        message.update(fields)
+        return message
+
+    @staticmethod
+    def _ok(result) -> web.Response:
+        return web.json_response({'ok': True, 'result': result})
+
+    @staticmethod
+    def _error(code: int, description: str, retry_after: Optional[int] = None) -> web.Response:
+        body = {'ok': False, 'error_code': code, 'description': description}
+        if retry_after is not None:
+            body['parameters'] = {'retry_after': retry_after}
+        return web.json_response(body, status=code)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        started = time.monotonic()
+        method = request.match_info['method']
+        params = await self._params(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        response = await self.dispatch(method, params)
+        self.calls.append({
+            'method': method,
+            'chat_id': str(params.get('chat_id', '')),
+            'status': response.status,
+            'received_at': time.time(),
+            'handled_ms': round((time.monotonic() - started) * 1000, 2),
+        })
+        return response
+
+    async def dispatch(self, method: str, params: dict) -> web.Response:
+        m = method.lower()
+        if m == 'getme':
+            return self._ok({'id': BOT_ID, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot',
+                             'can_join_groups': True, 'can_read_all_group_messages': False,
+                             'supports_inline_queries': False})
+        if m == 'getupdates':
+            return await self.get_updates(params)
+
+        if m in ('sendmessage', 'sendphoto', 'sendmediagroup'):
+            chat_id = str(params.get('chat_id', ''))
+            if not chat_id:
+                return self._error(400, "Bad Request: chat_id is empty")
+            media = params.get('media') or []
+            if m == 'sendmediagroup' and not 2 <= len(media) <= 10:
+                return self._error(400, "Bad Request: wrong number of media in the group")
+            if self.flood:
+                wait = self.flood.check(chat_id, time.monotonic(), max(1, len(media)))
+                if wait:
+                    retry_after = max(1, math.ceil(wait))
+                    return self._error(429, f"Too Many Requests: retry after {retry_after}", retry_after)
+
+            if m == 'sendmessage':
+                sent = [self._message(chat_id, text=params.get('text', ''))]
+            elif m == 'sendphoto':
+                sent = [self._message(chat_id, caption=params.get('caption', ''), photo=[
+                    {'file_id': f"photo{self._message_id}", 'file_unique_id': f"u{self._message_id}",
+                     'width': 512, 'height': 512}])]
+            else:
+                sent = [self._message(chat_id, caption=item.get('caption', ''), photo=[
+                    {'file_id': f"photo{self._message_id}", 'file_unique_id': f"u{self._message_id}",
+                     'width': 512, 'height': 512}]) for item in media]
+            now = time.time()
+            for message in sent:
+                self.messages.append({'method': method, 'chat_id': chat_id, 'sent_at': now,
+                                      'text': message.get('text') or message.get('caption') or ''})
+            return self._ok(sent if m == 'sendmediagroup' else sent[0])
+
+        if m == 'editmessagetext':
+            return self._ok(self._message(params.get('chat_id', ''), text=params.get('text', '')))
+        return self._ok(True)
+
+    async def get_updates(self, params: dict) -> web.Response:
+        offset = int(params.get('offset') or 0)
+        timeout = float(params.get('timeout') or 0)
+        self.updates = [u for u in self.updates if u['update_id'] >= offset]
+        if not self.updates and timeout:
+            self._update_event.clear()
+            try:
+                await asyncio.wait_for(self._update_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get('limit') or 100)
+        return self._ok(self.updates[:limit])
+
+    async def inject_update(self, request: web.Request) -> web.Response:
+        """Queue a text message update for getUpdates: {"chat_id": 1, "text": "/stats"}."""
+        body = await request.json()
+        self._update_id += 1
+        text = body.get('text', '')
+        message = self._message(body.get('chat_id', 1), text=text)
+        message['from'] = {'id': int(body.get('chat_id', 1)), 'is_bot': False, 'first_name': 'Local'}
+        message['chat']['type'] = 'private'
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        self.updates.append({'update_id': self._update_id, 'message': message})
+        self._update_event.set()
+        return self._ok(True)
+
+    def stats(self) -> dict:
+        by_method: Dict[str, Dict[str, int]] = {}
+        for call in self.calls:
+            counts = by_method.setdefault(call['method'], {'calls': 0, 'flood_429': 0})
+            counts['calls'] += 1
+            counts['flood_429'] += call['status'] == 429
+        return {'calls': len(self.calls), 'messages': len(self.messages), 'methods': by_method}
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake Telegram Bot API")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--chat-rate", type=float, default=1, help="Messages/s per chat")
+    parser.add_argument("--group-minute", type=int, default=20, help="Messages/min per group or channel")
+    parser.add_argument("--global-rate", type=float, default=30, help="Messages/s overall")
+    parser.add_argument("--no-flood", action="store_true", help="Never answer 429")
+    args = parser.parse_args()
+
+    api = FakeBotAPI(None if args.no_flood else FloodControl(args.chat_rate, 3, args.group_minute, args.global_rate))
+    print(f"TELEGRAM_API_URL=http://localhost:{args.port}/bot")
+    web.run_app(api.make_app(), port=args.port)
@@ -0,0 +1,230 @@
+"""Cached catalog of gift collections and models with prefix lookup."""
+import bisect
+import difflib
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixIndex:
+    """Case-insensitive name index with prefix completion and fuzzy suggestions."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._canonical: Dict[str, str] = {}
+        self._keys: List[str] = []
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, name: str):
+        """Add a name (no-op if already present)."""
+        key = name.lower()
+        if key in self._canonical:
+            return
+        self._canonical[key] = name
+        bisect.insort(self._keys, key)
+
+    def names(self) -> List[str]:
+        """Get all names, alphabetically."""
+        return [self._canonical[k] for k in self._keys]
+
+    def exact(self, text: str) -> Optional[str]:
+        """Get the canonical spelling of a name, ignoring case."""
+        return self._canonical.get(text.strip().lower())
+
+    def complete(self, prefix: str, limit: int = 5) -> List[str]:
+        """Get names starting with a prefix, alphabetically."""
+        key = prefix.strip().lower()
+        start = bisect.bisect_left(self._keys, key)
+        matches = []
+        for i in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[i].startswith(key):
+                break
+            matches.append(self._canonical[self._keys[i]])
+        return matches
+
+    def suggest(self, text: str, limit: int = 3) -> List[str]:
+        """Get the closest names for a possibly misspelled input."""
+        matches = difflib.get_close_matches(text.strip().lower(), self._keys, n=limit, cutoff=0.6)
+        return [self._canonical[m] for m in matches]
+
+    def resolve(self, text: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Resolve user input to a known name.
+
+        Returns:
+            (canonical name or None, suggestions when unresolved)
+        """
+        name = self.exact(text)
+        if name:
+            return name, []
+
+        completions = self.complete(text, limit=6)
+        if len(completions) == 1:
+            return completions[0], []
+
+        suggestions = completions[:5] or self.suggest(text)
+        return None, suggestions
+
+
+class GiftCatalog:
+    """Collections and their models, cached on disk and refreshed from Portals."""
+
+    def __init__(self, cache_file: str = "gift_catalog.json", max_age: float = 24 * 3600):
+        """
+        Initialize catalog.
+
+        Args:
+            cache_file: JSON file the catalog is stored in
+            max_age: Seconds after which the catalog is refreshed
+        """
+        self.cache_file = cache_file
+        self.max_age = max_age
+        self.updated_at = 0.0
+        self.collections = PrefixIndex()
+        self.models: Dict[str, PrefixIndex] = {}
+        # Collections whose models were loaded from Portals (not only learned)
+        self.loaded: Set[str] = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.updated_at = data.get('updated_at', 0)
+        for name, models in data.get('collections', {}).items():
+            self._add(name, models)
+        self.loaded = set(data.get('loaded', []))
+
+    def save(self):
+        """Write the catalog to disk."""
+        data = {
+            'updated_at': self.updated_at,
+            'collections': {
+                name: index.names()
+                for name, index in self.models.items()
+            },
+            'loaded': sorted(self.loaded),
+        }
+        tmp_file = self.cache_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+
+    def _add(self, name: str, models: Iterable[str]) -> bool:
+        """Add a collection and models; returns True if anything was new."""
+        name = self.collections.exact(name) or name
+        index = self.models.get(name)
+        changed = index is None
+        if index is None:
+            self.collections.add(name)
+            index = self.models[name] = PrefixIndex()
+        for model in models:
+            if not index.exact(model):
+                index.add(model)
+                changed = True
+        return changed
+
+    def is_empty(self) -> bool:
+        return len(self.collections) == 0
+
+    def is_authoritative(self) -> bool:
+        """True once the catalog was loaded from Portals, not only learned from sweeps."""
+        return self.updated_at > 0
+
+    def is_stale(self) -> bool:
+        return time.time() - self.updated_at > self.max_age
+
+    def learn(self, gifts: Iterable[dict]):
+        """Add collections and models observed in listings."""
+        changed = False
+        for gift in gifts:
+            attrs = gift.get('attributes', [])
+            model = next((a['value'] for a in attrs if a['type'] == 'model'), None)
+            if gift.get('name') and model:
+                changed |= self._add(gift['name'], [model])
+        if changed:
+            self.save()
+
+    def learn_pairs(self, pairs: Iterable[Tuple[str, str]]):
+        """Add observed (collection, model) pairs."""
+        changed = False
+        for name, model in pairs:
+            if name and model and model != 'N/A':
+                changed |= self._add(name, [model])
+        if changed:
+            self.save()
+
+    async def refresh(self, searcher):
+        """
+        Reload collections and their models from Portals.
+
+        Requests go through the searcher's Portals pool and rate limiter. A
+        collection's models don't change after its release, so they are only
+        requested for collections not loaded before.
+        """
+        from patch_portals import load_portalsmp
+        portalsmp = searcher.portals or load_portalsmp()
+        token = await searcher.auth_manager.get_token()
+
+        async def call(func, **kwargs):
+            if searcher.rate_limiter:
+                await searcher.rate_limiter.acquire()
+            searcher.request_count += 1
+            return await searcher._call_portals(func, authData=token, **kwargs)
+
+        collections = await call(portalsmp.collections, limit=500)
+        names = [c.get('name') for c in collections or [] if isinstance(c, dict) and c.get('name')]
+
+        for name in names:
+            if name in self.loaded:
+                self._add(name, [])
+                continue
+            try:
+                floors = await call(portalsmp.filterFloors, gift_name=name)
+            except Exception as e:
+                logger.warning(f"Failed to load models for {name}: {e}")
+                self._add(name, [])
+                continue
+            self._add(name, list((floors or {}).get('models', {}).keys()))
+            self.loaded.add(name)
+
+        self.updated_at = time.time()
+        self.save()
+        logger.info(f"Catalog refreshed: {len(self.collections)} collections")
+
+    def resolve_collection(self, text: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Resolve a gift name.
+
+        Until the catalog has been loaded from Portals, unknown names are
+        accepted as-is (known ones are still completed and normalized).
+        """
+        name, suggestions = self.collections.resolve(text)
+        if not name and not self.is_authoritative():
+            return text.strip(), []
+        return name, suggestions
+
+    def resolve_model(self, collection: str, text: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Resolve a model name within a collection.
+
+        Collections with no known models accept any model as-is.
+        """
+        index = self.models.get(collection)
+        if not index:
+            return text.strip(), []
+        name, suggestions = index.resolve(text)
+        if not name and not self.is_authoritative():
+            return text.strip(), []
+        return name, suggestions
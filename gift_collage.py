@@ -0,0 +1,204 @@
+"""Gift photo cache and grid collages for alert bursts."""
+import asyncio
+import hashlib
+import math
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (image path or None, first label line, second label line)
+Tile = Tuple[Optional[str], str, str]
+
+
+class ImageCache:
+    """Downloads gift photos concurrently and keeps them on disk."""
+
+    def __init__(self, cache_dir: str = "image_cache", max_files: int = 2000,
+                 concurrency: int = 8, timeout: float = 15):
+        """
+        Initialize cache.
+
+        Args:
+            cache_dir: Directory for downloaded photos
+            max_files: Files kept (least recently used are deleted)
+            concurrency: Downloads in flight
+            timeout: Seconds per download
+        """
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def path_for(self, url: str) -> str:
+        ext = os.path.splitext(url.split('?', 1)[0])[1][:5] or ".img"
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode()).hexdigest() + ext)
+
+    async def fetch_many(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Get local paths for photo URLs, downloading the ones not cached.
+
+        Returns:
+            Dict mapping each URL to its file path (None if the download failed)
+        """
+        import aiohttp
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        paths: Dict[str, Optional[str]] = {}
+        missing = []
+        for url in dict.fromkeys(u for u in urls if u):
+            path = self.path_for(url)
+            if os.path.exists(path):
+                os.utime(path)
+                paths[url] = path
+            else:
+                missing.append(url)
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+            async def download(session, url: str):
+                path = self.path_for(url)
+                async with semaphore:
+                    try:
+                        async with session.get(url) as response:
+                            response.raise_for_status()
+                            data = await response.read()
+                    except Exception as e:
+                        print(f"Не вдалося завантажити зображення {url}: {e}")
+                        paths[url] = None
+                        return
+                tmp_path = path + ".tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                paths[url] = path
+
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                await asyncio.gather(*(download(session, url) for url in missing))
+            self._prune()
+
+        return paths
+
+    def _prune(self):
+        files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _font(size: int):
+    from PIL import ImageFont
+
+    for name in ("DejaVuSans.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _fit(draw, text: str, font, width: int) -> str:
+    """Shorten text with an ellipsis until it fits the width."""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_collage(tiles: List[Tile], output_path: str, columns: int = 4, tile_size: int = 256) -> str:
+    """
+    Render a labelled grid of gift photos to a JPEG file.
+
+    CPU bound: run it in a worker thread (see build_collage).
+
+    Args:
+        tiles: (image path or None, label line 1, label line 2) per cell
+        output_path: Where to write the JPEG
+        columns: Cells per row
+        tile_size: Cell image size in pixels
+
+    Returns:
+        output_path
+    """
+    from PIL import Image, ImageDraw
+
+    columns = max(1, min(columns, len(tiles)))
+    rows = math.ceil(len(tiles) / columns)
+    label_height = tile_size // 5
+    padding = 8
+    cell_w = tile_size + padding
+    cell_h = tile_size + label_height + padding
+
+    canvas = Image.new("RGB", (columns * cell_w + padding, rows * cell_h + padding), (24, 26, 32))
+    draw = ImageDraw.Draw(canvas)
+    font = _font(max(12, label_height // 2 - 2))
+
+    for i, (path, line1, line2) in enumerate(tiles):
+        x = padding + (i % columns) * cell_w
+        y = padding + (i // columns) * cell_h
+
+        image = None
+        if path:
+            try:
+                with Image.open(path) as source:
+                    image = source.convert("RGBA")
+                    image.thumbnail((tile_size, tile_size))
+            except Exception:
+                image = None
+        if image is not None:
+            offset = (x + (tile_size - image.width) // 2, y + (tile_size - image.height) // 2)
+            canvas.paste(image, offset, image)
+        else:
+            draw.rectangle([x, y, x + tile_size, y + tile_size], fill=(48, 52, 62))
+            draw.text((x + tile_size // 2, y + tile_size // 2), "?", fill=(140, 140, 150),
+                      font=font, anchor="mm")
+
+        text_y = y + tile_size + 2
+        draw.text((x, text_y), _fit(draw, line1, font, tile_size), fill=(120, 200, 255), font=font)
+        draw.text((x, text_y + label_height // 2), _fit(draw, line2, font, tile_size),
+                  fill=(200, 200, 210), font=font)
+
+    canvas.save(output_path, "JPEG", quality=85)
+    return output_path
+
+
+async def build_collage(cache: ImageCache, infos: List[dict], output_dir: str = "collages",
+                        columns: int = 4, max_age: float = 24 * 3600) -> Optional[str]:
+    """
+    Download photos and render a collage of gift infos (see GiftSearcher.format_gift_info).
+
+    Each tile is labelled with the gift number and price, then its name.
+    Collages older than max_age are deleted.
+
+    Returns:
+        Absolute path of the JPEG, or None if Pillow is not installed
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("Pillow не встановлено, колаж пропущено")
+        return None
+
+    paths = await cache.fetch_many(info['photo_url'] for info in infos)
+    tiles = [
+        (paths.get(info['photo_url']), f"#{info['number']} · {info['price']} TON", info['name'])
+        for info in infos
+    ]
+
+    os.makedirs(output_dir, exist_ok=True)
+    now = time.time()
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        if now - os.path.getmtime(path) > max_age:
+            os.remove(path)
+
+    digest = hashlib.sha1("|".join(str(info['id']) for info in infos).encode()).hexdigest()[:16]
+    output_path = os.path.abspath(os.path.join(output_dir, f"collage_{digest}.jpg"))
+    return await asyncio.to_thread(render_collage, tiles, output_path, columns)
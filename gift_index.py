@@ -0,0 +1,71 @@
+"""In-memory lookup index of observed gift listings."""
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+
+class GiftIndex:
+    """Listings indexed by (name, collection number) and by gift id."""
+
+    def __init__(self, max_size: int = 20000):
+        """
+        Initialize index.
+
+        Args:
+            max_size: Listings kept before the least recently updated are evicted
+        """
+        self.max_size = max_size
+        self._by_id: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._by_number = {}
+
+    @staticmethod
+    def _number_key(name: str, number) -> Tuple[str, int]:
+        return name.strip().lower(), int(number)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def update(self, gifts: Iterable[dict], seen_at: Optional[float] = None):
+        """
+        Add or refresh listings seen by a sweep.
+
+        Args:
+            gifts: Listings
+            seen_at: When they were observed (default: now), e.g. the save
+                time of a restored snapshot
+        """
+        now = time.time() if seen_at is None else seen_at
+        for gift in gifts:
+            gift_id = gift.get('id')
+            number = gift.get('external_collection_number')
+            if gift_id is None or number is None:
+                continue
+
+            self._by_id[gift_id] = (now, gift)
+            self._by_id.move_to_end(gift_id)
+            self._by_number[self._number_key(gift.get('name', ''), number)] = gift_id
+
+        while len(self._by_id) > self.max_size:
+            _, (_, gift) = self._by_id.popitem(last=False)
+            key = self._number_key(gift.get('name', ''), gift['external_collection_number'])
+            if self._by_number.get(key) == gift.get('id'):
+                del self._by_number[key]
+
+    def get(self, gift_id: str, max_age: Optional[float] = None) -> Optional[dict]:
+        """
+        Get a listing by gift id.
+
+        Args:
+            gift_id: Gift id
+            max_age: Seconds since it was last observed after which it may
+                have been sold and counts as a miss (None: any age)
+        """
+        entry = self._by_id.get(gift_id)
+        if not entry or (max_age is not None and time.time() - entry[0] > max_age):
+            return None
+        return entry[1]
+
+    def lookup(self, name: str, number: int, max_age: Optional[float] = None) -> Optional[dict]:
+        """Get a listing by gift name and collection number (max_age as in get())."""
+        gift_id = self._by_number.get(self._number_key(name, number))
+        return self.get(gift_id, max_age) if gift_id else None
@@ -1,95 +1,474 @@
 """Gift search functionality."""
 import asyncio
+import functools
+import os
 import time
-from typing import List, Tuple, Optional
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Tuple, Optional
+from drift_pagination import DriftSafePaginator
+from gift_index import GiftIndex
+from patch_portals import load_portalsmp
 from portals_auth import PortalsAuthManager
+from portals_capture import CaptureWriter
+from query_coalescer import QueryCoalescer
 from ton_price import TonPriceFetcher
+from tracing import span
+
+# Listings per Portals result page
+PAGE_LIMIT = 20
+# Threads for blocking portalsmp calls
+PORTALS_THREADS = 8
 
 
 class GiftSearcher:
     """Handles searching for gifts on Portals Marketplace."""
 
-    def __init__(self):
+    def __init__(self, portals=None):
+        """
+        Initialize searcher.
+
+        Args:
+            portals: Optional stand-in for the portalsmp module (e.g. a replay source)
+        """
+        self.portals = portals
         self.auth_manager = PortalsAuthManager()
         self.price_fetcher = TonPriceFetcher()
+        # Results of the last monitoring sweep (restored from disk on startup)
+        self.last_snapshot: List[dict] = []
+        # Every listing seen by any sweep, for direct lookups
+        self.index = GiftIndex()
+        # Number of marketplace requests made (for per-cycle accounting)
+        self.request_count = 0
+        # Identical concurrent search_gifts() calls share one sweep
+        self.inflight = QueryCoalescer()
+        # Raw responses of search sweeps, for offline replay (empty dir = off).
+        # Read at construction, after load_dotenv()
+        capture_dir = os.getenv("PORTALS_CAPTURE_DIR", "")
+        self.capture = CaptureWriter(capture_dir) if capture_dir else None
+        # Seconds between pages and before retrying a rate-limited request
+        self.page_delay = 0.5
+        self.retry_delay = 5
+        # Optional marketplaces.RateLimiter shared by every Portals request
+        self.rate_limiter = None
+        # Read here rather than at import, so values from .env apply.
+        # Listings shared between consecutive result pages (see drift_pagination),
+        # clamped like DriftSafePaginator does so every page advances
+        self.page_overlap = max(0, min(int(os.getenv("PORTALS_PAGE_OVERLAP", "5")), PAGE_LIMIT - 1))
+        # Continue from the last price seen instead of a growing offset
+        self.keyset_pagination = os.getenv("PORTALS_KEYSET_PAGINATION", "0") == "1"
+        # portalsmp blocks, so its calls run in their own bounded pool: a hung
+        # request can't take over the default executor. Calls that time out or
+        # are cancelled leave their thread running until portalsmp returns
+        self.executor = ThreadPoolExecutor(PORTALS_THREADS, thread_name_prefix="portals")
+        self.request_timeout = float(os.getenv("PORTALS_REQUEST_TIMEOUT", "30"))
+        self.abandoned_total = 0
+        self.abandoned_running = 0
+
+    async def _call_portals(self, func, **kwargs):
+        """
+        Run a blocking portalsmp call in the Portals pool.
+
+        Raises:
+            TimeoutError: If it takes longer than request_timeout
+        """
+        future = self.executor.submit(functools.partial(func, **kwargs))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Portals request timed out after {self.request_timeout:g} s") from None
+        finally:
+            # Still queued: drop it; already running: count the thread until it returns
+            if not future.done() and not future.cancel():
+                self._abandon(future)
+
+    def _abandon(self, future):
+        self.abandoned_total += 1
+        self.abandoned_running += 1
+
+        def finished(_):
+            self.abandoned_running -= 1
+
+        future.add_done_callback(finished)
 
     async def search_gifts(
         self,
         wanted_combinations: List[Tuple[str, str]],
         max_price: int,
-        max_pages: int = 20
+        max_pages: int = 20,
+        sweep_status: Optional[dict] = None
     ) -> List[dict]:
         """
         Search for gifts matching wanted combinations.
 
+        Collects iter_gifts() into a list. Identical calls made while one is
+        still running (same combinations, price and page limit) wait for it
+        and get the same listings instead of sweeping again.
+
         Args:
             wanted_combinations: List of (gift_name, model) tuples
             max_price: Maximum price in TON
             max_pages: Maximum pages to fetch
+            sweep_status: Optional dict; 'complete' is set to True if every
+                listing under max_price was fetched (no page limit or error)
 
         Returns:
             List of gift dictionaries matching criteria
         """
-        # Get authentication token
-        token = await self.auth_manager.get_token()
+        async def sweep() -> Tuple[List[dict], dict]:
+            status = {}
+            gifts = [
+                gift async for gift in
+                self.iter_gifts(wanted_combinations, max_price, max_pages, status)
+            ]
+            return gifts, status
 
-        import portalsmp
+        key = (frozenset(tuple(c) for c in wanted_combinations), max_price, max_pages)
+        gifts, status = await self.inflight.run(key, sweep)
+        if sweep_status is not None:
+            sweep_status.update(status)
+        return list(gifts)
+
+    async def iter_gifts(
+        self,
+        wanted_combinations: List[Tuple[str, str]],
+        max_price: int,
+        max_pages: int = 20,
+        sweep_status: Optional[dict] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Stream gifts matching wanted combinations, cheapest first.
+
+        Each page is filtered and deduplicated as soon as it arrives, and only
+        matches are kept, so memory grows with the number of matches rather
+        than the number of listings fetched.
+
+        Args:
+            wanted_combinations: List of (gift_name, model) tuples
+            max_price: Maximum price in TON
+            max_pages: Maximum pages to fetch
+            sweep_status: See search_gifts()
+
+        Yields:
+            Gift dictionaries matching criteria
+        """
+        wanted = set(tuple(c) for c in wanted_combinations)
 
         # Extract unique gifts and models for API query
-        gift_names = list(set(gift for gift, _ in wanted_combinations))
-        models = list(set(model for _, model in wanted_combinations))
+        gift_names = list(set(gift for gift, _ in wanted))
+        models = list(set(model for _, model in wanted))
+
+        sweep_id = None
+        if self.capture:
+            if sweep_status is None:
+                sweep_status = {}
+            sweep_id = uuid.uuid4().hex[:12]
+            self.capture.write({
+                'type': 'sweep', 'sweep': sweep_id, 'ts': time.time(),
+                'wanted': sorted(wanted), 'max_price': max_price, 'max_pages': max_pages,
+            })
 
         # Search with pagination (API uses OR logic)
-        all_results = []
-        offset = 0
-        limit = 20
-
-        for page in range(max_pages):
-            try:
-                results = portalsmp.search(
-                    authData=token,
-                    gift_name=gift_names,
-                    model=models,
-                    max_price=max_price,
-                    offset=offset,
-                    limit=limit,
-                    sort="price_asc"  # Cheapest first
-                )
-
-                if not results:
-                    break
-
-                all_results.extend(results)
-                offset += limit
-
-                # Stop if this was the last page
-                if len(results) < limit:
-                    break
+        seen_ids = set()
+        async for results in self._search_pages(gift_names, models, max_price, max_pages,
+                                                sweep_status, sweep_id):
+            # CLIENT-SIDE FILTERING: Keep only wanted gift+model combinations
+            with span("filter", listings=len(results)) as filter_span:
+                matches = []
+                for gift in results:
+                    gift_id = gift.get('id')
+                    if gift_id in seen_ids:
+                        continue
+                    gift_name = gift.get('name', '')
+                    attrs = gift.get('attributes', [])
+                    model = next((a['value'] for a in attrs if a['type'] == 'model'), '')
+
+                    # Check if this combination is in our wanted list
+                    if (gift_name, model) in wanted:
+                        seen_ids.add(gift_id)
+                        matches.append(gift)
+                filter_span.set(matches=len(matches))
+
+            self.index.update(matches)
+            for gift in matches:
+                yield gift
+
+        if sweep_id:
+            self.capture.write({
+                'type': 'end', 'sweep': sweep_id, 'matches': len(seen_ids),
+                'complete': sweep_status.get('complete'),
+            })
+            self.capture.flush()
+
+    async def _search_pages(
+        self,
+        gift_names: List[str],
+        models: Optional[List[str]],
+        max_price: int,
+        max_pages: int,
+        sweep_status: Optional[dict] = None,
+        sweep_id: Optional[str] = None,
+        min_price: Optional[float] = None
+    ):
+        """
+        Fetch result pages from Portals, cheapest first.
+
+        Pages overlap and are deduplicated by id, so listings that move while
+        the sweep runs are neither skipped nor returned twice.
+
+        If sweep_status is given, its 'complete' key tells whether the last
+        page was reached and 'drift' holds the paginator's DriftStats.
+
+        With capture on, every response of a sweep (sweep_id) is recorded
+        with its parameters and timing. min_price starts the pages at a price
+        instead of the floor.
+
+        Yields:
+            List of raw listings per page
+        """
+        # Get authentication token
+        with span("token_fetch"):
+            token = await self.auth_manager.get_token()
+
+        portalsmp = self.portals or load_portalsmp()
+
+        limit = PAGE_LIMIT
+        if sweep_status is None:
+            sweep_status = {}
+        sweep_status['complete'] = False
 
+        start_price = min_price
+
+        async def fetch_page(offset: int, limit: int, min_price: Optional[float]) -> List[dict]:
+            query = dict(
+                authData=token,
+                gift_name=gift_names,
+                max_price=max_price,
+                offset=offset,
+                limit=limit,
+                sort="price_asc"  # Cheapest first
+            )
+            if models:
+                query['model'] = models
+            if min_price is None:
+                min_price = start_price
+            if min_price is not None:
+                query['min_price'] = min_price
+
+            for attempt in range(2):
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire()
+                started = time.time()
+                try:
+                    self.request_count += 1
+                    with span("portals.page", offset=offset, min_price=min_price) as page_span:
+                        results = await self._call_portals(portalsmp.search, **query)
+                        page_span.set(listings=len(results or []))
+                    self._capture_page(sweep_id, query, started, response=results or [])
+                    return results or []
+                except Exception as e:
+                    self._capture_page(sweep_id, query, started, error=str(e))
+                    if "429" in str(e) and attempt == 0:
+                        # Rate limit, wait and retry
+                        await asyncio.sleep(self.retry_delay)
+                        continue
+                    raise
+
+        # Overlapping windows need more requests to reach the same depth
+        step = limit - self.page_overlap
+        paginator = DriftSafePaginator(
+            fetch_page,
+            limit=limit,
+            overlap=self.page_overlap,
+            max_pages=-(-max_pages * limit // step),
+            keyset=self.keyset_pagination
+        )
+        try:
+            async for results in paginator.pages():
+                yield results
                 # Sleep to avoid rate limit
-                time.sleep(0.5)
-
-            except Exception as e:
-                if "429" in str(e):
-                    # Rate limit, wait and retry
-                    time.sleep(5)
-                    continue
-                else:
-                    print(f"Error searching gifts: {e}")
-                    break
-
-        # CLIENT-SIDE FILTERING: Keep only wanted gift+model combinations
-        filtered_results = []
-        for gift in all_results:
-            gift_name = gift.get('name', '')
-            attrs = gift.get('attributes', [])
-            model = next((a['value'] for a in attrs if a['type'] == 'model'), '')
-
-            # Check if this combination is in our wanted list
-            if (gift_name, model) in wanted_combinations:
-                filtered_results.append(gift)
-
-        return filtered_results
+                await asyncio.sleep(self.page_delay)
+        except Exception as e:
+            print(f"Error searching gifts: {e}")
+        else:
+            sweep_status['complete'] = paginator.complete
+        finally:
+            sweep_status['drift'] = paginator.stats.as_dict()
+
+    def _capture_page(self, sweep_id: Optional[str], query: dict, started: float,
+                      response: Optional[list] = None, error: Optional[str] = None):
+        if not (self.capture and sweep_id):
+            return
+        self.capture.write({
+            'type': 'page', 'sweep': sweep_id, 'ts': started,
+            'duration_ms': round((time.time() - started) * 1000, 1),
+            'params': {k: v for k, v in query.items() if k != 'authData'},
+            'response': response, 'error': error,
+        })
+
+    async def probe_floors(
+        self,
+        combinations: List[Tuple[str, str]],
+        concurrency: int = 5
+    ) -> Dict[Tuple[str, str], Optional[dict]]:
+        """
+        Get the cheapest listing of each combination with one request each.
+
+        Requests run concurrently (limit=1, cheapest first).
+
+        Args:
+            combinations: List of (gift_name, model) tuples
+            concurrency: Maximum requests in flight
+
+        Returns:
+            Dict mapping each combination to its floor listing (None if none
+            listed); combinations whose request failed are omitted
+        """
+        with span("token_fetch"):
+            token = await self.auth_manager.get_token()
+        portalsmp = self.portals or load_portalsmp()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def probe(combo: Tuple[str, str]) -> Optional[dict]:
+            gift_name, model = combo
+            async with semaphore:
+                for attempt in range(2):
+                    if self.rate_limiter:
+                        await self.rate_limiter.acquire()
+                    try:
+                        self.request_count += 1
+                        with span("portals.probe", gift=gift_name, model=model):
+                            results = await self._call_portals(
+                                portalsmp.search,
+                                authData=token,
+                                gift_name=[gift_name],
+                                model=[model],
+                                offset=0,
+                                limit=1,
+                                sort="price_asc"
+                            )
+                        break
+                    except Exception as e:
+                        if "429" in str(e) and attempt == 0:
+                            await asyncio.sleep(self.retry_delay)
+                            continue
+                        print(f"Error probing floor for {gift_name} - {model}: {e}")
+                        return failed
+
+            if not results:
+                return None
+            self.index.update(results)
+            return results[0]
+
+        failed = object()
+        floors = await asyncio.gather(*(probe(tuple(c)) for c in combinations))
+        return {
+            tuple(combo): floor
+            for combo, floor in zip(combinations, floors)
+            if floor is not failed
+        }
+
+    async def sample_listings(self, gift_names: List[str], pages: int = 5) -> List[dict]:
+        """
+        Sample each collection's listings regardless of price.
+
+        Monitoring sweeps stop at the price cap, so they only show the cheap
+        end of a collection. This reads the most recently listed pages
+        instead, which cover the whole price range.
+
+        Returns:
+            Listings of all collections (a failed collection contributes none)
+        """
+        with span("token_fetch"):
+            token = await self.auth_manager.get_token()
+        portalsmp = self.portals or load_portalsmp()
+        limit = PAGE_LIMIT
+
+        sample = []
+        for gift_name in gift_names:
+            with span("portals.sample", gift=gift_name) as sample_span:
+                seen = set()
+                try:
+                    for page in range(pages):
+                        if self.rate_limiter:
+                            await self.rate_limiter.acquire()
+                        self.request_count += 1
+                        results = await self._call_portals(
+                            portalsmp.search,
+                            authData=token,
+                            gift_name=[gift_name],
+                            offset=page * limit,
+                            limit=limit,
+                            sort="latest"
+                        ) or []
+                        # Pages shift as listings arrive; count each listing once
+                        sample.extend(g for g in results if g.get('id') not in seen)
+                        seen.update(g.get('id') for g in results)
+                        if len(results) < limit:
+                            break
+                except Exception as e:
+                    print(f"Error sampling {gift_name}: {e}")
+                sample_span.set(listings=len(seen))
+        return sample
+
+    async def find_repriced(
+        self,
+        missing: Dict[Tuple[str, str], List[str]],
+        min_price: float,
+        max_pages: int = 3
+    ) -> Dict[str, Optional[dict]]:
+        """
+        Look for listings that vanished from a capped sweep among the ones above the cap.
+
+        Pages each combination's listings from min_price up, cheapest first,
+        until all of its missing ids are found or the book ends.
+
+        Args:
+            missing: (gift_name, model) -> gift ids missing from the sweep
+            min_price: The sweep's price cap
+            max_pages: Page limit per combination
+
+        Returns:
+            Gift id -> listing if still for sale, None if the whole book
+            above the cap was read without it; ids not settled are omitted
+        """
+        found: Dict[str, Optional[dict]] = {}
+        for (gift_name, model), ids in missing.items():
+            wanted = set(ids)
+            status = {}
+            with span("portals.repriced", gift=gift_name, model=model, missing=len(wanted)):
+                async for results in self._search_pages([gift_name], [model], 999999, max_pages,
+                                                        status, min_price=min_price):
+                    for gift in results:
+                        if gift.get('id') in wanted:
+                            found[gift['id']] = gift
+                            wanted.discard(gift['id'])
+                    if not wanted:
+                        break
+            if wanted and status.get('complete'):
+                found.update(dict.fromkeys(wanted))
+        return found
+
+    async def find_gift(self, gift_name: str, number: int, max_pages: int = 20,
+                        max_age: Optional[float] = None) -> Optional[dict]:
+        """
+        Find a listing by gift name and collection number.
+
+        Answers from the lookup index when possible (entries older than
+        max_age seconds are searched again); on a miss, searches only that
+        gift's listings and stops at the page that contains it.
+        """
+        gift = self.index.lookup(gift_name, number, max_age)
+        if gift:
+            return gift
+
+        async for results in self._search_pages([gift_name], None, 999999, max_pages):
+            self.index.update(results)
+            gift = self.index.lookup(gift_name, number, max_age)
+            if gift:
+                return gift
+
+        return None
 
     @staticmethod
     def format_gift_info(gift: dict) -> dict:
@@ -122,10 +501,21 @@ class GiftSearcher:
             'symbol_rarity': symbol_rarity,
             'backdrop': backdrop,
             'backdrop_rarity': backdrop_rarity,
-            'url': f"https://portals.tg/gift/{gift.get('id')}",
+            'url': gift.get('url') or f"https://portals.tg/gift/{gift.get('id')}",
             'photo_url': gift.get('photo_url', ''),
+            'market': gift.get('market', 'portals'),
+            'offers': gift.get('offers', []),
+            'fair_value': gift.get('fair_value'),
+            'discount': gift.get('discount'),
         }
 
+    @staticmethod
+    def format_fair_value(info: dict) -> str:
+        """Fair value line for a caption (empty if there is no estimate)."""
+        if info.get('fair_value') is None:
+            return ""
+        return f"\n📊 Справедлива ціна: ~{info['fair_value']:g} TON ({-info['discount'] * 100:+.0f}% від оцінки)"
+
     async def format_gift_caption(self, info: dict) -> str:
         """Format gift information as Telegram caption with UAH price."""
         # Get TON price in UAH
@@ -134,11 +524,17 @@ class GiftSearcher:
 
         caption = f"""🎁 {info['name']} #{info['number']}
 
-💰 Ціна: {price_str}
+💰 Ціна: {price_str}{self.format_fair_value(info)}
 
 🎨 Модель: {info['model']} ({info['model_rarity']:.1f}%)
 🔣 Символ: {info['symbol']} ({info['symbol_rarity']:.1f}%)
 🖼️ Фон: {info['backdrop']} ({info['backdrop_rarity']:.1f}%)
 
 🔗 {info['url']}"""
+        if info.get('market', 'portals') != 'portals':
+            caption = f"🏪 {info['market']}\n{caption}"
+        if info.get('offers'):
+            caption += "\n\n🔁 Також: " + ", ".join(
+                f"{offer['market']} {offer['price']} TON" for offer in info['offers']
+            )
         return caption
@@ -0,0 +1,102 @@
+"""Single-leader lease so only one bot instance runs monitoring."""
+import contextlib
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """SQLite lease row with heartbeat and TTL."""
+
+    def __init__(self, db_path: str = "coordination.db", name: str = "monitoring", ttl: float = 15):
+        """
+        Initialize lease.
+
+        Args:
+            db_path: Path to the SQLite file shared by all instances
+            name: Lease name (one leader per name)
+            ttl: Seconds after the last heartbeat when the lease can be taken over
+        """
+        self.db_path = db_path
+        self.name = name
+        self.ttl = ttl
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._init_db()
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit (or roll back) on exit and close it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def heartbeat(self) -> bool:
+        """
+        Acquire or renew the lease.
+
+        Returns:
+            True if this instance holds the lease after the call
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)
+                ).fetchone()
+
+                if row is None or row[0] == self.holder_id or row[1] < now:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                        (self.name, self.holder_id, now + self.ttl)
+                    )
+                    leader = True
+                else:
+                    leader = False
+        except sqlite3.Error as e:
+            logger.error(f"Lease heartbeat failed: {e}")
+            leader = False
+
+        if leader != self.is_leader:
+            logger.info(f"Lease '{self.name}': {'acquired' if leader else 'lost'} by {self.holder_id}")
+        self.is_leader = leader
+        return leader
+
+    def release(self):
+        """Give up the lease so a standby can take over immediately."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder_id)
+            )
+        self.is_leader = False
+
+    def current_holder(self) -> dict:
+        """Get current lease holder info."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT holder, expires_at FROM leases WHERE name = ?", (self.name,)
+            ).fetchone()
+        if not row:
+            return {"holder": None, "expires_at": None}
+        return {"holder": row[0], "expires_at": row[1]}
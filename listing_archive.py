@@ -0,0 +1,297 @@
+"""Columnar on-disk archive of observed listings."""
+import argparse
+import array
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Fixed-width columns: name -> array typecode (little-endian on disk)
+NUMERIC_COLUMNS = {
+    'ts': 'd',               # Observation time (unix seconds)
+    'price': 'd',            # TON
+    'number': 'I',           # Collection number
+    'model_rarity': 'H',     # Per mille
+    'symbol_rarity': 'H',
+    'backdrop_rarity': 'H',
+}
+# Dictionary-encoded columns: codes are uint32 indexes into <column>.dict
+DICT_COLUMNS = ('gift_id', 'name', 'model', 'symbol', 'backdrop')
+
+NUMPY_DTYPES = {'d': '<f8', 'I': '<u4', 'H': '<u2'}
+
+
+def _attribute(gift: dict, kind: str):
+    return next((a for a in gift.get('attributes', []) if a.get('type') == kind), {})
+
+
+def _rarity(attribute: dict) -> int:
+    """Per mille rarity for the uint16 column; 0 is unknown, so rarer than 1 is stored as 1."""
+    value = float(attribute.get('rarity_per_mille') or 0)
+    return max(1, round(value)) if value > 0 else 0
+
+
+class ArchiveWriter:
+    """
+    Appends sweeps to the archive.
+
+    Every column is a separate file of fixed-width values; text columns
+    store codes into an append-only dictionary file. meta.json holds the
+    committed row count and is written last, so a crash mid-append leaves
+    extra bytes that are cut off the next time the archive is opened.
+    """
+
+    def __init__(self, directory: str = "archive"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.rows = self._read_meta().get('rows', 0)
+        self.dictionaries: Dict[str, Dict[str, int]] = {}
+        for column in DICT_COLUMNS:
+            values = _read_dictionary(directory, column)
+            self.dictionaries[column] = {value: code for code, value in enumerate(values)}
+        self._truncate()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._path("meta.json"), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _truncate(self):
+        """Cut columns back to the committed row count."""
+        for column, typecode in list(NUMERIC_COLUMNS.items()) + [(c, 'I') for c in DICT_COLUMNS]:
+            path = self._path(f"{column}.col")
+            size = self.rows * array.array(typecode).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _code(self, column: str, value, new_values: Dict[str, List[str]]) -> int:
+        value = str(value if value is not None else '').replace('\n', ' ')
+        codes = self.dictionaries[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            new_values[column].append(value)
+        return code
+
+    def append(self, gifts: Iterable[dict], ts: Optional[float] = None) -> int:
+        """
+        Append one sweep's listings.
+
+        Args:
+            gifts: Raw Portals listings
+            ts: Observation time (default: now)
+
+        Returns:
+            Number of rows appended
+        """
+        ts = time.time() if ts is None else ts
+        columns = {name: array.array(typecode) for name, typecode in NUMERIC_COLUMNS.items()}
+        columns.update({name: array.array('I') for name in DICT_COLUMNS})
+        new_values: Dict[str, List[str]] = {name: [] for name in DICT_COLUMNS}
+
+        for gift in gifts:
+            model = _attribute(gift, 'model')
+            symbol = _attribute(gift, 'symbol')
+            backdrop = _attribute(gift, 'backdrop')
+            try:
+                price = float(gift.get('price', 0))
+                number = int(gift.get('external_collection_number') or 0)
+            except (TypeError, ValueError):
+                continue
+
+            columns['ts'].append(ts)
+            columns['price'].append(price)
+            columns['number'].append(number)
+            columns['model_rarity'].append(_rarity(model))
+            columns['symbol_rarity'].append(_rarity(symbol))
+            columns['backdrop_rarity'].append(_rarity(backdrop))
+            columns['gift_id'].append(self._code('gift_id', gift.get('id'), new_values))
+            columns['name'].append(self._code('name', gift.get('name'), new_values))
+            columns['model'].append(self._code('model', model.get('value'), new_values))
+            columns['symbol'].append(self._code('symbol', symbol.get('value'), new_values))
+            columns['backdrop'].append(self._code('backdrop', backdrop.get('value'), new_values))
+
+        added = len(columns['ts'])
+        if not added:
+            return 0
+
+        # Dictionaries first: codes in the columns must always resolve
+        for column, values in new_values.items():
+            if values:
+                with open(self._path(f"{column}.dict"), 'a', encoding='utf-8') as f:
+                    f.write("".join(value + "\n" for value in values))
+
+        for column, values in columns.items():
+            if sys.byteorder == 'big':
+                values.byteswap()
+            with open(self._path(f"{column}.col"), 'ab') as f:
+                values.tofile(f)
+
+        self.rows += added
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'rows': self.rows, 'updated_at': time.time()}, f)
+        os.replace(tmp_path, self._path("meta.json"))
+        return added
+
+
+def _read_dictionary(directory: str, column: str) -> List[str]:
+    path = os.path.join(directory, f"{column}.dict")
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().split("\n")[:-1]
+
+
+class ArchiveReader:
+    """Memory-mapped NumPy views over the archive columns."""
+
+    def __init__(self, directory: str = "archive"):
+        import numpy as np
+
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), 'r') as f:
+            self.rows = json.load(f)['rows']
+
+        self.columns = {}
+        for column, typecode in list(NUMERIC_COLUMNS.items()) + [(c, 'I') for c in DICT_COLUMNS]:
+            path = os.path.join(directory, f"{column}.col")
+            if self.rows:
+                self.columns[column] = np.memmap(path, dtype=NUMPY_DTYPES[typecode], mode='r',
+                                                 shape=(self.rows,))
+            else:
+                self.columns[column] = np.zeros(0, dtype=NUMPY_DTYPES[typecode])
+        self.dictionaries = {column: _read_dictionary(directory, column) for column in DICT_COLUMNS}
+
+    def __getitem__(self, column: str):
+        return self.columns[column]
+
+    def code(self, column: str, value: str) -> int:
+        """Dictionary code of a value (-1 if it never occurred)."""
+        try:
+            return self.dictionaries[column].index(value)
+        except ValueError:
+            return -1
+
+    def decode(self, column: str, codes) -> List[str]:
+        values = self.dictionaries[column]
+        return [values[int(code)] for code in codes]
+
+    def mask(self, name: Optional[str] = None, model: Optional[str] = None,
+             min_price: Optional[float] = None, max_price: Optional[float] = None,
+             since: Optional[float] = None):
+        """Boolean row mask for the given filters."""
+        import numpy as np
+
+        mask = np.ones(self.rows, dtype=bool)
+        for column, value in (('name', name), ('model', model)):
+            if value is not None:
+                mask &= self.columns[column] == self.code(column, value)
+        if min_price is not None:
+            mask &= self.columns['price'] >= min_price
+        if max_price is not None:
+            mask &= self.columns['price'] <= max_price
+        if since is not None:
+            mask &= self.columns['ts'] >= since
+        return mask
+
+
+def _group_stats(reader: ArchiveReader, mask, by: str, top: int) -> List[str]:
+    import numpy as np
+
+    codes = reader[by][mask]
+    prices = reader['price'][mask]
+    ids = reader['gift_id'][mask]
+    lines = [f"{by:<28}{'rows':>9}{'listings':>10}{'min':>10}{'median':>10}{'mean':>10}"]
+    groups = np.unique(codes, return_counts=True)
+    for code, count in sorted(zip(*groups), key=lambda g: -g[1])[:top]:
+        selected = codes == code
+        group_prices = prices[selected]
+        lines.append(
+            f"{reader.decode(by, [code])[0][:27]:<28}{count:>9}{len(np.unique(ids[selected])):>10}"
+            f"{group_prices.min():>10.2f}{np.median(group_prices):>10.2f}{group_prices.mean():>10.2f}"
+        )
+    return lines
+
+
+def _rarity_stats(reader: ArchiveReader, mask, buckets: int = 10) -> List[str]:
+    import numpy as np
+
+    rarity = reader['model_rarity'][mask] / 10  # percent
+    prices = reader['price'][mask]
+    lines = [f"{'model rarity %':<20}{'rows':>9}{'median price':>14}{'mean price':>12}"]
+    if not len(rarity):
+        return lines
+    edges = np.unique(np.quantile(rarity, np.linspace(0, 1, buckets + 1)))
+    bucket = np.clip(np.searchsorted(edges, rarity, side='right') - 1, 0, len(edges) - 2)
+    for i in range(len(edges) - 1):
+        selected = bucket == i
+        if selected.any():
+            lines.append(f"{f'{edges[i]:.1f}-{edges[i + 1]:.1f}':<20}{selected.sum():>9}"
+                         f"{np.median(prices[selected]):>14.2f}{prices[selected].mean():>12.2f}")
+    if len(rarity) > 1 and rarity.std() and prices.std():
+        lines.append(f"correlation(rarity, price) = {np.corrcoef(rarity, prices)[0, 1]:.3f}")
+    return lines
+
+
+def _lifetimes(reader: ArchiveReader, mask, by: str, top: int) -> List[str]:
+    """Listing lifetime (first to last observation) per group."""
+    import numpy as np
+
+    ids = reader['gift_id'][mask]
+    ts = reader['ts'][mask]
+    groups = reader[by][mask]
+    if not len(ids):
+        return ["No rows"]
+    order = np.argsort(ids, kind='stable')
+    ids, ts, groups = ids[order], ts[order], groups[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    first = np.minimum.reduceat(ts, starts)
+    last = np.maximum.reduceat(ts, starts)
+    hours = (last - first) / 3600
+    group_of = groups[starts]
+
+    lines = [f"{by:<28}{'listings':>10}{'median h':>10}{'p90 h':>10}{'max h':>10}"]
+    codes, counts = np.unique(group_of, return_counts=True)
+    for code, count in sorted(zip(codes, counts), key=lambda g: -g[1])[:top]:
+        selected = hours[group_of == code]
+        lines.append(f"{reader.decode(by, [code])[0][:27]:<28}{count:>10}{np.median(selected):>10.1f}"
+                     f"{np.quantile(selected, 0.9):>10.1f}{selected.max():>10.1f}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan the listing archive")
+    parser.add_argument("report", choices=["prices", "rarity", "lifetimes"])
+    parser.add_argument("--dir", default=os.getenv("LISTING_ARCHIVE_DIR") or "archive")
+    parser.add_argument("--name", help="Gift name")
+    parser.add_argument("--model", help="Model")
+    parser.add_argument("--min-price", type=float)
+    parser.add_argument("--max-price", type=float)
+    parser.add_argument("--days", type=float, help="Only the last N days")
+    parser.add_argument("--by", default="model", choices=["name", "model", "symbol", "backdrop"])
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    reader = ArchiveReader(args.dir)
+    since = time.time() - args.days * 86400 if args.days else None
+    row_mask = reader.mask(args.name, args.model, args.min_price, args.max_price, since)
+
+    if args.report == "prices":
+        output = _group_stats(reader, row_mask, args.by, args.top)
+    elif args.report == "rarity":
+        output = _rarity_stats(reader, row_mask)
+    else:
+        output = _lifetimes(reader, row_mask, args.by, args.top)
+
+    print("\n".join(output))
+    print(f"\n{int(row_mask.sum())} of {reader.rows} rows scanned in "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,376 @@
+"""Marketplace adapters and concurrent multi-market search."""
+import abc
+import argparse
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from drift_pagination import DriftSafePaginator
+from tracing import span
+
+PORTALS = "portals"
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per second with bursts of `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Listing:
+    """A listing normalized across marketplaces."""
+
+    __slots__ = ('market', 'listing_id', 'name', 'number', 'model', 'symbol', 'backdrop',
+                 'model_rarity', 'symbol_rarity', 'backdrop_rarity', 'price', 'photo_url', 'url', 'raw')
+
+    def __init__(self, market: str, listing_id: str, name: str, number: Optional[int],
+                 model: str, price: float, symbol: str = '', backdrop: str = '',
+                 model_rarity: int = 0, symbol_rarity: int = 0, backdrop_rarity: int = 0,
+                 photo_url: str = '', url: str = '', raw: Optional[dict] = None):
+        self.market = market
+        self.listing_id = listing_id
+        self.name = name
+        self.number = number
+        self.model = model
+        self.price = price
+        self.symbol = symbol
+        self.backdrop = backdrop
+        # Rarities are per mille, as Portals reports them
+        self.model_rarity = model_rarity
+        self.symbol_rarity = symbol_rarity
+        self.backdrop_rarity = backdrop_rarity
+        self.photo_url = photo_url
+        self.url = url
+        # Original Portals listing, passed through unchanged by as_gift()
+        self.raw = raw
+
+    @classmethod
+    def from_portals(cls, gift: dict) -> 'Listing':
+        attrs = {a.get('type'): a for a in gift.get('attributes', [])}
+
+        def attr(kind: str) -> Tuple[str, int]:
+            a = attrs.get(kind, {})
+            return a.get('value', ''), int(a.get('rarity_per_mille') or 0)
+
+        model, model_rarity = attr('model')
+        symbol, symbol_rarity = attr('symbol')
+        backdrop, backdrop_rarity = attr('backdrop')
+        return cls(
+            PORTALS, gift.get('id'), gift.get('name', ''), gift.get('external_collection_number'),
+            model, float(gift.get('price', 0)), symbol, backdrop,
+            model_rarity, symbol_rarity, backdrop_rarity,
+            gift.get('photo_url', ''), f"https://portals.tg/gift/{gift.get('id')}", gift
+        )
+
+    def as_gift(self) -> dict:
+        """
+        Portals-shaped listing dict, so every market flows through the same
+        pipeline (diff, notifications, archive). Ids of other markets are
+        prefixed with the market name.
+        """
+        if self.raw is not None:
+            return dict(self.raw, market=self.market, url=self.url)
+        gift_id = self.listing_id if self.market == PORTALS else f"{self.market}:{self.listing_id}"
+        return {
+            'id': gift_id,
+            'name': self.name,
+            'external_collection_number': self.number,
+            'price': f"{self.price:g}",
+            'photo_url': self.photo_url,
+            'url': self.url,
+            'market': self.market,
+            'attributes': [
+                {'type': 'model', 'value': self.model, 'rarity_per_mille': self.model_rarity},
+                {'type': 'symbol', 'value': self.symbol, 'rarity_per_mille': self.symbol_rarity},
+                {'type': 'backdrop', 'value': self.backdrop, 'rarity_per_mille': self.backdrop_rarity},
+            ],
+        }
+
+
+class MarketAdapter(abc.ABC):
+    """
+    One marketplace.
+
+    Subclasses implement iter_listings(), yielding normalized listings page
+    by page, and set status['complete'] when the whole price range was
+    fetched. The status belongs to the call, so concurrent sweeps through
+    one adapter (a cycle and the fast lane) don't see each other's.
+    Requests go through the adapter's own rate limiter.
+    """
+
+    name = ""
+
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None):
+        self.rate_limiter = rate_limiter or RateLimiter(2)
+
+    @abc.abstractmethod
+    def iter_listings(self, wanted: List[Tuple[str, str]], max_price: float,
+                      max_pages: int = 20, status: Optional[dict] = None) -> AsyncIterator[List[Listing]]:
+        """Yield listings of the wanted combinations up to max_price, page by page."""
+
+
+class PortalsAdapter(MarketAdapter):
+    """Portals through GiftSearcher (portalsmp)."""
+
+    name = PORTALS
+
+    def __init__(self, searcher, rate_limiter: Optional[RateLimiter] = None):
+        super().__init__(rate_limiter)
+        self.searcher = searcher
+        self.searcher.rate_limiter = self.rate_limiter
+
+    async def iter_listings(self, wanted, max_price, max_pages=20, status=None):
+        """Also sets status['drift'] (see DriftStats)."""
+        status = {} if status is None else status
+        status['complete'] = False
+        if not wanted:
+            status['complete'] = True
+            return
+        async for gift in self.searcher.iter_gifts(wanted, max_price, max_pages, status):
+            yield [Listing.from_portals(gift)]
+        status['complete'] = bool(status.get('complete'))
+
+
+class JsonMarketAdapter(MarketAdapter):
+    """
+    Market with a JSON search endpoint.
+
+    GET {base_url}/listings?name=..&model=..&max_price=..&offset=..&limit=..&sort=price_asc
+    returns {"listings": [{"id", "name", "number", "model", "symbol", "backdrop",
+    "model_rarity", "symbol_rarity", "backdrop_rarity", "price", "photo_url", "url"}]},
+    cheapest first. Markets with a different API subclass this and override
+    fetch_page() and parse().
+    """
+
+    def __init__(self, name: str, base_url: str, rate_limiter: Optional[RateLimiter] = None,
+                 limit: int = 50, timeout: float = 15, headers: Optional[dict] = None):
+        super().__init__(rate_limiter)
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.limit = limit
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.request_count = 0
+
+    async def fetch_page(self, session, names: List[str], models: List[str], max_price: float,
+                         offset: int, limit: int) -> List[dict]:
+        params = [('name', n) for n in names] + [('model', m) for m in models]
+        params += [('max_price', str(max_price)), ('offset', str(offset)),
+                   ('limit', str(limit)), ('sort', 'price_asc')]
+        await self.rate_limiter.acquire()
+        self.request_count += 1
+        with span("market.page", market=self.name, offset=offset):
+            async with session.get(f"{self.base_url}/listings", params=params) as response:
+                response.raise_for_status()
+                return (await response.json()).get('listings', [])
+
+    def parse(self, item: dict) -> Listing:
+        return Listing(
+            self.name, str(item['id']), item.get('name', ''), item.get('number'),
+            item.get('model', ''), float(item['price']), item.get('symbol', ''),
+            item.get('backdrop', ''), int(item.get('model_rarity') or 0),
+            int(item.get('symbol_rarity') or 0), int(item.get('backdrop_rarity') or 0),
+            item.get('photo_url', ''), item.get('url', '')
+        )
+
+    async def iter_listings(self, wanted, max_price, max_pages=20, status=None):
+        import aiohttp
+
+        status = {} if status is None else status
+        status['complete'] = False
+        if not wanted:
+            status['complete'] = True
+            return
+        wanted_set = set(tuple(c) for c in wanted)
+        names = sorted({name for name, _ in wanted_set})
+        models = sorted({model for _, model in wanted_set})
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout, headers=self.headers) as session:
+            async def fetch(offset, limit, min_price):
+                return await self.fetch_page(session, names, models, max_price, offset, limit)
+
+            paginator = DriftSafePaginator(fetch, limit=self.limit, max_pages=max_pages)
+            async for page in paginator.pages():
+                listings = []
+                for item in page:
+                    try:
+                        listing = self.parse(item)
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if (listing.name, listing.model) in wanted_set:
+                        listings.append(listing)
+                yield listings
+            status['complete'] = paginator.complete
+
+
+class MarketFanout:
+    """Searches every enabled market concurrently."""
+
+    def __init__(self, adapters: List[MarketAdapter]):
+        self.adapters = adapters
+
+    @property
+    def names(self) -> List[str]:
+        return [adapter.name for adapter in self.adapters]
+
+    async def search(self, wanted: List[Tuple[str, str]], max_price: float, sink: list,
+                     max_pages: int = 20,
+                     wanted_by_market: Optional[Dict[str, list]] = None,
+                     statuses: Optional[Dict[str, dict]] = None) -> Dict[str, bool]:
+        """
+        Query all markets at once, appending Portals-shaped listings to sink as they arrive.
+
+        A market that fails doesn't affect the others. If the search is
+        cancelled, whatever reached the sink is kept.
+
+        Args:
+            wanted: (name, model) combinations to search
+            max_price: Maximum price in TON
+            sink: List receiving the listings
+            max_pages: Page limit per market
+            wanted_by_market: Per-market replacement for wanted (an empty
+                list skips that market)
+            statuses: Optional dict receiving each market's sweep status
+
+        Returns:
+            Dict market name -> whether it was fetched completely
+        """
+        wanted_by_market = wanted_by_market or {}
+        statuses = {} if statuses is None else statuses
+        for adapter in self.adapters:
+            statuses[adapter.name] = {'complete': False}
+
+        async def run(adapter: MarketAdapter):
+            combos = wanted_by_market.get(adapter.name, wanted)
+            status = statuses[adapter.name]
+            with span("market.search", market=adapter.name, combinations=len(combos)) as market_span:
+                try:
+                    async for listings in adapter.iter_listings(combos, max_price, max_pages, status):
+                        sink.extend(listing.as_gift() for listing in listings)
+                except Exception as e:
+                    status['complete'] = False
+                    print(f"Помилка пошуку на {adapter.name}: {e}")
+                market_span.set(complete=status['complete'])
+
+        await asyncio.gather(*(run(adapter) for adapter in self.adapters))
+        return {name: bool(status['complete']) for name, status in statuses.items()}
+
+
+def match_offers(gifts: Iterable[dict]) -> int:
+    """
+    Match the same gift listed on several markets by name and collection number.
+
+    Every listing of a matched gift gets an 'offers' list with the other
+    markets' prices, cheapest first, and 'best_offer' telling whether it is
+    the cheapest one (ties go to Portals), so the gift is alerted once.
+
+    Returns:
+        Number of gifts listed on more than one market
+    """
+    groups: Dict[Tuple[str, object], List[dict]] = {}
+    for gift in gifts:
+        if gift.get('external_collection_number') is None:
+            continue
+        key = (str(gift.get('name', '')).lower(), gift.get('external_collection_number'))
+        groups.setdefault(key, []).append(gift)
+
+    matched = 0
+    for listings in groups.values():
+        if len({g.get('market', PORTALS) for g in listings}) < 2:
+            continue
+        matched += 1
+        best = min(listings, key=lambda g: (float(g.get('price', 0)), g.get('market', PORTALS) != PORTALS))
+        for gift in listings:
+            gift['best_offer'] = gift is best
+            gift['offers'] = sorted(
+                ({'market': other.get('market', PORTALS), 'price': other.get('price'), 'url': other.get('url')}
+                 for other in listings if other is not gift),
+                key=lambda offer: float(offer['price'])
+            )
+    return matched
+
+
+def adapters_from_env(searcher) -> List[MarketAdapter]:
+    """
+    Build the enabled adapters.
+
+    Portals is always enabled (PORTALS_RATE requests/s). EXTRA_MARKETS adds
+    JSON markets as comma separated name=base_url[@rate] entries.
+    """
+    adapters: List[MarketAdapter] = [
+        PortalsAdapter(searcher, RateLimiter(float(os.getenv('PORTALS_RATE', '2'))))
+    ]
+    for entry in filter(None, (e.strip() for e in os.getenv('EXTRA_MARKETS', '').split(','))):
+        name, _, url = entry.partition('=')
+        url, _, rate = url.partition('@')
+        adapters.append(JsonMarketAdapter(name.strip(), url.strip(), RateLimiter(float(rate or 2))))
+    return adapters
+
+
+def _standin_app(market: str, seed: int, size: int):
+    """aiohttp app serving a random order book in JsonMarketAdapter's format."""
+    import random
+    from aiohttp import web
+
+    rng = random.Random(seed)
+    names = ["Ionic Dryer", "Spring Basket", "Jolly Chimp"]
+    models = ["Love Burst", "Ritual Goat", "La Baboon"]
+    book = sorted((
+        {
+            'id': f"{market}-{i}", 'name': rng.choice(names), 'number': rng.randint(1, 5000),
+            'model': rng.choice(models), 'symbol': 'Star', 'backdrop': 'Black',
+            'model_rarity': rng.choice([5, 10, 20]), 'symbol_rarity': 4, 'backdrop_rarity': 12,
+            'price': round(rng.uniform(3, 60), 2), 'photo_url': '', 'url': f"https://example.com/{i}",
+        }
+        for i in range(size)
+    ), key=lambda item: item['price'])
+
+    async def listings(request):
+        query = request.query
+        wanted_names = set(query.getall('name', [])) or None
+        wanted_models = set(query.getall('model', [])) or None
+        max_price = float(query.get('max_price', 1e9))
+        rows = [
+            item for item in book
+            if (wanted_names is None or item['name'] in wanted_names)
+            and (wanted_models is None or item['model'] in wanted_models)
+            and item['price'] <= max_price
+        ]
+        offset, limit = int(query.get('offset', 0)), int(query.get('limit', 50))
+        return web.json_response({'listings': rows[offset:offset + limit]})
+
+    app = web.Application()
+    app.router.add_get("/listings", listings)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in marketplace for adapter tests")
+    parser.add_argument("--name", default="standin")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--size", type=int, default=500)
+    args = parser.parse_args()
+
+    from aiohttp import web
+
+    print(f"EXTRA_MARKETS={args.name}=http://localhost:{args.port}")
+    web.run_app(_standin_app(args.name, args.seed, args.size), port=args.port)
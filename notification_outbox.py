@@ -0,0 +1,251 @@
+"""Persistent notification outbox with per-item acknowledgement."""
+import asyncio
+import contextlib
+import hashlib
+import logging
+import sqlite3
+import time
+from datetime import timedelta
+from typing import Callable, Iterator, List, Optional
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutbox:
+    """Durable queue of messages waiting to be delivered to Telegram."""
+
+    def __init__(self, db_path: str = "coordination.db", max_attempts: int = 3):
+        """
+        Initialize outbox.
+
+        Args:
+            db_path: Path to the SQLite file
+            max_attempts: Failed sends after which an item is given up
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._init_db()
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit (or roll back) on exit and close it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.row_factory = sqlite3.Row
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    dedup_key TEXT NOT NULL UNIQUE,
+                    chat_id TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    photo_url TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    sent_at REAL,
+                    failed INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (sent_at, failed, id)"
+            )
+
+    def enqueue_batch(self, chat_id: str, header: Optional[str], items: List[dict]) -> int:
+        """
+        Durably store a batch of notifications.
+
+        Items already in the outbox (same dedup key) are ignored, so a batch
+        re-enqueued after a crash does not produce duplicates. The header is
+        only stored when at least one item is new.
+
+        Args:
+            chat_id: Destination chat
+            header: Optional text sent before the items
+            items: Dicts with 'key', 'text' and optional 'photo_url'
+
+        Returns:
+            Number of newly stored items (header excluded)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            header_id = None
+            if header:
+                digest = hashlib.sha1("|".join(sorted(i['key'] for i in items)).encode()).hexdigest()
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO outbox (dedup_key, chat_id, text, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (f"header:{chat_id}:{digest}", chat_id, header, now)
+                )
+                header_id = cur.lastrowid if cur.rowcount else None
+
+            added = 0
+            for item in items:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO outbox (dedup_key, chat_id, text, photo_url, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (f"{chat_id}:{item['key']}", chat_id, item['text'], item.get('photo_url'), now)
+                )
+                added += cur.rowcount
+
+            if header_id and not added:
+                conn.execute("DELETE FROM outbox WHERE id = ?", (header_id,))
+
+        return added
+
+    def pending(self, limit: Optional[int] = None) -> List[sqlite3.Row]:
+        """Get undelivered items in enqueue order."""
+        query = "SELECT * FROM outbox WHERE sent_at IS NULL AND failed = 0 ORDER BY id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            return conn.execute(query).fetchall()
+
+    def pending_count(self) -> int:
+        """Get number of undelivered items."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE sent_at IS NULL AND failed = 0"
+            ).fetchone()[0]
+
+    def ack(self, item_id: int):
+        """Mark an item as delivered."""
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET sent_at = ? WHERE id = ?", (time.time(), item_id))
+
+    def record_failure(self, item_id: int) -> bool:
+        """
+        Count a failed send.
+
+        Returns:
+            True if the item was given up after too many attempts
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", (item_id,))
+            conn.execute(
+                "UPDATE outbox SET failed = 1 WHERE id = ? AND attempts >= ?",
+                (item_id, self.max_attempts)
+            )
+            row = conn.execute("SELECT failed FROM outbox WHERE id = ?", (item_id,)).fetchone()
+        return bool(row and row['failed'])
+
+    def purge_delivered(self, max_age_seconds: float = 7 * 24 * 3600):
+        """Delete old delivered or abandoned items."""
+        cutoff = time.time() - max_age_seconds
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM outbox WHERE (sent_at IS NOT NULL OR failed = 1) AND created_at < ?",
+                (cutoff,)
+            )
+
+
+class OutboxDispatcher:
+    """Drains the outbox to Telegram, acknowledging each item after it is sent."""
+
+    def __init__(self, outbox: NotificationOutbox, bot, delay: float = 0.5):
+        """
+        Initialize dispatcher.
+
+        Args:
+            outbox: Outbox to drain
+            bot: telegram.Bot used for sending
+            delay: Seconds between messages
+        """
+        self.outbox = outbox
+        self.bot = bot
+        self.delay = delay
+        self.flood_waits = 0
+        self._lock = asyncio.Lock()
+
+    async def send_item(self, item: sqlite3.Row):
+        """Send one outbox item, falling back to text if the photo is rejected."""
+        with span("telegram.send", item_id=item['id'], photo=bool(item['photo_url'])):
+            await self._send(item)
+
+    async def _send(self, item: sqlite3.Row):
+        if item['photo_url']:
+            try:
+                await self.bot.send_photo(
+                    chat_id=item['chat_id'],
+                    photo=item['photo_url'],
+                    caption=item['text']
+                )
+                return
+            except Exception as e:
+                if item['attempts'] + 1 < self.outbox.max_attempts:
+                    raise
+                logger.warning(f"Photo send failed for outbox item {item['id']}, sending text: {e}")
+
+        await self.bot.send_message(chat_id=item['chat_id'], text=item['text'])
+
+    async def send_flood_aware(self, item: sqlite3.Row, deadline: Optional[float] = None) -> bool:
+        """
+        Send an item, waiting out Telegram flood control (429 retry_after).
+
+        Flood control is not a failed attempt.
+
+        Returns:
+            False if the wait would pass the deadline (the item was not sent)
+        """
+        while True:
+            try:
+                await self.send_item(item)
+                return True
+            except Exception as e:
+                retry_after = getattr(e, 'retry_after', None)
+                if retry_after is None:
+                    raise
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                self.flood_waits += 1
+                if deadline is not None and time.monotonic() + retry_after >= deadline:
+                    return False
+                logger.warning(f"Flood control, waiting {retry_after} s before outbox item {item['id']}")
+                await asyncio.sleep(retry_after)
+
+    async def drain(self, deadline: Optional[float] = None,
+                    may_send: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Deliver pending items in order until the outbox is empty or a send fails.
+
+        Args:
+            deadline: Optional time.monotonic() value after which no new send
+                is started; the rest stays queued for the next drain
+            may_send: Optional check before each send (e.g. still the leader);
+                when it returns False the rest stays queued
+
+        Returns:
+            Number of items delivered
+        """
+        async with self._lock:
+            sent = 0
+            for item in self.outbox.pending():
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                if may_send is not None and not may_send():
+                    break
+                try:
+                    if not await self.send_flood_aware(item, deadline):
+                        break
+                except Exception as e:
+                    gave_up = self.outbox.record_failure(item['id'])
+                    logger.error(f"Failed to send outbox item {item['id']}: {e}")
+                    if not gave_up:
+                        # Keep order: retry this item first on the next drain
+                        break
+                    continue
+
+                self.outbox.ack(item['id'])
+                sent += 1
+                await asyncio.sleep(self.delay)
+
+            return sent
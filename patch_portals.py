@@ -1,9 +1,118 @@
 """Patch portalsmp to use correct domain."""
 import sys
 import os
+import types
+
+OLD_DOMAIN = 'portals-market.com'
+NEW_DOMAIN = 'portals.tg'
+
+_runtime_patched = False
+
+
+def _patch_code(code: types.CodeType) -> types.CodeType:
+    """Return a copy of a code object with the domain replaced in its constants."""
+    consts = []
+    for const in code.co_consts:
+        if isinstance(const, str) and OLD_DOMAIN in const:
+            const = const.replace(OLD_DOMAIN, NEW_DOMAIN)
+        elif isinstance(const, types.CodeType):
+            const = _patch_code(const)
+        consts.append(const)
+    return code.replace(co_consts=tuple(consts))
+
+
+def _patch_value(value):
+    """
+    Return value with the domain replaced in it and in any strings it contains.
+
+    Dicts and lists are patched in place, so other references to them (for
+    example a HEADERS dict imported elsewhere) see the new domain too.
+    """
+    if isinstance(value, str):
+        return value.replace(OLD_DOMAIN, NEW_DOMAIN)
+    if isinstance(value, dict):
+        for key, item in list(value.items()):
+            value[key] = _patch_value(item)
+    elif isinstance(value, list):
+        value[:] = [_patch_value(item) for item in value]
+    elif isinstance(value, tuple):
+        return tuple(_patch_value(item) for item in value)
+    return value
+
+
+def _contains_domain(value) -> bool:
+    if isinstance(value, str):
+        return OLD_DOMAIN in value
+    if isinstance(value, dict):
+        return any(_contains_domain(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_contains_domain(item) for item in value)
+    return False
+
+
+def _patch_module(module: types.ModuleType) -> int:
+    """
+    Replace the domain in a module's globals (strings, and strings inside
+    dicts, lists and tuples such as HEADERS) and in its functions' constants
+    and default arguments.
+    """
+    patched = 0
+    for name, value in list(vars(module).items()):
+        if _contains_domain(value):
+            setattr(module, name, _patch_value(value))
+            patched += 1
+        elif isinstance(value, types.FunctionType) and value.__module__ == module.__name__:
+            changed = False
+            new_code = _patch_code(value.__code__)
+            if new_code.co_consts != value.__code__.co_consts:
+                value.__code__ = new_code
+                changed = True
+            if _contains_domain(value.__defaults__):
+                value.__defaults__ = _patch_value(value.__defaults__)
+                changed = True
+            if _contains_domain(value.__kwdefaults__):
+                _patch_value(value.__kwdefaults__)
+                changed = True
+            patched += changed
+    return patched
+
+
+def apply_runtime_patch() -> bool:
+    """
+    Point portalsmp at portals.tg in memory, without touching site-packages.
+
+    Safe to call repeatedly; only the first call does any work.
+
+    Returns:
+        True if portalsmp is importable and patched
+    """
+    global _runtime_patched
+    if _runtime_patched:
+        return True
+
+    try:
+        import portalsmp
+    except ImportError:
+        return False
+
+    for module in list(sys.modules.values()):
+        if module and module.__name__.startswith('portalsmp'):
+            _patch_module(module)
+
+    _runtime_patched = True
+    return True
+
+
+def load_portalsmp():
+    """Import portalsmp on first use with the runtime domain fix applied."""
+    import portalsmp
+
+    apply_runtime_patch()
+    return portalsmp
+
 
 def patch_portalsmp():
-    """Replace portals-market.com with portals.tg in portalsmp."""
+    """Replace portals-market.com with portals.tg in portalsmp's installed files."""
     try:
         import portalsmp
         import inspect
@@ -44,6 +153,7 @@ def patch_portalsmp():
         print(f"❌ Error patching portalsmp: {e}")
         return False
 
+
 if __name__ == "__main__":
     success = patch_portalsmp()
     sys.exit(0 if success else 1)
@@ -8,6 +8,8 @@ from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+SESSION_FILE = "account.session"
+
 
 class PortalsAuthManager:
     """Manages Portals authentication with automatic token refresh."""
@@ -40,8 +42,14 @@ class PortalsAuthManager:
                 # Decode base64 to binary
                 session_data = base64.b64decode(session_base64)
 
+                # Skip the write if the session on disk is already up to date
+                if os.path.exists(SESSION_FILE):
+                    with open(SESSION_FILE, "rb") as f:
+                        if f.read() == session_data:
+                            return
+
                 # Write to account.session file
-                with open("account.session", "wb") as f:
+                with open(SESSION_FILE, "wb") as f:
                     f.write(session_data)
 
                 logger.info("✓ Session file decoded from TELEGRAM_SESSION_BASE64")
@@ -77,10 +85,11 @@ class PortalsAuthManager:
             logger.info("Refreshing Portals authentication token...")
 
             # Import here to avoid dependency if not using auto-auth
-            from portalsmp import update_auth
+            from patch_portals import load_portalsmp
+            portalsmp = load_portalsmp()
 
             # Get new token
-            self.auto_token = await update_auth(
+            self.auto_token = await portalsmp.update_auth(
                 api_id=int(self.api_id),
                 api_hash=self.api_hash
             )
@@ -0,0 +1,197 @@
+"""Capture of raw Portals responses and offline replay through the search pipeline."""
+import argparse
+import asyncio
+import glob
+import gzip
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+
+class CaptureWriter:
+    """
+    Appends capture records to gzip-compressed JSON lines segments.
+
+    Records are flushed at the end of every sweep, so a crash loses at most
+    the sweep in progress. A new segment is started every segment_records
+    records.
+    """
+
+    def __init__(self, directory: str = "captures", segment_records: int = 5000):
+        """
+        Initialize writer.
+
+        Args:
+            directory: Directory for segment files
+            segment_records: Records per segment
+        """
+        self.directory = directory
+        self.segment_records = segment_records
+        self._file = None
+        self._records = 0
+        self._segment = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self):
+        self._segment += 1
+        name = f"portals-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._segment:04d}.jsonl.gz"
+        self._file = gzip.open(os.path.join(self.directory, name), 'wt', encoding='utf-8')
+        self._records = 0
+
+    def write(self, record: dict):
+        if self._file is None or self._records >= self.segment_records:
+            self.close()
+            self._open()
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._records += 1
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def load_records(directory: str) -> Iterator[dict]:
+    """Read capture records from all segments in a directory, oldest first."""
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl.gz"))):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except (EOFError, OSError):
+            # Segment cut short by a crash: keep what was flushed
+            continue
+
+
+class CapturedSweep:
+    """One recorded search_gifts sweep: its arguments and page responses."""
+
+    __slots__ = ('sweep_id', 'wanted', 'max_price', 'max_pages', 'pages', 'matches', 'complete')
+
+    def __init__(self, record: dict):
+        self.sweep_id = record['sweep']
+        self.wanted = [tuple(c) for c in record['wanted']]
+        self.max_price = record['max_price']
+        self.max_pages = record['max_pages']
+        self.pages: List[dict] = []
+        self.matches: Optional[int] = None
+        self.complete: Optional[bool] = None
+
+
+def load_sweeps(directory: str) -> List[CapturedSweep]:
+    """Group capture records into sweeps (pages without a sweep are skipped)."""
+    sweeps: Dict[str, CapturedSweep] = {}
+    for record in load_records(directory):
+        kind = record.get('type')
+        if kind == 'sweep':
+            sweeps[record['sweep']] = CapturedSweep(record)
+        elif record.get('sweep') in sweeps:
+            sweep = sweeps[record['sweep']]
+            if kind == 'page':
+                sweep.pages.append(record)
+            elif kind == 'end':
+                sweep.matches = record.get('matches')
+                sweep.complete = record.get('complete')
+    return list(sweeps.values())
+
+
+class ReplaySource:
+    """
+    Stands in for the portalsmp module, answering search() from a recorded sweep.
+
+    Responses are returned in the order they were recorded; a request whose
+    offset or limit differs from the recording is reported as a divergence.
+    """
+
+    def __init__(self):
+        self.pages: List[dict] = []
+        self.position = 0
+        self.divergences = 0
+
+    def load(self, sweep: CapturedSweep):
+        self.pages = sweep.pages
+        self.position = 0
+
+    def search(self, **query):
+        if self.position >= len(self.pages):
+            # The recording ended here (page limit, error or cancellation)
+            return []
+        record = self.pages[self.position]
+        self.position += 1
+        params = record['params']
+        if params.get('offset') != query.get('offset') or params.get('limit') != query.get('limit'):
+            self.divergences += 1
+        if record.get('error'):
+            raise Exception(record['error'])
+        return record['response']
+
+
+class ReplayAuth:
+    """Auth manager stand-in for offline replay."""
+
+    async def get_token(self) -> str:
+        return "replay"
+
+
+async def replay(directory: str, repeat: int = 1, verbose: bool = False) -> dict:
+    """
+    Run recorded sweeps through GiftSearcher.search_gifts offline, without delays.
+
+    Returns:
+        Totals: sweeps, pages, matches, mismatches, divergences, seconds
+    """
+    from gift_searcher import GiftSearcher
+
+    sweeps = load_sweeps(directory)
+    source = ReplaySource()
+    totals = {'sweeps': 0, 'pages': 0, 'matches': 0, 'mismatches': 0, 'divergences': 0, 'seconds': 0.0}
+
+    searcher = GiftSearcher(portals=source)
+    searcher.capture = None
+    searcher.auth_manager = ReplayAuth()
+    searcher.page_delay = 0
+    searcher.retry_delay = 0
+
+    for _ in range(repeat):
+        for sweep in sweeps:
+            source.load(sweep)
+
+            started = time.perf_counter()
+            gifts = await searcher.search_gifts(sweep.wanted, sweep.max_price, sweep.max_pages)
+            elapsed = time.perf_counter() - started
+
+            totals['sweeps'] += 1
+            totals['pages'] += source.position
+            totals['matches'] += len(gifts)
+            totals['seconds'] += elapsed
+            if sweep.matches is not None and sweep.matches != len(gifts):
+                totals['mismatches'] += 1
+            if verbose:
+                print(f"{sweep.sweep_id}  pages={source.position:>3}  matches={len(gifts):>4}"
+                      f" (recorded {sweep.matches})  {elapsed * 1000:.1f} ms")
+
+    totals['divergences'] = source.divergences
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured Portals responses offline")
+    parser.add_argument("directory", nargs="?", default=os.getenv("PORTALS_CAPTURE_DIR") or "captures")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay every sweep N times")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every sweep")
+    args = parser.parse_args()
+
+    result = asyncio.run(replay(args.directory, args.repeat, args.verbose))
+    pages_per_s = result['pages'] / result['seconds'] if result['seconds'] else 0
+    print(f"Sweeps: {result['sweeps']}  Pages: {result['pages']}  Matches: {result['matches']}")
+    print(f"Time: {result['seconds']:.3f} s ({pages_per_s:.0f} pages/s)")
+    print(f"Match count differs from recording: {result['mismatches']}  "
+          f"Request divergences: {result['divergences']}")
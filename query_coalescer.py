@@ -0,0 +1,61 @@
+"""Coalescing of identical in-flight queries."""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class _InFlight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class QueryCoalescer:
+    """
+    Runs identical concurrent queries once and shares the result.
+
+    Callers asking for a key that is already running wait for the same task
+    instead of starting another. A caller that is cancelled stops waiting
+    without affecting the others; the query itself is cancelled only when
+    nobody is waiting for it any more.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, _InFlight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry.task is task:
+            del self._inflight[key]
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable]):
+        """
+        Get the result of the query identified by key.
+
+        Args:
+            key: Hashable identity of the query
+            factory: Called without arguments to start the query if none is running
+
+        Returns:
+            The query's result (shared between coalesced callers)
+        """
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(factory())
+            entry = self._inflight[key] = _InFlight(task)
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                entry.task.cancel()
+                self._forget(key, entry.task)
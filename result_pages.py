@@ -0,0 +1,167 @@
+"""Paginated result sets for /showall and /show with inline keyboards."""
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from summary_aggregator import SummaryAggregator
+from telegram_text import MESSAGE_LIMIT, telegram_length, truncate
+
+SORT_LABELS = {
+    'p': "💰 За ціною",
+    'r': "💎 За рідкістю",
+}
+
+
+def rarity_score(info: dict) -> float:
+    """Combined rarity of a gift (lower is rarer)."""
+    return info['model_rarity'] * info['symbol_rarity'] * info['backdrop_rarity']
+
+
+class ResultCursor:
+    """A stored result set that pages are rendered from."""
+
+    def __init__(self, title: str, infos: List[dict], summary: SummaryAggregator,
+                 ton_price_uah: Optional[float]):
+        self.title = title
+        self.infos = infos
+        self.summary = summary
+        self.ton_price_uah = ton_price_uah
+        self.combos = sorted(summary.combos)
+        self.created_at = time.monotonic()
+        self._views: Dict[Tuple[str, int], List[dict]] = {}
+
+    def view(self, sort: str, combo_index: int) -> List[dict]:
+        """Get gifts for a sort order and combination filter (memoized)."""
+        key = (sort, combo_index)
+        if key not in self._views:
+            infos = self.infos
+            if 0 <= combo_index < len(self.combos):
+                combo = self.combos[combo_index]
+                infos = [i for i in infos if (i['name'], i['model']) == combo]
+            if sort == 'r':
+                infos = sorted(infos, key=lambda i: (rarity_score(i), float(i['price'])))
+            else:
+                infos = sorted(infos, key=lambda i: float(i['price']))
+            self._views[key] = infos
+        return self._views[key]
+
+
+class ResultPageStore:
+    """Keeps result cursors in memory and renders pages from them."""
+
+    def __init__(self, price_formatter: Callable, ttl: float = 900,
+                 page_size: int = 10, max_cursors: int = 100):
+        """
+        Initialize store.
+
+        Args:
+            price_formatter: Function (ton_amount, ton_price_uah) -> str
+            ttl: Seconds a cursor stays valid
+            page_size: Gifts per page
+            max_cursors: Cursors kept before the oldest are dropped
+        """
+        self.price_formatter = price_formatter
+        self.ttl = ttl
+        self.page_size = page_size
+        self.max_cursors = max_cursors
+        self._cursors: Dict[str, ResultCursor] = {}
+
+    def create(self, title: str, infos: List[dict], summary: SummaryAggregator,
+               ton_price_uah: Optional[float]) -> str:
+        """Store a result set and return its cursor id."""
+        self._expire()
+        cursor_id = uuid.uuid4().hex[:12]
+        self._cursors[cursor_id] = ResultCursor(title, infos, summary, ton_price_uah)
+        while len(self._cursors) > self.max_cursors:
+            self._cursors.pop(next(iter(self._cursors)))
+        return cursor_id
+
+    def get(self, cursor_id: str) -> Optional[ResultCursor]:
+        """Get a cursor, or None if it is unknown or expired."""
+        self._expire()
+        return self._cursors.get(cursor_id)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for cursor_id in [c for c, cur in self._cursors.items() if cur.created_at < cutoff]:
+            del self._cursors[cursor_id]
+
+    def render(self, cursor_id: str, page: int = 0, sort: str = 'p',
+               combo_index: int = -1) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+        """
+        Render one page of a stored result set.
+
+        Returns:
+            (text, keyboard) or None if the cursor expired
+        """
+        cursor = self.get(cursor_id)
+        if not cursor:
+            return None
+
+        infos = cursor.view(sort, combo_index)
+        page_count = max(1, (len(infos) + self.page_size - 1) // self.page_size)
+        page = min(max(page, 0), page_count - 1)
+
+        text = f"✅ {cursor.title}: {cursor.summary.total} пропозицій\n"
+        if 0 <= combo_index < len(cursor.combos):
+            combo = cursor.combos[combo_index]
+            text += f"🎯 Фільтр: {combo[0]} - {combo[1]} ({cursor.summary.combos[combo].count} шт.)\n"
+        if len(cursor.infos) < cursor.summary.total:
+            text += f"📄 Показано {cursor.summary.keep} найдешевших кожної пари\n"
+        text += "\n"
+
+        if page == 0 and combo_index < 0:
+            text += cursor.summary.render_summary(self.price_formatter, cursor.ton_price_uah)
+            text += "\n━━━━━━━━━━━━━━━━━━━━\n\n"
+
+        start = page * self.page_size
+        items = ""
+        for i, info in enumerate(infos[start:start + self.page_size], start + 1):
+            price_str = self.price_formatter(info['price'], cursor.ton_price_uah)
+            items += f"{i}. {info['name']} #{info['number']}\n"
+            items += f"   {price_str} | {info['model']} | Символ: {info['symbol']} | Фон: {info['backdrop']}\n"
+            items += f"   🔗 {info['url']}\n\n"
+
+        # Keep the page itself intact; trim the summary if needed
+        text = truncate(text, MESSAGE_LIMIT - telegram_length(items), "…\n") + items
+
+        return text, self._keyboard(cursor_id, cursor, page, page_count, sort, combo_index)
+
+    @staticmethod
+    def _keyboard(cursor_id: str, cursor: ResultCursor, page: int, page_count: int,
+                  sort: str, combo_index: int) -> InlineKeyboardMarkup:
+        def data(p=page, s=sort, c=combo_index):
+            return f"pg:{cursor_id}:{p}:{s}:{c}"
+
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton("◀️", callback_data=data(p=page - 1)))
+        nav.append(InlineKeyboardButton(f"{page + 1}/{page_count}", callback_data="pg:noop"))
+        if page < page_count - 1:
+            nav.append(InlineKeyboardButton("▶️", callback_data=data(p=page + 1)))
+
+        next_sort = 'r' if sort == 'p' else 'p'
+        next_combo = combo_index + 1 if combo_index + 1 < len(cursor.combos) else -1
+        if next_combo >= 0:
+            filter_label = f"🎯 {cursor.combos[next_combo][1]}"
+        else:
+            filter_label = "🎯 Всі пари"
+
+        controls = [InlineKeyboardButton(SORT_LABELS[next_sort], callback_data=data(p=0, s=next_sort))]
+        if len(cursor.combos) > 1:
+            controls.append(InlineKeyboardButton(filter_label, callback_data=data(p=0, c=next_combo)))
+
+        return InlineKeyboardMarkup([nav, controls])
+
+    @staticmethod
+    def parse_callback(data: str) -> Optional[Tuple[str, int, str, int]]:
+        """Parse callback data into (cursor_id, page, sort, combo_index)."""
+        parts = data.split(':')
+        if len(parts) != 5 or parts[0] != 'pg':
+            return None
+        try:
+            return parts[1], int(parts[2]), parts[3], int(parts[4])
+        except ValueError:
+            return None
@@ -26,6 +26,12 @@ async def setup_commands():
         BotCommand("delete", "Видалити пару з моніторингу"),
         BotCommand("setprice", "Встановити максимальну ціну"),
         BotCommand("setinterval", "Встановити інтервал перевірки"),
+        BotCommand("probe", "Режим перевірки мінімальної ціни"),
+        BotCommand("alerts", "Типи сповіщень"),
+        BotCommand("discount", "Мін. знижка до справедливої ціни"),
+        BotCommand("dashboard", "Закріплена панель стану"),
+        BotCommand("delivery", "Режим доставки сповіщень"),
+        BotCommand("priority", "Пріоритет перевірки пари"),
         BotCommand("pause", "Призупинити моніторинг"),
         BotCommand("resume", "Відновити моніторинг"),
         BotCommand("stats", "Переглянути статистику"),
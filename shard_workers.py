@@ -0,0 +1,310 @@
+"""Sharded monitoring workers coordinated through a local SQLite store."""
+import asyncio
+import bisect
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "coordination.db"
+
+
+class HashRing:
+    """Consistent hash ring that maps gift+model combinations to workers."""
+
+    def __init__(self, worker_count: int, replicas: int = 64):
+        """
+        Build the ring.
+
+        Args:
+            worker_count: Number of worker processes
+            replicas: Virtual nodes per worker (smooths the distribution)
+        """
+        self.worker_count = worker_count
+        self._ring = []
+        for worker in range(worker_count):
+            for replica in range(replicas):
+                self._ring.append((self._hash(f"worker-{worker}-{replica}"), worker))
+        self._ring.sort()
+        self._keys = [h for h, _ in self._ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def worker_for(self, combination: Tuple[str, str]) -> int:
+        """Return the worker index that owns a combination."""
+        h = self._hash(f"{combination[0]}|{combination[1]}")
+        pos = bisect.bisect(self._keys, h) % len(self._ring)
+        return self._ring[pos][1]
+
+    def split(self, combinations: List[Tuple[str, str]]) -> Dict[int, List[Tuple[str, str]]]:
+        """Group combinations by owning worker (empty shards are omitted)."""
+        shards = {}
+        for combo in combinations:
+            shards.setdefault(self.worker_for(combo), []).append(tuple(combo))
+        return shards
+
+
+class ShardStore:
+    """Task and result exchange between the coordinator and its workers."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._init_db()
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection, commit (or roll back) on exit and close it."""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS shard_tasks (
+                    cycle_id TEXT NOT NULL,
+                    worker INTEGER NOT NULL,
+                    combinations TEXT NOT NULL,
+                    max_price INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    claimed_at REAL,
+                    PRIMARY KEY (cycle_id, worker)
+                );
+                CREATE TABLE IF NOT EXISTS shard_results (
+                    cycle_id TEXT NOT NULL,
+                    worker INTEGER NOT NULL,
+                    gifts TEXT NOT NULL,
+                    error TEXT,
+                    finished_at REAL NOT NULL,
+                    complete INTEGER NOT NULL DEFAULT 0,
+                    drift TEXT,
+                    PRIMARY KEY (cycle_id, worker)
+                );
+            """)
+            # Stores created before workers reported their sweep status
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(shard_results)")}
+            if 'complete' not in columns:
+                conn.execute("ALTER TABLE shard_results ADD COLUMN complete INTEGER NOT NULL DEFAULT 0")
+            if 'drift' not in columns:
+                conn.execute("ALTER TABLE shard_results ADD COLUMN drift TEXT")
+
+    def post_cycle(self, cycle_id: str, shards: Dict[int, List[Tuple[str, str]]], max_price: int):
+        """Publish one task per shard for a monitoring cycle."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO shard_tasks (cycle_id, worker, combinations, max_price, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(cycle_id, worker, json.dumps(combos), max_price, now)
+                 for worker, combos in shards.items()]
+            )
+
+    def claim_task(self, worker: int) -> Optional[Tuple[str, List[Tuple[str, str]], int]]:
+        """Claim the oldest unclaimed task for a worker."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT cycle_id, combinations, max_price FROM shard_tasks "
+                "WHERE worker = ? AND claimed_at IS NULL ORDER BY created_at LIMIT 1",
+                (worker,)
+            ).fetchone()
+            if not row:
+                return None
+            conn.execute(
+                "UPDATE shard_tasks SET claimed_at = ? WHERE cycle_id = ? AND worker = ?",
+                (time.time(), row[0], worker)
+            )
+        cycle_id, combos, max_price = row
+        return cycle_id, [tuple(c) for c in json.loads(combos)], max_price
+
+    def submit_result(self, cycle_id: str, worker: int, gifts: List[dict], error: Optional[str] = None,
+                      sweep_status: Optional[dict] = None):
+        """
+        Store a worker's matches for a cycle.
+
+        Args:
+            sweep_status: The worker's search_gifts() status ('complete', 'drift')
+        """
+        sweep_status = sweep_status or {}
+        drift = sweep_status.get('drift')
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO shard_results "
+                "(cycle_id, worker, gifts, error, finished_at, complete, drift) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cycle_id, worker, json.dumps(gifts), error, time.time(),
+                 int(bool(sweep_status.get('complete'))), json.dumps(drift) if drift else None)
+            )
+
+    def collect_results(self, cycle_id: str) -> Dict[int, Tuple[List[dict], Optional[str], dict]]:
+        """Return all results submitted so far for a cycle: (gifts, error, sweep status)."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT worker, gifts, error, complete, drift FROM shard_results WHERE cycle_id = ?",
+                (cycle_id,)
+            ).fetchall()
+        return {
+            worker: (json.loads(gifts), error,
+                     {'complete': bool(complete), 'drift': json.loads(drift) if drift else None})
+            for worker, gifts, error, complete, drift in rows
+        }
+
+    def drop_cycle(self, cycle_id: str):
+        """Remove a finished cycle's tasks and results."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM shard_tasks WHERE cycle_id = ?", (cycle_id,))
+            conn.execute("DELETE FROM shard_results WHERE cycle_id = ?", (cycle_id,))
+
+    def purge_stale(self, max_age_seconds: float = 3600):
+        """Remove leftovers from cycles that were never collected."""
+        cutoff = time.time() - max_age_seconds
+        with self._connect() as conn:
+            conn.execute("DELETE FROM shard_tasks WHERE created_at < ?", (cutoff,))
+            conn.execute("DELETE FROM shard_results WHERE finished_at < ?", (cutoff,))
+
+
+class ShardCoordinator:
+    """Splits a sweep across workers and merges their results."""
+
+    def __init__(self, searcher, worker_count: int, db_path: str = DEFAULT_DB_PATH,
+                 timeout: float = 300, poll_interval: float = 0.5, wait_share: float = 0.5):
+        """
+        Initialize coordinator.
+
+        Args:
+            searcher: Local GiftSearcher used for shards nobody answered
+            worker_count: Number of worker processes
+            db_path: Path to the shared SQLite store
+            timeout: Longest wait for worker results
+            poll_interval: Seconds between result polls
+            wait_share: Share of the time left before a sweep's deadline spent
+                waiting for workers (the rest is left for the local fallback)
+        """
+        self.searcher = searcher
+        self.ring = HashRing(worker_count)
+        self.store = ShardStore(db_path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.wait_share = wait_share
+        self.store.purge_stale()
+
+    async def search_gifts(self, wanted_combinations: List[Tuple[str, str]], max_price: int,
+                           deadline: Optional[float] = None,
+                           sweep_status: Optional[dict] = None) -> List[dict]:
+        """
+        Run a sharded sweep and return merged matches.
+
+        Args:
+            wanted_combinations: Combinations to sweep
+            max_price: Price cap
+            deadline: time.monotonic() by which the sweep must finish, e.g.
+                the cycle budget's; the wait for workers is cut to its share
+            sweep_status: Optional dict; 'complete' is set to True if every
+                shard was swept completely (by its worker or locally) and
+                'drift' sums the shards' DriftStats
+        """
+        if sweep_status is None:
+            sweep_status = {}
+        sweep_status['complete'] = False
+        shards = self.ring.split(wanted_combinations)
+        if not shards:
+            sweep_status['complete'] = True
+            return []
+
+        # Results that arrived after their cycle was collected are never read
+        self.store.purge_stale(self.timeout)
+        cycle_id = uuid.uuid4().hex
+        self.store.post_cycle(cycle_id, shards, max_price)
+
+        wait = self.timeout
+        if deadline is not None:
+            wait = min(wait, max(0.0, deadline - time.monotonic()) * self.wait_share)
+        wait_until = time.monotonic() + wait
+        results = {}
+        while time.monotonic() < wait_until:
+            results = self.store.collect_results(cycle_id)
+            if len(results) >= len(shards):
+                break
+            await asyncio.sleep(self.poll_interval)
+        self.store.drop_cycle(cycle_id)
+
+        merged = {}
+        complete = True
+        drift = {}
+        for worker, combos in shards.items():
+            gifts, error, status = results.get(worker, (None, None, {}))
+            if gifts is None or error:
+                # Worker is down or failed: run its shard here so nothing is skipped
+                logger.warning(f"Shard {worker} unavailable ({error or 'timeout'}), searching locally")
+                status = {}
+                gifts = await self.searcher.search_gifts(combos, max_price, sweep_status=status)
+            complete = complete and bool(status.get('complete'))
+            for name, value in (status.get('drift') or {}).items():
+                if isinstance(value, bool):
+                    drift[name] = drift.get(name, False) or value
+                else:
+                    drift[name] = drift.get(name, 0) + value
+            for gift in gifts:
+                merged[gift.get('id')] = gift
+
+        sweep_status['complete'] = complete
+        sweep_status['drift'] = drift or None
+        self.searcher.index.update(merged.values())
+        return list(merged.values())
+
+
+async def run_worker(index: int, worker_count: int, db_path: str = DEFAULT_DB_PATH,
+                     poll_interval: float = 0.5):
+    """Serve shard tasks for one worker index until the parent process exits."""
+    from gift_searcher import GiftSearcher
+
+    store = ShardStore(db_path)
+    searcher = GiftSearcher()
+    parent_pid = os.getppid()
+    logger.info(f"Worker {index}/{worker_count} started")
+
+    while os.getppid() == parent_pid:
+        task = store.claim_task(index)
+        if not task:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        cycle_id, combos, max_price = task
+        try:
+            status = {}
+            gifts = await searcher.search_gifts(combos, max_price, sweep_status=status)
+            store.submit_result(cycle_id, index, gifts, sweep_status=status)
+        except Exception as e:
+            logger.error(f"Worker {index} failed on cycle {cycle_id}: {e}")
+            store.submit_result(cycle_id, index, [], error=str(e))
+
+    logger.info(f"Worker {index} exiting: parent process is gone")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Використання: python3 shard_workers.py <індекс> <кількість_воркерів>")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+    asyncio.run(run_worker(
+        int(sys.argv[1]),
+        int(sys.argv[2]),
+        os.getenv("COORDINATION_DB", DEFAULT_DB_PATH)
+    ))
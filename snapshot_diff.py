@@ -0,0 +1,228 @@
+"""Diff consecutive listing snapshots into typed events."""
+import heapq
+import json
+import os
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+NEW_LISTING = "new"
+PRICE_DROP = "price_drop"
+PRICE_RISE = "price_rise"
+REMOVED = "removed"
+
+EVENT_TYPES = (NEW_LISTING, PRICE_DROP, PRICE_RISE, REMOVED)
+
+EVENT_LABELS = {
+    NEW_LISTING: "🆕 Нові лоти",
+    PRICE_DROP: "📉 Зниження ціни",
+    PRICE_RISE: "📈 Підвищення ціни",
+    REMOVED: "❌ Продано / знято",
+}
+
+
+def attributes_hash(gift: dict) -> int:
+    """Stable hash of a listing's identity attributes."""
+    attrs = sorted(f"{a.get('type')}={a.get('value')}" for a in gift.get('attributes', []))
+    key = "|".join([str(gift.get('name')), str(gift.get('external_collection_number'))] + attrs)
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def listing_model(gift: dict) -> str:
+    return next((a['value'] for a in gift.get('attributes', []) if a['type'] == 'model'), '')
+
+
+class ListingEvent:
+    """A change in a listing between two snapshots."""
+
+    __slots__ = ('kind', 'gift_id', 'price', 'old_price', 'gift', 'name', 'number', 'model')
+
+    def __init__(self, kind: str, gift_id: str, price: Optional[float], old_price: Optional[float],
+                 gift: Optional[dict], name: str, number, model: str = ''):
+        self.kind = kind
+        self.gift_id = gift_id
+        self.price = price
+        self.old_price = old_price
+        self.gift = gift
+        self.name = name
+        self.number = number
+        self.model = model
+
+
+class SnapshotDiffer:
+    """
+    Keeps compact per-listing state and diffs each sweep against it.
+
+    State per gift id is [price, attributes hash, name, model, number], so a
+    large snapshot costs a few dozen bytes per listing. The state is capped at
+    max_entries (cheapest kept).
+
+    Sweeps only return listings under the price cap, so a listing missing
+    from one may have been repriced above it rather than sold. Missing
+    listings stay in the state as unconfirmed until confirm() is given what
+    a direct lookup found: a repricing, or proof that the listing is gone.
+    Listings known to be above the cap stay in the state too, so dropping
+    back under it is a price drop rather than a new listing.
+    """
+
+    def __init__(self, state_file: str = "snapshot_state.json", max_entries: int = 20000,
+                 max_checks: int = 3):
+        """
+        Initialize differ.
+
+        Args:
+            state_file: Where the state is persisted
+            max_entries: State size cap
+            max_checks: Lookups an unconfirmed listing gets before it is
+                forgotten without an event
+        """
+        self.state_file = state_file
+        self.max_entries = max_entries
+        self.max_checks = max_checks
+        self.state: Dict[str, list] = {}
+        # Gift id -> failed lookups, for listings missing from a covered sweep
+        self.missing: Dict[str, int] = {}
+        self.loaded = self._load()
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.state_file):
+            return False
+        try:
+            with open(self.state_file, 'r') as f:
+                self.state = json.load(f)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def save(self):
+        """Persist the state."""
+        tmp_file = self.state_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.state, f, separators=(',', ':'), ensure_ascii=False)
+        os.replace(tmp_file, self.state_file)
+
+    @staticmethod
+    def _entry(gift: dict) -> list:
+        return [
+            float(gift.get('price', 0)),
+            attributes_hash(gift),
+            gift.get('name', ''),
+            listing_model(gift),
+            gift.get('external_collection_number'),
+        ]
+
+    def seed(self, gifts: Iterable[dict]):
+        """Initialize state from a snapshot without producing events."""
+        for gift in gifts:
+            if gift.get('id') is not None:
+                self.state[gift['id']] = self._entry(gift)
+        self.loaded = True
+
+    def diff(self, gifts: Iterable[dict],
+             covered: Optional[Set[Tuple[str, str]]] = None,
+             price_cap: Optional[float] = None,
+             incomplete_markets: Optional[Set[str]] = None) -> List[ListingEvent]:
+        """
+        Compare a sweep with the previous state and update it.
+
+        Args:
+            gifts: Listings returned by the sweep
+            covered: Combinations the sweep fetched completely; listings of these
+                combinations missing from the sweep become unconfirmed
+                (see unconfirmed() and confirm())
+            price_cap: Price filter of the sweep; missing listings that were
+                already above it are kept as they are
+            incomplete_markets: Markets whose fetch failed or was cut short;
+                their missing listings (ids prefixed "market:") are kept
+
+        Returns:
+            New listings and price changes in sweep order (removals come
+            from confirm())
+        """
+        events = []
+        current: Dict[str, list] = {}
+
+        for gift in gifts:
+            gift_id = gift.get('id')
+            if gift_id is None or gift_id in current:
+                continue
+            entry = self._entry(gift)
+            current[gift_id] = entry
+            prev = self.state.get(gift_id)
+            self.missing.pop(gift_id, None)
+
+            if prev is None or prev[1] != entry[1]:
+                kind = NEW_LISTING
+            elif entry[0] < prev[0]:
+                kind = PRICE_DROP
+            elif entry[0] > prev[0]:
+                kind = PRICE_RISE
+            else:
+                continue
+
+            events.append(ListingEvent(
+                kind, gift_id, entry[0], prev[0] if prev else None, gift, entry[2], entry[4], entry[3]
+            ))
+
+        covered = covered or set()
+        for gift_id, prev in self.state.items():
+            if gift_id in current:
+                continue
+            market = gift_id.split(':', 1)[0] if ':' in gift_id else None
+            if ((prev[2], prev[3]) in covered and market not in (incomplete_markets or ())
+                    and (price_cap is None or prev[0] <= price_cap)):
+                # Sold, delisted or repriced above the cap: up to confirm()
+                self.missing.setdefault(gift_id, 0)
+            # Not fetched this time: keep what we knew
+            current[gift_id] = prev
+
+        if len(current) > self.max_entries:
+            current = dict(heapq.nsmallest(self.max_entries, current.items(), key=lambda item: item[1][0]))
+
+        self.state = current
+        self.missing = {gift_id: n for gift_id, n in self.missing.items() if gift_id in current}
+        return events
+
+    def unconfirmed(self) -> Dict[Tuple[str, str], List[str]]:
+        """Ids of unconfirmed listings per (name, model)."""
+        grouped: Dict[Tuple[str, str], List[str]] = {}
+        for gift_id in self.missing:
+            prev = self.state[gift_id]
+            grouped.setdefault((prev[2], prev[3]), []).append(gift_id)
+        return grouped
+
+    def confirm(self, found: Dict[str, Optional[dict]]) -> List[ListingEvent]:
+        """
+        Settle unconfirmed listings with the result of a direct lookup.
+
+        Args:
+            found: Gift id -> the listing if still for sale, None if it is
+                gone; unconfirmed ids left out count as a failed lookup
+
+        Returns:
+            Price change events for repriced listings, removals for gone ones
+        """
+        events = []
+        for gift_id in list(self.missing):
+            prev = self.state[gift_id]
+            if gift_id not in found:
+                self.missing[gift_id] += 1
+                if self.missing[gift_id] >= self.max_checks:
+                    # Never settled: forget it quietly rather than guess
+                    del self.missing[gift_id]
+                    del self.state[gift_id]
+                continue
+
+            del self.missing[gift_id]
+            gift = found[gift_id]
+            if gift is None:
+                del self.state[gift_id]
+                events.append(ListingEvent(REMOVED, gift_id, None, prev[0], None, prev[2], prev[4], prev[3]))
+                continue
+            entry = self._entry(gift)
+            self.state[gift_id] = entry
+            if entry[0] != prev[0]:
+                events.append(ListingEvent(
+                    PRICE_RISE if entry[0] > prev[0] else PRICE_DROP,
+                    gift_id, entry[0], prev[0], gift, entry[2], entry[4], entry[3]
+                ))
+        return events
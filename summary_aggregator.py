@@ -0,0 +1,99 @@
+"""Single-pass summary aggregation over gift listings."""
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from gift_searcher import GiftSearcher
+
+
+class ComboStats:
+    """Running count and price range for one gift+model combination."""
+
+    __slots__ = ('count', 'cheapest', 'priciest')
+
+    def __init__(self, info: dict):
+        self.count = 1
+        self.cheapest = info
+        self.priciest = info
+
+    def add(self, info: dict, price: float):
+        self.count += 1
+        if price < float(self.cheapest['price']):
+            self.cheapest = info
+        elif price > float(self.priciest['price']):
+            self.priciest = info
+
+
+class SummaryAggregator:
+    """
+    Per-combination stats and the cheapest listings of each combination.
+
+    Listings are added one at a time (for example page by page as they
+    arrive) and each is formatted exactly once; the stats are updated in
+    O(1) per listing and cover every listing. Only the keep cheapest
+    listings of each combination are held for the result pages, so memory
+    stays bounded however many listings a sweep returns.
+    """
+
+    def __init__(self, keep: int = 100):
+        """
+        Initialize aggregator.
+
+        Args:
+            keep: Listings kept per combination (the cheapest ones)
+        """
+        self.keep = keep
+        self.total = 0
+        self.combos: Dict[Tuple[str, str], ComboStats] = {}
+        # Max-heaps of (-price, order, info): the priciest kept listing is on top
+        self._kept: Dict[Tuple[str, str], List[Tuple[float, int, dict]]] = {}
+
+    @property
+    def infos(self) -> List[dict]:
+        """Kept listings, cheapest first."""
+        kept = [entry for heap in self._kept.values() for entry in heap]
+        return [info for _, _, info in sorted(kept, key=lambda e: (-e[0], e[1]))]
+
+    def add(self, gift: dict) -> dict:
+        """
+        Add a raw listing.
+
+        Returns:
+            The formatted gift info (see GiftSearcher.format_gift_info)
+        """
+        info = GiftSearcher.format_gift_info(gift)
+        self.add_info(info)
+        return info
+
+    def add_info(self, info: dict):
+        """Add an already formatted listing."""
+        price = float(info['price'])
+        self.total += 1
+
+        key = (info['name'], info['model'])
+        stats = self.combos.get(key)
+        if stats is None:
+            self.combos[key] = ComboStats(info)
+        else:
+            stats.add(info, price)
+
+        heap = self._kept.setdefault(key, [])
+        entry = (-price, self.total, info)
+        if len(heap) < self.keep:
+            heapq.heappush(heap, entry)
+        elif price < -heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+    def add_many(self, gifts: Iterable[dict]) -> List[dict]:
+        """Add raw listings and return their formatted infos."""
+        return [self.add(gift) for gift in gifts]
+
+    def render_summary(self, price_formatter: Callable, ton_price_uah: Optional[float]) -> str:
+        """Per-combination count and price range."""
+        summary = ""
+        for (name, model), stats in sorted(self.combos.items()):
+            summary += f"📦 {name} - {model} ({stats.count} шт.)\n"
+            summary += f"   💰 {price_formatter(stats.cheapest['price'], ton_price_uah)}"
+            if stats.priciest is not stats.cheapest:
+                summary += f" … {stats.priciest['price']} TON"
+            summary += "\n"
+        return summary
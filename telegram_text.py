@@ -0,0 +1,19 @@
+"""Telegram message length limits, measured the way Telegram counts them."""
+
+# Telegram rejects longer message texts and media captions
+MESSAGE_LIMIT = 4096
+CAPTION_LIMIT = 1024
+
+
+def telegram_length(text: str) -> int:
+    """Length in UTF-16 code units (emoji outside the BMP count as two)."""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def truncate(text: str, limit: int, suffix: str = "…") -> str:
+    """Cut text to at most limit UTF-16 code units, ending with suffix if it was cut."""
+    if telegram_length(text) <= limit:
+        return text
+    room = max(0, limit - telegram_length(suffix)) * 2
+    # A surrogate pair split at the cut is dropped whole
+    return text.encode('utf-16-le')[:room].decode('utf-16-le', errors='ignore') + suffix
@@ -0,0 +1,51 @@
+"""CycleBudget deadlines and ScopeController shrinking and regrowing the scope."""
+import asyncio
+
+from cycle_budget import CycleBudget, ScopeController
+
+COMBOS = [(f"Gift {i}", "Model") for i in range(16)]
+
+
+def overrun() -> CycleBudget:
+    budget = CycleBudget(0.01)
+    assert not asyncio.run(budget.run(asyncio.sleep(1)))
+    return budget
+
+
+def test_run_cancels_at_the_deadline():
+    budget = overrun()
+    assert budget.timed_out
+    assert budget.expired()
+
+    budget = CycleBudget(5)
+    assert asyncio.run(budget.run(asyncio.sleep(0)))
+    assert not budget.timed_out
+
+
+def test_scope_halves_after_an_overrun_and_grows_back():
+    scope = ScopeController()
+    planned, deferred = scope.plan(COMBOS)
+    assert len(planned) == 16 and deferred == []
+
+    scope.record(overrun(), planned, swept=planned[:3], event_combos=[])
+    assert scope.overruns == 1
+    planned, deferred = scope.plan(COMBOS)
+    assert len(planned) == 8
+    # Combinations swept longest ago (never, here) come first
+    assert set(planned).isdisjoint(COMBOS[:3])
+    assert set(planned) | set(deferred) == set(COMBOS)
+
+    sizes = []
+    while deferred:
+        scope.record(CycleBudget(60), planned, swept=planned, event_combos=[])
+        planned, deferred = scope.plan(COMBOS)
+        sizes.append(len(planned))
+    assert sizes == [10, 12, 15, 16]
+    assert scope.limit is None
+
+
+def test_combinations_with_recent_events_go_first():
+    scope = ScopeController()
+    scope.record(CycleBudget(60), COMBOS, swept=COMBOS, event_combos=[COMBOS[9]])
+    assert scope.prioritize(COMBOS)[0] == COMBOS[9]
+    assert scope.prioritize(COMBOS, ranks={COMBOS[4]: -1})[0] == COMBOS[4]
@@ -0,0 +1,70 @@
+"""DigestBuffer rows through price changes and removals, and digests split to fit a message."""
+import sqlite3
+
+from digest_buffer import DigestBuffer, render_digest
+from snapshot_diff import NEW_LISTING, PRICE_DROP, REMOVED, ListingEvent
+from telegram_text import MESSAGE_LIMIT, telegram_length
+
+
+def event(kind, gift_id, price, old_price=None):
+    gift = None if kind == REMOVED else {'id': gift_id, 'price': price}
+    return ListingEvent(kind, gift_id, price, old_price, gift, "Ionic Dryer", 7, "Love Burst")
+
+
+def test_repriced_listing_updates_its_row(tmp_path):
+    buffer = DigestBuffer(str(tmp_path / "c.db"))
+    assert buffer.add("1", [event(NEW_LISTING, "a", 10)]) == 1
+    assert buffer.add("1", [event(PRICE_DROP, "a", 8, 10)]) == 0
+
+    rows = buffer.pending("1")
+    assert len(rows) == 1
+    assert (rows[0]['price'], rows[0]['first_price']) == (8, 10)
+    [item] = render_digest(rows, "Зведення")
+    assert "8 TON" in item['text'] and "[було 10]" in item['text']
+
+
+def test_vanished_listing_is_counted_not_listed(tmp_path):
+    buffer = DigestBuffer(str(tmp_path / "c.db"))
+    buffer.add("1", [event(NEW_LISTING, "a", 10), event(NEW_LISTING, "b", 12)])
+    buffer.add("1", [event(REMOVED, "b", None, 12)])
+    assert buffer.pending_count() == 1
+
+    [item] = render_digest(buffer.pending("1"), "Зведення")
+    assert "gift/a" in item['text'] and "gift/b" not in item['text']
+    assert "Продано або знято до зведення: 1" in item['text']
+
+    # Nothing active left: no digest at all
+    buffer.add("1", [event(REMOVED, "a", None, 10)])
+    assert render_digest(buffer.pending("1"), "Зведення") == []
+
+
+def test_updates_only_touch_buffered_listings(tmp_path):
+    buffer = DigestBuffer(str(tmp_path / "c.db"))
+    buffer.add("1", [event(NEW_LISTING, "a", 10)])
+    assert buffer.add("1", [event(PRICE_DROP, "a", 9, 10), event(PRICE_DROP, "b", 5, 6)], insert=False) == 0
+    assert [(row['gift_id'], row['price']) for row in buffer.pending("1")] == [("a", 9)]
+
+
+def test_complete_drops_the_flushed_rows(tmp_path):
+    buffer = DigestBuffer(str(tmp_path / "c.db"))
+    buffer.add("1", [event(NEW_LISTING, "a", 10)])
+    buffer.complete("1", buffer.pending("1"), flushed_at=123.0)
+    assert buffer.pending("1") == []
+    assert buffer.last_flush("1") == 123.0
+
+
+def test_emoji_heavy_digest_parts_fit():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE t (gift_id, name, number, model, price, first_price, "
+                 "discount, url, vanished)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)", [
+        (f"g{i}", "🎁🎄🎅" * 10, i, "🔥" * 20, 1.0 + i, 1.0 + i, None, f"https://portals.tg/gift/{i}")
+        for i in range(200)
+    ])
+    rows = conn.execute("SELECT * FROM t").fetchall()
+
+    parts = render_digest(rows, "🕐 Зведення")
+    assert len(parts) > 1
+    assert all(telegram_length(part['text']) <= MESSAGE_LIMIT for part in parts)
+    assert sum(part['text'].count("https://") for part in parts) == 200
@@ -0,0 +1,92 @@
+"""DriftSafePaginator against a simulated order book that moves while it is paged."""
+import asyncio
+import random
+
+import pytest
+
+from drift_pagination import DriftSafePaginator
+
+LIMIT = 20
+
+
+class MovingBook:
+    """Price-sorted book where every request sells some listings and adds cheap ones."""
+
+    def __init__(self, seed: int, size: int = 400, churn: int = 4):
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.next_id = 0
+        self.listings = sorted((self.new_listing() for _ in range(size)), key=self.order)
+        self.initial = {listing['id'] for listing in self.listings}
+
+    @staticmethod
+    def order(listing):
+        return listing['price'], listing['id']
+
+    def new_listing(self, price=None):
+        self.next_id += 1
+        return {'id': f"g{self.next_id}",
+                'price': price if price is not None else round(self.rng.uniform(1, 100), 2)}
+
+    def mutate(self):
+        for _ in range(self.churn):
+            if self.listings and self.rng.random() < 0.5:
+                self.listings.pop(self.rng.randrange(len(self.listings)))
+            else:
+                self.listings.append(self.new_listing(round(self.rng.uniform(1, 10), 2)))
+        self.listings.sort(key=self.order)
+
+    async def fetch(self, offset, limit, min_price):
+        rows = [l for l in self.listings if min_price is None or l['price'] >= min_price]
+        page = [dict(l) for l in rows[offset:offset + limit]]
+        self.mutate()
+        return page
+
+    def stable(self):
+        """Listings that were in the book for the whole sweep."""
+        return self.initial & {listing['id'] for listing in self.listings}
+
+
+async def naive_sweep(book):
+    ids, offset = [], 0
+    while True:
+        page = await book.fetch(offset, LIMIT, None)
+        ids += [listing['id'] for listing in page]
+        if len(page) < LIMIT:
+            return ids
+        offset += LIMIT
+
+
+async def safe_sweep(book, keyset):
+    paginator = DriftSafePaginator(book.fetch, limit=LIMIT, max_pages=200, keyset=keyset)
+    ids = []
+    async for page in paginator.pages():
+        ids += [listing['id'] for listing in page]
+    return ids, paginator
+
+
+def test_naive_offset_paging_breaks_on_the_simulated_book():
+    book = MovingBook(seed=7)
+    ids = asyncio.run(naive_sweep(book))
+    assert len(ids) != len(set(ids)) or book.stable() - set(ids)
+
+
+@pytest.mark.parametrize("keyset", [False, True], ids=["offset", "keyset"])
+@pytest.mark.parametrize("seed", [1, 7, 42, 1234])
+@pytest.mark.parametrize("churn", [1, 4, 8])
+def test_no_skips_or_duplicates_under_churn(keyset, seed, churn):
+    book = MovingBook(seed, churn=churn)
+    ids, paginator = asyncio.run(safe_sweep(book, keyset))
+
+    assert paginator.complete
+    assert len(ids) == len(set(ids))
+    assert not book.stable() - set(ids)
+
+
+def test_offset_mode_rescans_head_for_new_cheap_listings():
+    book = MovingBook(seed=7)
+    ids, paginator = asyncio.run(safe_sweep(book, keyset=False))
+
+    assert paginator.stats.shifted_right and paginator.stats.rescanned
+    inserted_cheap = {l['id'] for l in book.listings if l['price'] <= 10} - book.initial
+    assert len(inserted_cheap & set(ids)) > len(inserted_cheap) / 2
@@ -0,0 +1,37 @@
+"""LeaderLease hand-over between instances sharing one coordination database."""
+import leader_lease
+from leader_lease import LeaderLease
+
+
+def test_standby_takes_over_an_expired_lease(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(leader_lease.time, "time", lambda: now[0])
+    path = str(tmp_path / "c.db")
+    leader, standby = LeaderLease(path, ttl=15), LeaderLease(path, ttl=15)
+
+    assert leader.heartbeat()
+    assert not standby.heartbeat()
+
+    # Renewed in time: the lease stays
+    now[0] += 10
+    assert leader.heartbeat()
+    now[0] += 10
+    assert not standby.heartbeat()
+
+    # The leader stops renewing
+    now[0] += 20
+    assert standby.heartbeat()
+    assert standby.current_holder()['holder'] == standby.holder_id
+    assert not leader.heartbeat()
+    assert not leader.is_leader
+
+
+def test_release_hands_over_immediately(tmp_path):
+    path = str(tmp_path / "c.db")
+    leader, standby = LeaderLease(path), LeaderLease(path)
+    assert leader.heartbeat()
+    assert not standby.heartbeat()
+
+    leader.release()
+    assert not leader.is_leader
+    assert standby.heartbeat()
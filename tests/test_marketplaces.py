@@ -0,0 +1,87 @@
+"""Market adapters against the local stand-in marketplace."""
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from marketplaces import JsonMarketAdapter, MarketFanout, RateLimiter, _standin_app
+
+WANTED = [("Ionic Dryer", "Love Burst"), ("Jolly Chimp", "La Baboon")]
+MAX_PRICE = 40
+
+
+async def with_standin(test, size=300):
+    """Run test(base_url) against a stand-in market on an ephemeral port."""
+    runner = web.AppRunner(_standin_app("standin", seed=3, size=size))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await test(f"http://127.0.0.1:{port}")
+    finally:
+        await runner.cleanup()
+
+
+async def expected_ids(base_url):
+    """Every matching listing, fetched in one oversized page."""
+    params = [('name', n) for n, _ in WANTED] + [('model', m) for _, m in WANTED]
+    params += [('max_price', str(MAX_PRICE)), ('limit', '100000')]
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/listings", params=params) as response:
+            rows = (await response.json())['listings']
+    return {f"standin:{row['id']}" for row in rows if (row['name'], row['model']) in WANTED}
+
+
+async def sweep(adapter, max_pages=20):
+    status = {}
+    gifts = []
+    async for listings in adapter.iter_listings(WANTED, MAX_PRICE, max_pages, status):
+        gifts += [listing.as_gift() for listing in listings]
+    return gifts, status
+
+
+def test_json_adapter_pages_through_the_whole_book():
+    async def test(base_url):
+        adapter = JsonMarketAdapter("standin", base_url, RateLimiter(1000), limit=10)
+        gifts, status = await sweep(adapter)
+        return gifts, status, adapter.request_count, await expected_ids(base_url)
+
+    gifts, status, requests, expected = asyncio.run(with_standin(test))
+    ids = [gift['id'] for gift in gifts]
+
+    assert status['complete']
+    assert requests > 1
+    assert len(ids) == len(set(ids))
+    assert set(ids) == expected
+    assert all(float(gift['price']) <= MAX_PRICE and gift['market'] == "standin" for gift in gifts)
+
+
+def test_json_adapter_reports_a_truncated_sweep_as_incomplete():
+    async def test(base_url):
+        adapter = JsonMarketAdapter("standin", base_url, RateLimiter(1000), limit=10)
+        return await sweep(adapter, max_pages=1)
+
+    gifts, status = asyncio.run(with_standin(test))
+
+    assert gifts
+    assert not status['complete']
+
+
+def test_fanout_isolates_a_failing_market():
+    async def test(base_url):
+        fanout = MarketFanout([
+            JsonMarketAdapter("broken", f"{base_url}/missing", RateLimiter(1000)),
+            JsonMarketAdapter("standin", base_url, RateLimiter(1000), limit=10),
+        ])
+        sink, statuses = [], {}
+        complete = await fanout.search(WANTED, MAX_PRICE, sink, statuses=statuses)
+        return sink, complete, statuses, await expected_ids(base_url)
+
+    sink, complete, statuses, expected = asyncio.run(with_standin(test))
+
+    assert complete == {"broken": False, "standin": True}
+    assert statuses["standin"]['complete'] and not statuses["broken"]['complete']
+    assert {gift['id'] for gift in sink} == expected
@@ -0,0 +1,69 @@
+"""NotificationOutbox deduplication, acknowledgement and resuming after a restart."""
+import asyncio
+
+from notification_outbox import NotificationOutbox, OutboxDispatcher
+
+
+class FakeBot:
+    """Records sent texts; raises for texts listed in fail."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        if text in self.fail:
+            raise RuntimeError("send failed")
+        self.sent.append(text)
+
+
+def items(*keys):
+    return [{'key': key, 'text': f"alert {key}"} for key in keys]
+
+
+def test_reenqueued_batch_adds_nothing(tmp_path):
+    outbox = NotificationOutbox(str(tmp_path / "c.db"))
+    assert outbox.enqueue_batch("1", "header", items("a", "b")) == 2
+    assert outbox.enqueue_batch("1", "header", items("a", "b")) == 0
+    assert [row['text'] for row in outbox.pending()] == ["header", "alert a", "alert b"]
+
+    # Only new items are stored, under a header of their own
+    assert outbox.enqueue_batch("1", "header", items("b", "c")) == 1
+    assert [row['text'] for row in outbox.pending()][3:] == ["header", "alert c"]
+
+
+def test_ack_removes_an_item_from_pending(tmp_path):
+    outbox = NotificationOutbox(str(tmp_path / "c.db"))
+    outbox.enqueue_batch("1", None, items("a", "b"))
+    first = outbox.pending()[0]
+    outbox.ack(first['id'])
+    assert [row['text'] for row in outbox.pending()] == ["alert b"]
+    assert outbox.pending_count() == 1
+
+
+def test_drain_resumes_in_order_after_a_failed_send(tmp_path):
+    path = str(tmp_path / "c.db")
+    outbox = NotificationOutbox(path)
+    outbox.enqueue_batch("1", None, items("a", "b", "c"))
+
+    bot = FakeBot(fail={"alert b"})
+    assert asyncio.run(OutboxDispatcher(outbox, bot, delay=0).drain()) == 1
+    assert bot.sent == ["alert a"]
+
+    # A restarted instance picks up where the last one stopped
+    restarted = NotificationOutbox(path)
+    bot = FakeBot()
+    assert asyncio.run(OutboxDispatcher(restarted, bot, delay=0).drain()) == 2
+    assert bot.sent == ["alert b", "alert c"]
+    assert restarted.pending_count() == 0
+
+
+def test_item_is_given_up_after_max_attempts(tmp_path):
+    outbox = NotificationOutbox(str(tmp_path / "c.db"), max_attempts=2)
+    outbox.enqueue_batch("1", None, items("a", "b"))
+    dispatcher = OutboxDispatcher(outbox, FakeBot(fail={"alert a"}), delay=0)
+
+    assert asyncio.run(dispatcher.drain()) == 0
+    assert asyncio.run(dispatcher.drain()) == 1
+    assert dispatcher.bot.sent == ["alert b"]
+    assert outbox.pending_count() == 0
@@ -0,0 +1,51 @@
+"""The in-memory portalsmp patch against a stand-in module."""
+import types
+
+from patch_portals import NEW_DOMAIN, OLD_DOMAIN, _patch_module
+
+
+def make_stub() -> types.ModuleType:
+    module = types.ModuleType("portalsmp_stub")
+    exec(f"""
+API_URL = "https://{OLD_DOMAIN}/api/"
+HEADERS = {{
+    "Origin": "https://{OLD_DOMAIN}",
+    "Referer": "https://{OLD_DOMAIN}/",
+    "Accept": "application/json",
+}}
+ALLOWED = ["https://{OLD_DOMAIN}", ("https://{OLD_DOMAIN}/app", 1)]
+PAGE_LIMIT = 20
+
+
+def search_url(query):
+    return "https://{OLD_DOMAIN}/api/nfts/search?" + query
+
+
+def request(url, headers={{"Origin": "https://{OLD_DOMAIN}"}}):
+    return url, headers
+""", vars(module))
+    return module
+
+
+def test_patches_urls_headers_and_functions():
+    module = make_stub()
+    headers = module.HEADERS
+
+    assert _patch_module(module) > 0
+
+    assert module.API_URL == f"https://{NEW_DOMAIN}/api/"
+    assert module.HEADERS["Origin"] == f"https://{NEW_DOMAIN}"
+    assert module.HEADERS["Referer"] == f"https://{NEW_DOMAIN}/"
+    assert module.HEADERS["Accept"] == "application/json"
+    # Patched in place, so code holding the same dict sends the new headers
+    assert headers is module.HEADERS
+    assert module.ALLOWED == [f"https://{NEW_DOMAIN}", (f"https://{NEW_DOMAIN}/app", 1)]
+    assert module.PAGE_LIMIT == 20
+    assert module.search_url("q=1") == f"https://{NEW_DOMAIN}/api/nfts/search?q=1"
+    assert module.request("u")[1] == {"Origin": f"https://{NEW_DOMAIN}"}
+
+
+def test_second_patch_changes_nothing():
+    module = make_stub()
+    _patch_module(module)
+    assert _patch_module(module) == 0
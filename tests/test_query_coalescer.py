@@ -0,0 +1,63 @@
+"""QueryCoalescer sharing one query between callers and cancelling it when abandoned."""
+import asyncio
+
+from query_coalescer import QueryCoalescer
+
+
+class SlowQuery:
+    """Query that runs until released, counting starts and cancellations."""
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+        self.release = None
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+            return ["result"]
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def test_cancelled_caller_leaves_the_others_waiting():
+    async def run():
+        coalescer, query = QueryCoalescer(), SlowQuery()
+        query.release = asyncio.Event()
+        first = asyncio.ensure_future(coalescer.run("key", query))
+        second = asyncio.ensure_future(coalescer.run("key", query))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        query.release.set()
+        return coalescer, query, first, await second
+
+    coalescer, query, first, result = asyncio.run(run())
+    assert first.cancelled()
+    assert result == ["result"]
+    assert (query.started, query.cancelled) == (1, 0)
+    assert (coalescer.started, coalescer.coalesced) == (1, 1)
+
+
+def test_query_is_cancelled_when_every_caller_is():
+    async def run():
+        coalescer, query = QueryCoalescer(), SlowQuery()
+        query.release = asyncio.Event()
+        callers = [asyncio.ensure_future(coalescer.run("key", query)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        # Nothing in flight any more: the next caller starts afresh
+        query.release.set()
+        return coalescer, query, await coalescer.run("key", query)
+
+    coalescer, query, result = asyncio.run(run())
+    assert query.cancelled == 1
+    assert query.started == 2
+    assert result == ["result"]
@@ -0,0 +1,91 @@
+"""Sharded sweeps report completeness from worker results and local fallbacks."""
+import asyncio
+import sqlite3
+
+from shard_workers import ShardCoordinator, ShardStore
+
+COMBOS = [("Ionic Dryer", "Love Burst"), ("Jolly Chimp", "La Baboon"), ("Spring Basket", "Ritual Goat")]
+
+
+class LocalSearcher:
+    """Stand-in GiftSearcher used for shards no worker answered."""
+
+    class Index:
+        def update(self, gifts):
+            pass
+
+    def __init__(self, complete=True):
+        self.index = self.Index()
+        self.complete = complete
+        self.searched = []
+
+    async def search_gifts(self, combos, max_price, sweep_status=None):
+        self.searched += combos
+        if sweep_status is not None:
+            sweep_status.update(complete=self.complete, drift={'pages': 1, 'gaps': 0, 'rescanned': False})
+        return [{'id': f"local:{name}"} for name, _ in combos]
+
+
+async def serve(store, workers, complete=True):
+    """Answer every posted task once, like run_worker does."""
+    answered = set()
+    while len(answered) < len(workers):
+        for worker in workers:
+            task = store.claim_task(worker)
+            if task:
+                cycle_id, combos, _ = task
+                status = {'complete': complete, 'drift': {'pages': 2, 'gaps': 1, 'rescanned': True}}
+                store.submit_result(cycle_id, worker, [{'id': name} for name, _ in combos],
+                                    sweep_status=status)
+                answered.add(worker)
+        await asyncio.sleep(0.01)
+
+
+def sharded_sweep(tmp_path, worker_complete=True, answering=None, local=None):
+    local = local or LocalSearcher()
+    coordinator = ShardCoordinator(local, 2, str(tmp_path / "c.db"), timeout=1, poll_interval=0.01)
+    shards = coordinator.ring.split(COMBOS)
+    answering = list(shards) if answering is None else answering
+
+    async def run():
+        status = {}
+        worker_task = asyncio.ensure_future(serve(coordinator.store, answering, worker_complete))
+        gifts = await coordinator.search_gifts(COMBOS, 30, sweep_status=status)
+        worker_task.cancel()
+        return gifts, status
+
+    gifts, status = asyncio.run(run())
+    return gifts, status, local
+
+
+def test_complete_when_every_worker_reports_complete(tmp_path):
+    gifts, status, local = sharded_sweep(tmp_path)
+    assert status['complete']
+    assert sorted(g['id'] for g in gifts) == sorted(name for name, _ in COMBOS)
+    assert status['drift']['gaps'] >= 1 and status['drift']['rescanned'] is True
+    assert local.searched == []
+
+
+def test_incomplete_worker_makes_the_sweep_incomplete(tmp_path):
+    _, status, _ = sharded_sweep(tmp_path, worker_complete=False)
+    assert not status['complete']
+
+
+def test_silent_worker_falls_back_to_a_local_sweep(tmp_path):
+    _, status, local = sharded_sweep(tmp_path, answering=[])
+    assert status['complete']
+    assert sorted(local.searched) == sorted(COMBOS)
+
+    _, status, _ = sharded_sweep(tmp_path, answering=[], local=LocalSearcher(complete=False))
+    assert not status['complete']
+
+
+def test_old_result_table_gains_status_columns(tmp_path):
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE shard_results (cycle_id TEXT NOT NULL, worker INTEGER NOT NULL, "
+                     "gifts TEXT NOT NULL, error TEXT, finished_at REAL NOT NULL, "
+                     "PRIMARY KEY (cycle_id, worker))")
+    store = ShardStore(path)
+    store.submit_result("c", 0, [], sweep_status={'complete': True})
+    assert store.collect_results("c") == {0: ([], None, {'complete': True, 'drift': None})}
@@ -0,0 +1,68 @@
+"""SnapshotDiffer events and the confirmation of listings missing from a sweep."""
+from snapshot_diff import NEW_LISTING, PRICE_DROP, PRICE_RISE, REMOVED, SnapshotDiffer
+
+COMBO = ("Ionic Dryer", "Love Burst")
+
+
+def listing(gift_id, price, number=1):
+    return {
+        'id': gift_id, 'name': COMBO[0], 'price': price, 'external_collection_number': number,
+        'attributes': [{'type': 'model', 'value': COMBO[1]}],
+    }
+
+
+def seeded(tmp_path, **kwargs):
+    differ = SnapshotDiffer(str(tmp_path / "state.json"), **kwargs)
+    differ.seed([listing("a", 10), listing("b", 20, 2), listing("c", 30, 3)])
+    return differ
+
+
+def test_diff_reports_new_listings_and_price_changes(tmp_path):
+    differ = seeded(tmp_path)
+    events = differ.diff([listing("a", 8), listing("b", 25, 2), listing("c", 30, 3), listing("d", 5, 4)],
+                         covered={COMBO}, price_cap=40)
+
+    assert [(e.kind, e.gift_id) for e in events] == [
+        (PRICE_DROP, "a"), (PRICE_RISE, "b"), (NEW_LISTING, "d"),
+    ]
+    assert events[0].old_price == 10 and events[0].price == 8
+    assert not differ.unconfirmed()
+
+
+def test_missing_listing_waits_for_confirmation(tmp_path):
+    differ = seeded(tmp_path)
+    events = differ.diff([listing("a", 10)], covered={COMBO}, price_cap=40)
+
+    assert events == []
+    assert sorted(differ.unconfirmed()[COMBO]) == ["b", "c"]
+
+    # b was repriced above the cap, c is gone
+    events = differ.confirm({"b": listing("b", 50, 2), "c": None})
+    assert sorted((e.kind, e.gift_id) for e in events) == [(PRICE_RISE, "b"), (REMOVED, "c")]
+    assert "b" in differ.state and "c" not in differ.state
+    assert not differ.unconfirmed()
+
+    # Back under the cap: a price drop, not a new listing
+    events = differ.diff([listing("a", 10), listing("b", 15, 2)], covered={COMBO}, price_cap=40)
+    assert [(e.kind, e.gift_id) for e in events] == [(PRICE_DROP, "b")]
+
+
+def test_uncovered_or_above_cap_listings_are_not_missing(tmp_path):
+    differ = seeded(tmp_path)
+    differ.diff([listing("a", 10)], covered=set(), price_cap=40)
+    assert not differ.unconfirmed()
+
+    differ.diff([listing("a", 10)], covered={COMBO}, price_cap=15)
+    assert not differ.unconfirmed()
+    assert set(differ.state) == {"a", "b", "c"}
+
+
+def test_unsettled_listing_is_forgotten_without_an_event(tmp_path):
+    differ = seeded(tmp_path, max_checks=2)
+    differ.diff([listing("a", 10), listing("b", 20, 2)], covered={COMBO})
+
+    assert differ.confirm({}) == []
+    assert "c" in differ.state
+    assert differ.confirm({}) == []
+    assert "c" not in differ.state
+    assert not differ.unconfirmed()
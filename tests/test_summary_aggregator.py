@@ -0,0 +1,34 @@
+"""SummaryAggregator keeps exact stats but only the cheapest listings of each pair."""
+import random
+
+from summary_aggregator import SummaryAggregator
+
+
+def listing(gift_id, name, model, price):
+    return {
+        'id': gift_id, 'name': name, 'price': str(price),
+        'attributes': [{'type': 'model', 'value': model, 'rarity_per_mille': 10}],
+    }
+
+
+def test_keeps_cheapest_per_combination_with_exact_stats():
+    rng = random.Random(7)
+    prices = {('Plush Pepe', 'Cozy'): [], ('Snoop Dogg', 'Ice'): []}
+    summary = SummaryAggregator(keep=5)
+    for i in range(200):
+        combo = ('Plush Pepe', 'Cozy') if i % 3 else ('Snoop Dogg', 'Ice')
+        price = round(rng.uniform(1, 500), 2)
+        prices[combo].append(price)
+        summary.add(listing(f"g{i}", *combo, price))
+
+    assert summary.total == 200
+    infos = summary.infos
+    assert len(infos) == 10
+    assert [float(i['price']) for i in infos] == sorted(float(i['price']) for i in infos)
+    for combo, seen in prices.items():
+        stats = summary.combos[combo]
+        assert stats.count == len(seen)
+        assert float(stats.cheapest['price']) == min(seen)
+        assert float(stats.priciest['price']) == max(seen)
+        kept = [float(i['price']) for i in infos if (i['name'], i['model']) == combo]
+        assert kept == sorted(seen)[:5]
@@ -0,0 +1,18 @@
+"""Message lengths are counted in UTF-16 code units, like Telegram does."""
+from telegram_text import MESSAGE_LIMIT, telegram_length, truncate
+
+
+def test_emoji_outside_bmp_count_twice():
+    assert telegram_length("abc") == 3
+    assert telegram_length("🎁") == 2
+    assert telegram_length("💰 1 TON") == len("💰 1 TON") + 1
+
+
+def test_truncate_fits_and_keeps_surrogate_pairs_whole():
+    text = "🎁" * 3000
+    cut = truncate(text, MESSAGE_LIMIT)
+    assert telegram_length(cut) <= MESSAGE_LIMIT
+    assert cut.endswith("…")
+    assert cut[:-1] == "🎁" * len(cut[:-1])
+    assert truncate("short", MESSAGE_LIMIT) == "short"
+
@@ -0,0 +1,53 @@
+"""Fair-value model fits and the listings it annotates."""
+import pytest
+
+pytest.importorskip("numpy")
+
+from valuation import FairValueModel
+
+
+def listing(gift_id, price, model_rarity, name="Ionic Dryer"):
+    return {
+        'id': gift_id, 'name': name, 'price': str(price),
+        'attributes': [
+            {'type': 'model', 'value': 'M', 'rarity_per_mille': model_rarity},
+            {'type': 'symbol', 'value': 'S', 'rarity_per_mille': 100},
+            {'type': 'backdrop', 'value': 'B', 'rarity_per_mille': 100},
+        ],
+    }
+
+
+def sample():
+    # Rarer models cost more: price ~ rarity^-0.5
+    return [listing(f"g{i}", round(100 * r ** -0.5, 2), r)
+            for i, r in enumerate([0.5, 1, 2, 5, 10, 20, 50, 100, 200, 400] * 3)]
+
+
+def test_fractional_rarity_is_not_treated_as_common():
+    model = FairValueModel()
+    model.fit(sample())
+    rare, common = listing("x", 1, 0.5), listing("y", 1, 1000)
+    model.annotate([rare, common])
+
+    assert rare['fair_value'] > 5 * common['fair_value']
+
+
+def test_refit_swaps_the_model_in_whole():
+    class Recording(FairValueModel):
+        """Records the size of every model assigned while fitting."""
+
+        def __setattr__(self, name, value):
+            if name == 'coefficients':
+                assigned.append(len(value))
+            super().__setattr__(name, value)
+
+    assigned = []
+    model = Recording()
+    before = model.coefficients
+    assigned.clear()
+    model.fit(sample() + [listing(f"o{i}", 10 + i, 100, name="Jolly Chimp") for i in range(10)])
+
+    # annotate() on the event loop never sees an empty or half-built model
+    assert assigned == [2]
+    assert before is not model.coefficients
+    assert set(model.samples) == {"Ionic Dryer", "Jolly Chimp"}
@@ -0,0 +1,60 @@
+"""Webhook route accepting only well-formed updates carrying the secret token."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("telegram")
+from aiohttp.test_utils import TestClient, TestServer
+
+from webhook_server import SECRET_HEADER, WebhookServer, derive_secret
+
+UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 1, 'date': 0, 'text': "/stats",
+        'chat': {'id': 1, 'type': 'private'},
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'Local'},
+    },
+}
+
+
+class FakeApplication:
+    bot = None
+
+    def __init__(self):
+        self.update_queue = asyncio.Queue()
+
+
+def post(headers, json=UPDATE):
+    """Post to the webhook route; returns (status, server, queued updates)."""
+    async def run():
+        server = WebhookServer(FakeApplication(), derive_secret("123:token"))
+        async with TestClient(TestServer(server.make_app())) as client:
+            response = await client.post(server.path, json=json, headers=headers)
+            return response.status, server, server.application.update_queue.qsize()
+
+    return asyncio.run(run())
+
+
+def test_update_with_the_secret_is_queued():
+    status, server, queued = post({SECRET_HEADER: derive_secret("123:token")})
+    assert status == 200
+    assert queued == 1
+    assert (server.updates_received, server.updates_rejected) == (1, 0)
+
+
+@pytest.mark.parametrize("headers", [{}, {SECRET_HEADER: "wrong"}, {SECRET_HEADER: derive_secret("456:other")}])
+def test_update_without_the_secret_is_rejected(headers):
+    status, server, queued = post(headers)
+    assert status == 403
+    assert queued == 0
+    assert (server.updates_received, server.updates_rejected) == (0, 1)
+
+
+@pytest.mark.parametrize("json", [[1], {'foo': 1}, {'update_id': 1, 'message': "text"}])
+def test_json_that_is_not_an_update_is_a_bad_request(json):
+    status, server, queued = post({SECRET_HEADER: derive_secret("123:token")}, json=json)
+    assert status == 400
+    assert queued == 0
+    assert server.updates_received == 0
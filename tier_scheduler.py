@@ -0,0 +1,137 @@
+"""Priority tiers for watched combinations: fast-lane probing and per-tier detection latency."""
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from snapshot_diff import NEW_LISTING
+
+Combo = Tuple[str, str]
+
+HOT = "hot"
+NORMAL = "normal"
+LOW = "low"
+TIERS = (HOT, NORMAL, LOW)
+TIER_LABELS = {HOT: "🔥 гаряча", NORMAL: "звичайна", LOW: "низька"}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class TierScheduler:
+    """
+    Decides when each priority tier is checked and measures how fast it is.
+
+    Hot combinations are probed in a fast lane every hot_interval seconds,
+    one limit=1 request each; the interval stretches so probes take at most
+    hot_share of the Portals request rate, and the regular sweeps get the
+    rest. Normal combinations are swept every cycle, low ones only when
+    low_every cycles have passed since their last sweep.
+
+    Detection latency of a new listing is the time from the previous check
+    of its combination to the check that found it. The marketplace doesn't
+    say when a listing appeared, so this is an upper bound.
+    """
+
+    def __init__(self, hot_interval: float = 5, hot_share: float = 0.5, low_every: int = 3,
+                 request_rate: Optional[float] = None, window: int = 200):
+        """
+        Initialize scheduler.
+
+        Args:
+            hot_interval: Shortest seconds between fast-lane probes
+            hot_share: Share of request_rate the fast lane may use
+            low_every: Low tier is swept once per this many cycles
+            request_rate: Portals requests per second (None: no stretching)
+            window: Latency samples kept per tier
+        """
+        self.hot_interval = hot_interval
+        self.hot_share = hot_share
+        self.low_every = max(1, low_every)
+        self.request_rate = request_rate
+        self.last_fast_lane = 0.0
+        # Start of the latest probe or sweep that checked a combination
+        self.last_checked: Dict[Combo, float] = {}
+        # Start of the latest sweep applied to the snapshot per combination
+        self.applied_at: Dict[Combo, float] = {}
+        self.latencies: Dict[str, Deque[float]] = {tier: deque(maxlen=window) for tier in TIERS}
+        self.detections = {tier: 0 for tier in TIERS}
+
+    def fast_lane_interval(self, hot_count: int) -> float:
+        """Seconds between fast-lane probes of hot_count combinations."""
+        if self.request_rate and hot_count:
+            return max(self.hot_interval, hot_count / (self.request_rate * self.hot_share))
+        return self.hot_interval
+
+    def fast_lane_due(self, hot_count: int, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return hot_count > 0 and now - self.last_fast_lane >= self.fast_lane_interval(hot_count)
+
+    def sweep_due(self, combinations: Iterable[Combo], priorities: Dict[Combo, str],
+                  cycle_seconds: float, now: Optional[float] = None) -> Tuple[List[Combo], List[Combo]]:
+        """
+        Split combinations into the ones this cycle sweeps and low-tier ones that wait.
+
+        Returns:
+            (due, waiting)
+        """
+        now = time.time() if now is None else now
+        # Half a cycle of slack, so scheduling jitter doesn't skip a turn
+        wait = (self.low_every - 0.5) * cycle_seconds
+        due, waiting = [], []
+        for combo in combinations:
+            if priorities.get(combo, NORMAL) == LOW and now - self.last_checked.get(combo, 0) < wait:
+                waiting.append(combo)
+            else:
+                due.append(combo)
+        return due, waiting
+
+    @staticmethod
+    def ranks(priorities: Dict[Combo, str]) -> Dict[Combo, int]:
+        """Sort rank per combination: hot first, low last."""
+        return {combo: TIERS.index(tier) for combo, tier in priorities.items()}
+
+    def newer_than(self, started: float) -> Set[Combo]:
+        """Combinations a sweep started after `started` has already applied."""
+        return {combo for combo, at in self.applied_at.items() if at > started}
+
+    def record(self, events: Iterable, checked: Iterable[Combo], priorities: Dict[Combo, str],
+               started: float, applied: bool = True, now: Optional[float] = None):
+        """
+        Record a finished probe or sweep.
+
+        Args:
+            events: Its snapshot events (new listings are timed)
+            checked: Combinations it checked completely
+            priorities: Tier per combination
+            started: When it started
+            applied: Whether its listings went into the snapshot
+        """
+        now = time.time() if now is None else now
+        for event in events:
+            if event.kind != NEW_LISTING:
+                continue
+            combo = (event.name, event.model)
+            previous = self.last_checked.get(combo)
+            if previous is None:
+                # First check since startup: no bound
+                continue
+            tier = priorities.get(combo, NORMAL)
+            self.latencies[tier].append(now - previous)
+            self.detections[tier] += 1
+        for combo in checked:
+            self.last_checked[combo] = max(started, self.last_checked.get(combo, 0))
+            if applied:
+                self.applied_at[combo] = max(started, self.applied_at.get(combo, 0))
+
+    def report(self) -> Dict[str, dict]:
+        """Detections, median and worst latency (s) per tier that has any."""
+        return {
+            tier: {
+                'detections': self.detections[tier],
+                'p50_s': round(_percentile(list(samples), 0.5), 1),
+                'max_s': round(max(samples), 1),
+            }
+            for tier, samples in self.latencies.items() if samples
+        }
@@ -1,17 +1,43 @@
 """TON price fetcher using CoinGecko API."""
 import asyncio
-import aiohttp
+import json
+import os
+import time
 from typing import Optional
 
 
 class TonPriceFetcher:
     """Fetches TON price in UAH."""
 
-    def __init__(self):
+    def __init__(self, cache_file: Optional[str] = "ton_price_cache.json"):
         self.api_url = "https://api.coingecko.com/api/v3/simple/price"
         self.cached_price = None
         self.cache_time = 0
         self.cache_duration = 300  # 5 minutes
+        self.cache_file = cache_file
+        self._load_cache()
+
+    def _load_cache(self):
+        """Restore the last known price from disk (used as a warm start)."""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+            self.cached_price = data.get('price')
+            self.cache_time = data.get('time', 0)
+        except (OSError, ValueError):
+            pass
+
+    def _save_cache(self):
+        """Persist the current price to disk."""
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'w') as f:
+                json.dump({'price': self.cached_price, 'time': self.cache_time}, f)
+        except OSError:
+            pass
 
     async def get_ton_price_uah(self) -> Optional[float]:
         """
@@ -20,7 +46,6 @@ class TonPriceFetcher:
         Returns:
             TON price in UAH or None if failed
         """
-        import time
         current_time = time.time()
 
         # Return cached price if still valid
@@ -28,6 +53,8 @@ class TonPriceFetcher:
             return self.cached_price
 
         try:
+            import aiohttp
+
             timeout = aiohttp.ClientTimeout(total=5)
             connector = aiohttp.TCPConnector(ssl=False)  # Disable SSL verification
             async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
@@ -43,6 +70,7 @@ class TonPriceFetcher:
                         if price:
                             self.cached_price = float(price)
                             self.cache_time = current_time
+                            self._save_cache()
                             return self.cached_price
         except Exception as e:
             print(f"Помилка отримання курсу TON: {e}")
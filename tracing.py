@@ -0,0 +1,180 @@
+"""Per-cycle tracing spans written to a rotating JSON lines file."""
+import argparse
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+def trace_file() -> str:
+    """Trace log file from TRACE_FILE, read when needed so values from .env apply."""
+    return os.getenv("TRACE_FILE", "traces.jsonl")
+
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation inside a trace."""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attrs')
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, attrs: dict):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach attributes to the span."""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Writes finished spans as JSON lines."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        """
+        Initialize tracer.
+
+        Args:
+            path: Trace log file (empty string disables tracing, None reads
+                TRACE_FILE when the first span finishes)
+            max_bytes: Size at which the file is rotated
+            backups: Rotated files kept
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._logger = None
+        self._opened = False
+
+    def _open(self) -> Optional[logging.Logger]:
+        """Create the file handler on first use."""
+        if self._opened:
+            return self._logger
+        self._opened = True
+        if self.path is None:
+            self.path = trace_file()
+        if self.path:
+            self._logger = logging.getLogger(f"nft_monitor.traces.{self.path}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            if not self._logger.handlers:
+                handler = logging.handlers.RotatingFileHandler(
+                    self.path, maxBytes=self.max_bytes, backupCount=self.backups,
+                    encoding='utf-8', delay=True
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._logger.addHandler(handler)
+        return self._logger
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs):
+        """
+        Time a block as a span.
+
+        A span opened with no active span starts a new trace; spans opened
+        inside it (including in tasks created from it) become its children.
+        """
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        span = Span(trace_id, parent.span_id if parent else None, name, attrs)
+        token = _current_span.set(span)
+        started = time.time()
+        perf_started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            logger = self._open()
+            if logger:
+                logger.info(json.dumps({
+                    'trace_id': span.trace_id,
+                    'span_id': span.span_id,
+                    'parent_id': span.parent_id,
+                    'name': span.name,
+                    'start': started,
+                    'duration_ms': round((time.perf_counter() - perf_started) * 1000, 2),
+                    'attrs': span.attrs,
+                }, ensure_ascii=False, default=str))
+
+
+tracer = Tracer()
+
+
+def span(name: str, **attrs):
+    """Open a span on the default tracer."""
+    return tracer.span(name, **attrs)
+
+
+def current_trace_id() -> Optional[str]:
+    """Get the id of the active trace, if any."""
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+def load_spans(path: Optional[str] = None, backups: int = 3) -> List[dict]:
+    """Read spans from the trace file (default TRACE_FILE) and its rotated backups, oldest first."""
+    path = path or trace_file()
+    files = [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]
+    spans = []
+    for file in files:
+        if not os.path.exists(file):
+            continue
+        with open(file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return spans
+
+
+def summarize(spans: List[dict], cycles: int = 20, top: int = 10, root: str = "check_and_notify") -> str:
+    """Summarize span durations over the last N monitoring cycles."""
+    roots = [s for s in spans if s['name'] == root and not s.get('parent_id')]
+    roots = roots[-cycles:]
+    trace_ids = {s['trace_id'] for s in roots}
+    selected = [s for s in spans if s['trace_id'] in trace_ids]
+
+    by_name: Dict[str, List[float]] = {}
+    for s in selected:
+        by_name.setdefault(s['name'], []).append(s['duration_ms'])
+
+    lines = [f"Cycles: {len(roots)}  Spans: {len(selected)}", ""]
+    lines.append(f"{'span':<28}{'count':>7}{'avg ms':>11}{'p95 ms':>11}{'max ms':>11}{'total s':>10}")
+    for name, durations in sorted(by_name.items(), key=lambda kv: -sum(kv[1])):
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        lines.append(
+            f"{name:<28}{len(durations):>7}{sum(durations) / len(durations):>11.1f}"
+            f"{p95:>11.1f}{durations[-1]:>11.1f}{sum(durations) / 1000:>10.2f}"
+        )
+
+    lines += ["", f"Slowest {top} spans:"]
+    for s in sorted(selected, key=lambda s: -s['duration_ms'])[:top]:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s['start']))
+        attrs = " ".join(f"{k}={v}" for k, v in s.get('attrs', {}).items())
+        lines.append(f"  {s['duration_ms']:>10.1f} ms  {s['name']:<24} {when}  trace={s['trace_id']} {attrs}")
+
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize slow spans from the trace log")
+    parser.add_argument("--file", help="Trace log file (default: TRACE_FILE or traces.jsonl)")
+    parser.add_argument("--cycles", type=int, default=20, help="Number of recent cycles")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest spans to list")
+    args = parser.parse_args()
+
+    print(summarize(load_spans(args.file), args.cycles, args.top))
@@ -0,0 +1,214 @@
+"""Rarity-aware fair-value model for gift listings."""
+import argparse
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FEATURES = ('model_rarity', 'symbol_rarity', 'backdrop_rarity')
+
+
+def _rarities(gift: dict) -> Tuple[float, float, float]:
+    attrs = {a.get('type'): a for a in gift.get('attributes', [])}
+    # Fractional per mille values are the rarest attributes; keep them
+    return tuple(float(attrs.get(kind, {}).get('rarity_per_mille') or 0) for kind in ('model', 'symbol', 'backdrop'))
+
+
+class FairValueModel:
+    """
+    Per-collection fair value from attribute rarity.
+
+    For every collection, log(price) is fitted by least squares against
+    log(model, symbol and backdrop rarity), with a small ridge penalty on
+    the slopes so collections with little variety stay close to their
+    median. All collections are solved at once as a stack of 4x4 systems;
+    listings whose residual is far off (mispriced listings are exactly
+    what we look for) are dropped and the fit is repeated once.
+
+    A listing's discount is 1 - price / fair value; positive means cheap.
+    """
+
+    def __init__(self, min_samples: int = 5, ridge: float = 1.0, outlier_sigma: float = 2.5):
+        """
+        Initialize model.
+
+        Args:
+            min_samples: Listings a collection needs for a rarity fit
+                (fewer: median price, one listing: no estimate)
+            ridge: Penalty on the rarity coefficients
+            outlier_sigma: Residuals beyond this many standard deviations
+                are left out of the second fit
+        """
+        self.min_samples = min_samples
+        self.ridge = ridge
+        self.outlier_sigma = outlier_sigma
+        # Collection name -> coefficients (intercept, model, symbol, backdrop)
+        self.coefficients: Dict[str, List[float]] = {}
+        self.samples: Dict[str, int] = {}
+        self.fitted_at: Optional[float] = None
+
+    @staticmethod
+    def _design(rarities):
+        import numpy as np
+
+        rarities = np.asarray(rarities, dtype=np.float64).reshape(-1, len(FEATURES))
+        # Rarity 0 means unknown: treat the attribute as common (1000 per mille)
+        rarities = np.where(rarities > 0, rarities, 1000)
+        return np.column_stack([np.ones(len(rarities)), np.log(rarities)])
+
+    def fit_arrays(self, names: List[str], groups, rarities, prices):
+        """
+        Fit from columns.
+
+        Runs in a worker thread while annotate() reads the model on the event
+        loop, so the new model is swapped in whole at the end.
+
+        Args:
+            names: Collection name of every group code
+            groups: Group code per listing (index into names)
+            rarities: (n, 3) per mille rarities: model, symbol, backdrop
+            prices: Price per listing in TON
+        """
+        import numpy as np
+
+        groups = np.asarray(groups, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        valid = prices > 0
+        groups, prices = groups[valid], prices[valid]
+        X = self._design(np.asarray(rarities)[valid])
+        y = np.log(prices)
+        k = X.shape[1]
+        penalty = np.diag([0.0] + [self.ridge] * (k - 1))
+
+        def solve(weights):
+            XtX = np.zeros((len(names), k, k))
+            Xty = np.zeros((len(names), k))
+            np.add.at(XtX, groups, (X[:, :, None] * X[:, None, :]) * weights[:, None, None])
+            np.add.at(Xty, groups, X * (y * weights)[:, None])
+            counts = np.bincount(groups, weights=weights, minlength=len(names))
+            # Empty groups get an identity system and are discarded below
+            XtX[counts == 0] = np.eye(k)
+            return np.linalg.solve(XtX + penalty, Xty[:, :, None])[:, :, 0], counts
+
+        weights = np.ones(len(y))
+        beta, counts = solve(weights)
+        residuals = y - np.einsum('ij,ij->i', X, beta[groups])
+        sq_sum = np.bincount(groups, weights=residuals ** 2, minlength=len(names))
+        sigma = np.sqrt(sq_sum / np.maximum(counts, 1))
+        weights = (np.abs(residuals) <= self.outlier_sigma * np.maximum(sigma[groups], 1e-9)).astype(np.float64)
+        beta, kept = solve(weights)
+
+        # Small collections: median log price, no rarity slopes
+        order = np.lexsort((y, groups))
+        starts = np.searchsorted(groups[order], np.arange(len(names)))
+        ends = np.searchsorted(groups[order], np.arange(len(names)), side='right')
+
+        coefficients = {}
+        samples = {}
+        for code, name in enumerate(names):
+            n = int(ends[code] - starts[code])
+            if n < 2:
+                continue
+            if n < self.min_samples or kept[code] < self.min_samples:
+                median = float(np.median(y[order][starts[code]:ends[code]]))
+                coefficients[name] = [median] + [0.0] * (k - 1)
+            else:
+                coefficients[name] = [float(c) for c in beta[code]]
+            samples[name] = n
+        self.coefficients = coefficients
+        self.samples = samples
+        self.fitted_at = time.time()
+
+    def fit(self, gifts: Iterable[dict]):
+        """Fit from listing dicts (a snapshot)."""
+        names: Dict[str, int] = {}
+        groups, rarities, prices = [], [], []
+        for gift in gifts:
+            try:
+                price = float(gift.get('price', 0))
+            except (TypeError, ValueError):
+                continue
+            groups.append(names.setdefault(gift.get('name', ''), len(names)))
+            rarities.append(_rarities(gift))
+            prices.append(price)
+        self.fit_arrays(list(names), groups, rarities, prices)
+
+    def fit_archive(self, reader, since: Optional[float] = None, extra: Iterable[dict] = ()):
+        """
+        Fit from the listing archive (latest observation of every listing)
+        plus extra listing dicts not yet archived.
+
+        Args:
+            reader: listing_archive.ArchiveReader
+            since: Only rows observed after this unix time
+            extra: Listing dicts, e.g. the current snapshot
+        """
+        import numpy as np
+
+        mask = reader.mask(since=since)
+        ids = reader['gift_id'][mask]
+        # Latest row per listing: the last occurrence in append order
+        _, last = np.unique(ids[::-1], return_index=True)
+        rows = np.flatnonzero(mask)[len(ids) - 1 - last]
+
+        name_codes = reader['name'][rows]
+        names = list(reader.dictionaries['name'])
+        rarities = np.column_stack([reader[column][rows] for column in FEATURES])
+        prices = reader['price'][rows]
+
+        archived = set(reader.decode('gift_id', np.unique(ids)))
+        extra = [g for g in extra if str(g.get('id')) not in archived]
+        if extra:
+            codes = {name: code for code, name in enumerate(names)}
+            extra_groups = [codes.setdefault(g.get('name', ''), len(codes)) for g in extra]
+            names = list(codes)
+            name_codes = np.concatenate([name_codes, np.asarray(extra_groups, dtype=name_codes.dtype)])
+            rarities = np.vstack([rarities, np.asarray([_rarities(g) for g in extra]).reshape(-1, 3)])
+            prices = np.concatenate([prices, [float(g.get('price', 0)) for g in extra]])
+        self.fit_arrays(names, name_codes, rarities, prices)
+
+    def fair_values(self, gifts: List[dict]) -> List[Optional[float]]:
+        """Fair value in TON per listing (None for collections without an estimate)."""
+        import numpy as np
+
+        if not gifts:
+            return []
+        # One model for the whole batch, even if a refit swaps it meanwhile
+        coefficients = self.coefficients
+        X = self._design([_rarities(g) for g in gifts])
+        missing = [0.0] * X.shape[1]
+        beta = np.asarray([coefficients.get(g.get('name', ''), missing) for g in gifts])
+        values = np.exp(np.einsum('ij,ij->i', X, beta))
+        return [float(v) if g.get('name', '') in coefficients else None
+                for g, v in zip(gifts, values)]
+
+    def annotate(self, gifts: List[dict]):
+        """Set 'fair_value' and 'discount' (fraction) on every listing that has an estimate."""
+        for gift, fair in zip(gifts, self.fair_values(gifts)):
+            if fair is None:
+                gift.pop('fair_value', None)
+                gift.pop('discount', None)
+                continue
+            gift['fair_value'] = round(fair, 2)
+            gift['discount'] = round(1 - float(gift.get('price', 0)) / fair, 4)
+
+
+if __name__ == "__main__":
+    from listing_archive import ArchiveReader
+
+    parser = argparse.ArgumentParser(
+        description="Fit the fair-value model on the archive and print each collection's coefficients"
+    )
+    parser.add_argument("--dir", default=os.getenv("LISTING_ARCHIVE_DIR") or "archive")
+    parser.add_argument("--days", type=float, default=float(os.getenv("VALUATION_HISTORY_DAYS", "14")))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    archive = ArchiveReader(args.dir)
+    model = FairValueModel()
+    model.fit_archive(archive, time.time() - args.days * 86400)
+    print(f"Fitted {len(model.coefficients)} collections in {(time.perf_counter() - started) * 1000:.0f} ms\n")
+
+    # Slopes are price elasticities: -0.3 = 10% rarer attribute, ~3% higher price
+    print(f"{'collection':<24}{'listings':>9}{'intercept':>10}{'model':>8}{'symbol':>8}{'backdrop':>9}")
+    for name, beta in sorted(model.coefficients.items()):
+        print(f"{name[:23]:<24}{model.samples[name]:>9}" + "".join(f"{c:>9.2f}" for c in beta))
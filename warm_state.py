@@ -0,0 +1,38 @@
+"""Monitoring state persisted between restarts for a warm start."""
+import json
+import os
+import time
+from typing import List, Optional
+
+
+class WarmState:
+    """Stores the last listing snapshot on disk."""
+
+    def __init__(self, state_file: str = "warm_state.json"):
+        self.state_file = state_file
+        self.saved_at: Optional[float] = None
+
+    def load_snapshot(self) -> List[dict]:
+        """
+        Load the listings seen by the last sweep.
+
+        Returns:
+            List of gift dictionaries (empty if nothing was saved)
+        """
+        if not os.path.exists(self.state_file):
+            return []
+        try:
+            with open(self.state_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        self.saved_at = data.get('saved_at')
+        return data.get('snapshot', [])
+
+    def save_snapshot(self, gifts: List[dict]):
+        """Persist the listings seen by the latest sweep."""
+        self.saved_at = time.time()
+        tmp_file = self.state_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'saved_at': self.saved_at, 'snapshot': gifts}, f)
+        os.replace(tmp_file, self.state_file)
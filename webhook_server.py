@@ -0,0 +1,154 @@
+"""Embedded webhook server feeding Telegram updates into the bot."""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Callable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+from aiohttp import web
+from telegram import Update
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def derive_secret(bot_token: str) -> str:
+    """Stable webhook secret derived from the bot token (Telegram allows [A-Za-z0-9_-])."""
+    return hashlib.sha256(f"webhook:{bot_token}".encode()).hexdigest()[:32]
+
+
+class WebhookServer:
+    """
+    aiohttp server with the Telegram webhook route and a health route.
+
+    Updates are checked against the secret token Telegram sends in
+    X-Telegram-Bot-Api-Secret-Token and put on the Application's update
+    queue, where they are processed exactly as with polling.
+    """
+
+    def __init__(self, application, secret_token: str, path: str = "/telegram",
+                 host: str = "0.0.0.0", port: int = 8080,
+                 health: Optional[Callable[[], dict]] = None):
+        """
+        Initialize server.
+
+        Args:
+            application: telegram.ext.Application receiving the updates
+            secret_token: Expected secret token header value
+            path: Webhook route
+            host: Interface to listen on
+            port: Port to listen on
+            health: Optional callable returning extra fields for /health
+        """
+        self.application = application
+        self.secret_token = secret_token
+        self.path = path
+        self.host = host
+        self.port = port
+        self.health = health
+        self.started_at = time.time()
+        self.updates_received = 0
+        self.updates_rejected = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get("/health", self.handle_health)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret_token):
+            self.updates_rejected += 1
+            return web.Response(status=403)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        try:
+            update = Update.de_json(data, self.application.bot)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # Valid JSON, but not an Update
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        self.updates_received += 1
+        return web.Response()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        body = {
+            'status': 'ok',
+            'uptime_s': round(time.time() - self.started_at),
+            'updates_received': self.updates_received,
+            'updates_rejected': self.updates_rejected,
+        }
+        if self.health:
+            body.update(self.health())
+        return web.json_response(body)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def post_fake_updates(url: str, secret_token: str, chat_id: int, commands: list,
+                            delay: float = 0.5):
+    """
+    Local stand-in for Telegram: post fake command updates to a webhook.
+
+    Args:
+        url: Webhook URL (for example http://localhost:8080/telegram)
+        secret_token: Secret token header to send
+        chat_id: Chat (and user) id of the fake sender
+        commands: Message texts to send, e.g. ["/stats", "/list"]
+        delay: Seconds between updates
+    """
+    async with aiohttp.ClientSession() as session:
+        for update_id, text in enumerate(commands, start=int(time.time())):
+            command = text.split()[0]
+            update = {
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Local'},
+                    'text': text,
+                    'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}],
+                },
+            }
+            async with session.post(url, json=update, headers={SECRET_HEADER: secret_token}) as response:
+                print(f"{text:<20} -> HTTP {response.status}")
+            await asyncio.sleep(delay)
+
+        health_url = urlunsplit(urlsplit(url)._replace(path="/health", query=""))
+        async with session.get(health_url) as response:
+            print(f"/health -> HTTP {response.status} {json.dumps(await response.json(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Post fake Telegram updates to a local webhook")
+    parser.add_argument("commands", nargs="*", default=["/stats", "/list"], help="Message texts")
+    parser.add_argument("--url", default=f"http://localhost:{os.getenv('PORT', '8080')}"
+                                         f"{os.getenv('WEBHOOK_PATH', '/telegram')}")
+    parser.add_argument("--secret", default=os.getenv('WEBHOOK_SECRET')
+                        or derive_secret(os.getenv('TELEGRAM_BOT_TOKEN', '')))
+    parser.add_argument("--chat-id", type=int, default=1, help="Fake sender id")
+    args = parser.parse_args()
+
+    asyncio.run(post_fake_updates(args.url, args.secret, args.chat_id, args.commands))